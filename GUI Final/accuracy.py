@@ -0,0 +1,208 @@
+"""Accuracy of typed text against a reference passage.
+
+Uses the bit-parallel edit-distance algorithm of Myers (in Hyyro's form for
+global distance), with Python integers as bit vectors as long as the
+passage, so each typed character costs O(len(passage) / 64) machine-word
+operations, all inside the integer implementation.
+"""
+
+# How far the passage prefix may be shorter or longer than the typed text when aligning them
+DEFAULT_BAND = 32
+
+
+class AccuracyTracker:
+    """Keeps the number of typing errors against a passage up to date as the text is edited.
+
+    One DP column (two bit vectors) is stored per typed character. Typing
+    or deleting at the end of the text only adds or drops columns; an edit
+    in the middle recomputes the columns from the edit onwards.
+    """
+
+    def __init__(self, passage, band=DEFAULT_BAND):
+        """Initialize the tracker for `passage` and an empty typed text."""
+        self.passage = passage
+        self.band = band
+        self.mask = (1 << len(passage)) - 1
+
+        # Bit i of peq[c] is set when passage[i] == c
+        self.peq = {}
+        for i, char in enumerate(passage):
+            self.peq[char] = self.peq.get(char, 0) | (1 << i)
+
+        self.typed = []
+        self.columns = [(self.mask, 0)]  # (Pv, Mv) vertical deltas after each typed character
+        self._reset_alignment()
+
+    def _reset_alignment(self):
+        # Alignment path of the last align(), per DP column: the passage row it leaves the column at and
+        # whether it skips passage characters inside the column; wrong[i] marks typed character i
+        self.exit_rows = [0]
+        self.skips = [False]
+        self.wrong = []
+        self.aligned_upto = 0  # Columns up to here are unchanged since the last align()
+
+    def _step(self, column, char):
+        """Advances one DP column by one typed character."""
+        pv, mv = column
+        mask = self.mask
+        eq = self.peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        ph = ((ph << 1) | 1) & mask  # Row 0 grows by one per typed character (global distance)
+        mh = (mh << 1) & mask
+        return mh | (~(xv | ph) & mask), ph & xv
+
+    def _recompute_from(self, offset):
+        del self.columns[offset + 1:]
+        self.aligned_upto = min(self.aligned_upto, offset)
+        column = self.columns[-1]
+        for char in self.typed[offset:]:
+            column = self._step(column, char)
+            self.columns.append(column)
+
+    def insert(self, offset, text):
+        """Updates the errors after `text` was inserted at character `offset`."""
+        self.typed[offset:offset] = text
+        self._recompute_from(offset)
+
+    def delete(self, offset, count):
+        """Updates the errors after `count` characters were deleted at `offset`."""
+        del self.typed[offset:offset + count]
+        self._recompute_from(offset)
+
+    def reset(self):
+        """Forgets the typed text."""
+        self.typed = []
+        self.columns = [(self.mask, 0)]
+        self._reset_alignment()
+
+    def _distance(self, row, column):
+        """D[row][column]: edit distance between the first `row` passage and `column` typed characters."""
+        pv, mv = self.columns[column]
+        low_mask = (1 << row) - 1
+        return column + (pv & low_mask).bit_count() - (mv & low_mask).bit_count()
+
+    def _best_row(self):
+        """Returns (errors, passage row) of the best-matching passage prefix; see errors()."""
+        n = len(self.typed)
+        pv, mv = self.columns[-1]
+        hi = min(len(self.passage), n + self.band)
+        lo = min(max(0, n - self.band), hi)
+
+        # D[i][n] = n + (number of +1 deltas above row i) - (number of -1 deltas above row i)
+        distance = self._distance(lo, n)
+        best, best_row = distance, lo
+        window_mask = (1 << (hi - lo)) - 1
+        pw = (pv >> lo) & window_mask
+        mw = (mv >> lo) & window_mask
+        for row in range(lo + 1, hi + 1):
+            distance += (pw & 1) - (mw & 1)
+            pw >>= 1
+            mw >>= 1
+            if distance < best:
+                best, best_row = distance, row
+        return best, best_row
+
+    def errors(self):
+        """Edit distance between the typed text and the best-matching start of the passage.
+
+        Only passage prefixes within `band` characters of the typed length are
+        considered, so an unfinished passage does not count as errors.
+        """
+        return self._best_row()[0]
+
+    def align(self):
+        """Brings `wrong` up to date with the alignment behind errors(); returns the first offset that may have changed.
+
+        A typed character is wrong when the alignment substitutes it, counts
+        it as extra, or skips passage characters right before it. The path is
+        traced back from the end only until it meets the previous path in a
+        column the edits left alone; the rest of that path is reused, so
+        typing at the end costs a few steps.
+        """
+        typed = self.typed
+        passage = self.passage
+        upto = self.aligned_upto
+        del self.exit_rows[upto + 1:], self.skips[upto + 1:]
+
+        # New part of the path, from the end backwards
+        exit_rows, skips, moves = [], [], []  # moves[k]: whether the move over a typed character is an error
+        column = len(typed)
+        row = self._best_row()[1]
+        joined = False
+        while True:
+            if column <= upto and self.exit_rows[column] == row:
+                joined = True  # The previous path from here back is still valid
+                break
+            exit_rows.append(row)
+            if column == 0:
+                skips.append(row > 0)  # Passage characters left out before the first typed one
+                break
+            distance = self._distance(row, column)
+            skipped = False
+            while True:
+                if row > 0:
+                    mismatch = passage[row - 1] != typed[column - 1]
+                    if distance == self._distance(row - 1, column - 1) + mismatch:
+                        move = mismatch  # Typed in place of a passage character
+                        row -= 1
+                        break
+                if distance == self._distance(row, column - 1) + 1:
+                    move = True  # Extra character
+                    break
+                skipped = True  # Passage character left out
+                row -= 1
+                distance -= 1
+            skips.append(skipped)
+            moves.append(move)
+            column -= 1
+
+        keep = column + 1 if joined else 0
+        del self.exit_rows[keep:], self.skips[keep:], self.wrong[column:]
+        self.exit_rows.extend(reversed(exit_rows))
+        self.skips.extend(reversed(skips))
+        self.wrong.extend(move or self.skips[i] for i, move in enumerate(reversed(moves), start=column))
+        self.aligned_upto = len(typed)
+        return column
+
+
+def accuracy_percent(errors, typed_length):
+    """Returns the share of typed characters that were correct, as a percentage."""
+    if typed_length == 0:
+        return 100.0
+    return max(0.0, 100.0 * (typed_length - errors) / typed_length)
+
+
+def net_words_per_minute(gross_wpm, errors, elapsed_seconds):
+    """Returns the words per minute after subtracting one word per error per minute."""
+    if elapsed_seconds <= 0:
+        return 0.0
+    return max(0.0, gross_wpm - errors * 60 / elapsed_seconds)
+
+
+# Microbenchmark: per-keystroke scoring cost against passage length
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(42)
+    words = "the quick brown fox jumps over lazy dog while typing fast and steady".split()
+    for length in (500, 1000, 2000, 5000, 10000):
+        passage = ""
+        while len(passage) < length:
+            passage += rng.choice(words) + " "
+        passage = passage[:length]
+
+        tracker = AccuracyTracker(passage)
+        keys = 0
+        start = time.perf_counter()
+        for i, char in enumerate(passage):
+            if rng.random() < 0.05:
+                char = "x"  # Typo
+            tracker.insert(i, char)
+            tracker.errors()
+            keys += 1
+        per_key = (time.perf_counter() - start) / keys
+        print(f"passage {length:>6} chars: {per_key * 1e6:6.1f} us per keystroke, {tracker.errors()} errors")
@@ -0,0 +1,308 @@
+"""Bulk entry of results from a CSV file or a table pasted from a spreadsheet.
+
+Usage:
+    python bulk_import.py class_results.csv OneMinute
+
+Every cell is checked in one vectorized NumPy pass per column: dates are
+MM/DD/YYYY and must exist on the calendar, stopwatch times are HH:MM:SS,
+word and character counts are whole numbers and characters per second is
+a decimal number. Lap splits are optional. Each bad row is reported with its line number and the
+reasons it was rejected. The valid rows are added in a single transaction
+with duplicates skipped through the store's row hash index.
+"""
+import argparse
+import csv
+import io
+import sys
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+# pip install numpy
+import numpy as np
+
+import results_store  # Result layouts and stores
+import window_manager  # Reusable windows
+
+# Define constants for colors
+BG_COLOR = "#D3BDB0"
+BUTTON_COLOR = "#89937C"
+TEXT_COLOR = "white"
+
+MIN_YEAR = 1900
+MAX_YEAR = 2100
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MAX_ERRORS_SHOWN = 20  # Error lines listed in the import window
+
+
+def parse_table(text, headers):
+    """Splits CSV or tab-separated text into rows of cells in the order of `headers`.
+
+    Returns (rows, line numbers). A first row made of header names is used
+    to reorder the columns and is not returned as data; optional columns
+    it leaves out are empty. Blank lines are skipped.
+    """
+    sample = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",\t;")
+    except csv.Error:
+        dialect = csv.excel_tab if "\t" in sample else csv.excel
+    lines = [(number, row) for number, row in enumerate(csv.reader(io.StringIO(text), dialect), start=1)
+             if any(cell.strip() for cell in row)]
+    if not lines:
+        return [], []
+
+    names = [header.lower() for header in headers]
+    required = {header.lower() for header in headers if header not in results_store.OPTIONAL_HEADERS}
+    first = [cell.strip().lower() for cell in lines[0][1]]
+    if set(first) >= required:
+        order = [first.index(name) if name in first else None for name in names]
+        lines = [(number, [row[i] if i is not None and i < len(row) else "" for i in order])
+                 for number, row in lines[1:]]
+    elif first and first[0] == names[0]:
+        lines = lines[1:]  # Header row in layout order
+    return [row for _, row in lines], [number for number, _ in lines]
+
+
+def split_fields(values, separator, count):
+    """Splits each string into `count` fields; returns (fields, ok) where ok marks the right number of parts."""
+    fields = []
+    rest = values
+    ok = np.ones(len(values), dtype=bool)
+    for _ in range(count - 1):
+        parts = np.char.partition(rest, separator)
+        fields.append(parts[:, 0])
+        ok &= parts[:, 1] == separator
+        rest = parts[:, 2]
+    fields.append(rest)
+    ok &= np.char.find(rest, separator) < 0
+    return fields, ok
+
+
+ASCII_DIGITS = "0123456789"
+
+
+def digits(values, max_length):
+    """Marks strings of 1 to `max_length` ASCII digits.
+
+    np.char.isdigit() also accepts digits such as '\u00b2' or '\u0663' that
+    int() cannot convert, so any character left after stripping the ASCII
+    digits rejects the string.
+    """
+    lengths = np.char.str_len(values)
+    ascii_only = np.char.str_len(np.char.strip(values, ASCII_DIGITS)) == 0
+    return ascii_only & (lengths >= 1) & (lengths <= max_length)
+
+
+def as_int(values, ok):
+    """Converts the strings marked by `ok` to integers; the rest become 0."""
+    return np.where(ok, values, "0").astype(np.int64)
+
+
+def check_dates(values):
+    """Validates MM/DD/YYYY dates; returns (ok, dates zero-padded to MM/DD/YYYY)."""
+    (month, day, year), ok = split_fields(values, "/", 3)
+    ok &= digits(month, 2) & digits(day, 2) & (np.char.str_len(year) == 4) & digits(year, 4)
+    m, d, y = as_int(month, ok), as_int(day, ok), as_int(year, ok)
+    ok &= (m >= 1) & (m <= 12) & (y >= MIN_YEAR) & (y <= MAX_YEAR)
+    leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+    last_day = DAYS_IN_MONTH[np.clip(m, 1, 12) - 1] + (leap & (m == 2))
+    ok &= (d >= 1) & (d <= last_day)
+    return ok, np.char.add(np.char.add(np.char.zfill(month, 2), "/"),
+                           np.char.add(np.char.add(np.char.zfill(day, 2), "/"), year))
+
+
+def check_times(values):
+    """Validates HH:MM:SS times; returns (ok, times zero-padded to HH:MM:SS)."""
+    (hours, minutes, seconds), ok = split_fields(values, ":", 3)
+    ok &= digits(hours, 2) & digits(minutes, 2) & digits(seconds, 2)
+    ok &= (as_int(minutes, ok) < 60) & (as_int(seconds, ok) < 60)
+    return ok, np.char.add(np.char.add(np.char.zfill(hours, 2), ":"),
+                           np.char.add(np.char.add(np.char.zfill(minutes, 2), ":"), np.char.zfill(seconds, 2)))
+
+
+def check_counts(values):
+    """Validates whole, non-negative counts; returns (ok, counts)."""
+    ok = digits(values, 9)
+    return ok, as_int(values, ok)
+
+
+def check_decimals(values):
+    """Validates non-negative decimal numbers such as 3, 3.5 or .5; returns (ok, numbers)."""
+    ok = (np.char.count(values, ".") <= 1) & digits(np.char.replace(values, ".", "", 1), 12)
+    return ok, np.where(ok, values, "0").astype(np.float64)
+
+
+def check_lap_splits(values):
+    """Validates optional lap splits: increasing seconds separated by semicolons; returns (ok, splits)."""
+    ok = np.ones(len(values), dtype=bool)
+    splits = values.astype(object)
+    for i in np.flatnonzero(values != "").tolist():  # Only runs with laps have splits to parse
+        try:
+            splits[i] = results_store.format_lap_splits(results_store.parse_lap_splits(values[i]))
+        except ValueError:
+            ok[i] = False
+    return ok, splits
+
+
+def validate_rows(rows, headers):
+    """Checks every row against the layout `headers` in one pass per column.
+
+    Returns (valid rows as layout rows with converted values, errors), where
+    errors is a list of (row index, message) for the rows that were rejected.
+    """
+    width = len(headers)
+    has_time = "Stopwatch Time" in headers
+    required = np.array([header not in results_store.OPTIONAL_HEADERS for header in headers])
+    words_column = 2 if has_time else 1
+    if not rows:
+        return [], []
+    padded = [(list(row) + [""] * width)[:width] for row in rows]
+    cells = np.char.strip(np.array(padded, dtype=str).reshape(-1, width))
+    extra = np.array([any(str(cell).strip() for cell in row[width:]) for row in rows])
+
+    date_ok, dates = check_dates(cells[:, 0])
+    words_ok, words = check_counts(cells[:, words_column])
+    chars_ok, chars = check_counts(cells[:, words_column + 1])
+    cps_ok, cps = check_decimals(cells[:, words_column + 2])
+    checks = [
+        ((cells[:, required] != "").all(axis=1), f"every one of the {required.sum()} required columns needs a value"),
+        (~extra, f"more than {width} columns"),
+        (date_ok, "date must be a real MM/DD/YYYY date"),
+        (words_ok, "words must be a whole number"),
+        (chars_ok, "characters must be a whole number"),
+        (cps_ok, "characters per second must be a number"),
+    ]
+    if has_time:
+        time_ok, times = check_times(cells[:, 1])
+        checks.insert(3, (time_ok, "stopwatch time must be HH:MM:SS"))
+    has_laps = "Lap Splits" in headers
+    if has_laps:
+        laps_ok, laps = check_lap_splits(cells[:, list(headers).index("Lap Splits")])
+        checks.append((laps_ok, "lap splits must be increasing seconds separated by semicolons"))
+
+    valid = np.logical_and.reduce([ok for ok, _ in checks])
+    errors = [(i, "; ".join(message for ok, message in checks if not ok[i])) for i in np.flatnonzero(~valid).tolist()]
+
+    columns = [dates, words, chars, cps]
+    if has_time:
+        columns.insert(1, times)
+    if has_laps:
+        columns.append(laps)
+    return [list(row) for row in zip(*(column[valid].tolist() for column in columns))], errors
+
+
+def import_text(text, store):
+    """Parses, validates and stores a table of results.
+
+    Returns (rows added, duplicates skipped, errors as (line number, message)).
+    """
+    rows, line_numbers = parse_table(text, store.headers)
+    valid_rows, errors = validate_rows(rows, store.headers)
+    added = store.append_many(valid_rows, skip_duplicates=True) if valid_rows else 0
+    return added, len(valid_rows) - added, [(line_numbers[i], message) for i, message in errors]
+
+
+class BulkImportWindow(window_manager.ManagedWindow):
+    """Window for pasting or loading a whole table of results at once."""
+
+    def __init__(self, master, test_type):
+        """Initialize the import window for one test type."""
+        super().__init__(master)
+        self.title("Bulk Import")
+        self.configure(bg=BG_COLOR)
+        self.test_type = test_type
+        self.store = master.results_stores[test_type]
+
+        tk.Label(self, text="Paste results below, one test per line, or load a CSV file.", bg=BG_COLOR).pack(pady=5)
+        tk.Label(self, text="Columns: " + ", ".join(self.store.headers), bg=BG_COLOR, wraplength=480).pack()
+        self.text_box = tk.Text(self, height=12, width=60)
+        self.text_box.pack(padx=10, pady=5)
+        self.status_label = tk.Label(self, bg=BG_COLOR, justify=tk.LEFT, wraplength=480)
+        self.status_label.pack(padx=10)
+
+        buttons = tk.Frame(self, bg=BG_COLOR)
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Load CSV...", command=self.load_csv, bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR).pack(side=tk.LEFT, padx=5)
+        self.import_button = tk.Button(buttons, text="Import", command=self.import_results, bg=BUTTON_COLOR,
+                                       fg=TEXT_COLOR)
+        self.import_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Go Back", command=self.close, bg=BUTTON_COLOR, fg=TEXT_COLOR).pack(side=tk.LEFT, padx=5)
+
+    def reset(self):
+        """Clears the pasted table and the last report."""
+        self.text_box.delete("1.0", tk.END)
+        self.status_label.config(text="")
+        self.import_button.config(state=tk.NORMAL)
+
+    def load_csv(self):
+        """Reads a CSV file into the text box so it can be checked before importing."""
+        path = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Could not read {path}: {e}", parent=self)
+            return
+        self.text_box.delete("1.0", tk.END)
+        self.text_box.insert("1.0", text)
+
+    def import_results(self):
+        """Stores the valid rows on the writer thread and reports the rows that were rejected."""
+        text = self.text_box.get("1.0", "end-1c")
+        outcome = {}
+
+        def run():
+            outcome["result"] = import_text(text, self.store)
+
+        try:
+            self.master.results_writer.call(run, lambda error: self.on_imported(error, outcome.get("result")))
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        self.import_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Importing...")
+
+    def on_imported(self, error, result):
+        """Shows how many rows were added, skipped and rejected."""
+        if not self.winfo_exists():
+            return
+        self.import_button.config(state=tk.NORMAL)
+        if error is not None:
+            self.status_label.config(text=f"Could not import results: {error}")
+            return
+        added, duplicates, errors = result
+        lines = [f"Added {added} results, skipped {duplicates} duplicates, rejected {len(errors)} rows."]
+        lines += [f"Line {number}: {message}" for number, message in errors[:MAX_ERRORS_SHOWN]]
+        if len(errors) > MAX_ERRORS_SHOWN:
+            lines.append(f"... and {len(errors) - MAX_ERRORS_SHOWN} more")
+        self.status_label.config(text="\n".join(lines))
+        if not errors:
+            self.text_box.delete("1.0", tk.END)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV file of typing test results.")
+    parser.add_argument("csv", help="CSV file, or - to read from standard input")
+    parser.add_argument("test_type", choices=sorted(results_store.LAYOUTS))
+    parser.add_argument("--database", default=results_store.DATABASE_FILENAME)
+    args = parser.parse_args(argv)
+
+    if args.csv == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.csv, newline="", encoding="utf-8-sig") as f:
+            text = f.read()
+    store = results_store.SQLiteResultsStore(args.database, args.test_type)
+    added, duplicates, errors = import_text(text, store)
+    store.close()
+    for number, message in errors:
+        print(f"Line {number}: {message}", file=sys.stderr)
+    print(f"Added {added} results, skipped {duplicates} duplicates, rejected {len(errors)} rows.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
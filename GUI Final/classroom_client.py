@@ -0,0 +1,184 @@
+"""Thin client mode: take the one-minute test as part of a classroom session.
+
+The window is the normal typing test, except that the instructor's server
+starts the test and scores it. Key events are streamed to the server in
+small batches while the student types; the network runs on a background
+asyncio thread and hands messages to the Tk thread through an after() poll,
+like the results writer does.
+"""
+import asyncio
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import messagebox
+
+import session_server  # Message types and the client side of the protocol
+import typing_test  # The window the classroom test is taken in
+
+POLL_MS = 50  # How often the Tk thread collects messages from the server
+STREAM_MS = 200  # How often new key events are sent while the test runs
+
+
+class SessionClient:
+    """Connection to a session server, run on its own thread.
+
+    `on_message(kind, message)` is called on the Tk thread for the WELCOME
+    message and every START, RESULT and ERROR message; START messages carry
+    the start time already converted to the local clock as
+    `local_start_unix_ns`. Only one-minute tests can be taken in the
+    classroom window, so a server running any other test type is reported
+    as an ERROR and the connection is closed.
+    """
+
+    def __init__(self, root, host, port, name, on_message):
+        """Connect in the background and start delivering messages to `on_message`."""
+        self.root = root
+        self.on_message = on_message
+        self.incoming = queue.SimpleQueue()
+        self.connection = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._run(host, port, name),),
+                                       name="session-client", daemon=True)
+        self.thread.start()
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    async def _run(self, host, port, name):
+        """Connects and forwards server messages until the connection closes."""
+        try:
+            self.connection = await session_server.SessionConnection.connect(host, port, name)
+            test_type = self.connection.welcome.get("test_type")
+            if test_type != "OneMinute":
+                self.incoming.put((session_server.ERROR, {
+                    "message": f"This classroom runs a {test_type} test; only one-minute tests are supported."}))
+                self.connection.close()
+                return
+            self.incoming.put((session_server.WELCOME, self.connection.welcome))
+            while True:
+                kind, message = await self.connection.read()
+                if kind == session_server.START:
+                    message["local_start_unix_ns"] = self.connection.local_time(message["start_at_unix_ns"])
+                if kind in (session_server.START, session_server.RESULT, session_server.ERROR):
+                    self.incoming.put((kind, message))
+        except asyncio.CancelledError:
+            pass  # Closed by close()
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            self.incoming.put((session_server.ERROR, {"message": f"Lost the connection to the server: {e}"}))
+
+    def _send(self, make_frame):
+        """Runs `make_frame` on the network thread, once connected."""
+        def send():
+            if self.connection is not None:
+                make_frame(self.connection)
+
+        self.loop.call_soon_threadsafe(send)
+
+    def send_keys(self, timestamps, keysyms, actions):
+        """Queues one batch of key events; `timestamps` are ns since the test started."""
+        self._send(lambda connection: connection.send_keys(timestamps, keysyms, actions))
+
+    def send_done(self, elapsed_ns):
+        """Tells the server the test is over."""
+        self._send(lambda connection: connection.send_done(elapsed_ns))
+
+    def _poll(self):
+        """Delivers received messages to the window on the Tk thread."""
+        while True:
+            try:
+                kind, message = self.incoming.get_nowait()
+            except queue.Empty:
+                break
+            self.on_message(kind, message)
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def close(self):
+        """Stops polling and closes the connection."""
+        self.root.after_cancel(self._poll_id)
+
+        def stop():
+            if self.connection is not None:
+                self.connection.close()
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(stop)
+        self.thread.join(timeout=1)
+
+
+class ClassroomTestWindow(typing_test.TypingTestWindow):
+    """Typing test started and scored by the classroom server, which also sets its length."""
+
+    def __init__(self, master, host, port, name):
+        """Initialize the window and connect to the server at `host`:`port`."""
+        super().__init__(master)
+        self.title(f"Classroom Typing Test - {name}")
+        self.start_button.pack_forget()  # The instructor starts the test
+        self.status_label = tk.Label(self, text=f"Connecting to {host}:{port}...", bg=typing_test.BG_COLOR,
+                                     fg=typing_test.TEXT_COLOR)
+        self.status_label.pack(before=self.timer_label)
+        self.text_box.config(state=tk.DISABLED)
+        self.sent = 0  # Key events already sent to the server
+        self.client = SessionClient(self, host, port, name, self.on_message)
+
+    def on_message(self, kind, message):
+        """Handles a message from the server."""
+        if kind == session_server.WELCOME:
+            self.status_label.config(text="Waiting for the instructor to start the test...")
+            self.set_duration(message["duration_ms"])
+        elif kind == session_server.START:
+            delay_ms = max(0, (message["local_start_unix_ns"] - time.time_ns()) // 1_000_000)
+            self.status_label.config(text=f"Get ready! The test starts in {delay_ms / 1000:.0f} seconds.")
+            self.timer.stop()
+            self.set_duration(message["duration_ms"])  # Ends the test at the server's deadline
+            self.text_box.config(state=tk.NORMAL)
+            self.text_box.delete("1.0", tk.END)
+            self.text_box.config(state=tk.DISABLED)
+            self.after(delay_ms, self.begin)
+        elif kind == session_server.RESULT:
+            self.status_label.config(text="Waiting for the next test...")
+            messagebox.showinfo("Typing Test Results",
+                                f"Words typed: {message['words']}\nCharacters typed: {message['characters']}\n"
+                                f"Characters per second: {message['chars_per_sec']:.2f}\n"
+                                f"Words per minute: {message['wpm']:.0f}", parent=self)
+        else:
+            self.status_label.config(text=message.get("message", "Server error"))
+
+    def begin(self):
+        """Starts the test at the synchronized start time."""
+        self.status_label.config(text="Type!")
+        self.text_box.config(state=tk.NORMAL)
+        self.text_box.focus_set()
+        self.sent = 0
+        self.start_typing_test()
+        self.after(STREAM_MS, self.stream)
+
+    def send_new_keys(self):
+        """Sends the key events recorded since the last batch."""
+        count = self.keystrokes.count
+        if count == self.sent:
+            return
+        timestamps, keysyms, actions = self.keystrokes.events_since(self.sent)
+        origin_ns = self.timer.start_ns
+        self.client.send_keys([timestamp - origin_ns for timestamp in timestamps], keysyms, actions)
+        self.sent = count
+
+    def stream(self):
+        """Sends new key events every STREAM_MS while the test runs."""
+        self.send_new_keys()
+        if self.timer.running:
+            self.after(STREAM_MS, self.stream)
+
+    def calculate_results(self, elapsed_ns):
+        """Sends the last key events and lets the server score the test."""
+        self.update_timer(elapsed_ns)
+        self.send_new_keys()
+        self.client.send_done(elapsed_ns)
+        self.text_box.config(state=tk.DISABLED)
+        self.status_label.config(text="Scoring...")
+
+    def close(self):
+        """Leaves the classroom session; the window is rebuilt if the student joins again."""
+        self.client.close()
+        self.cancel_pending()
+        self.destroy()
@@ -0,0 +1,156 @@
+"""Highlights typing errors in a Text widget without re-tagging the whole text.
+
+The characters tagged "typo" are the ones the AccuracyTracker's alignment
+counts as errors: typed in place of another passage character, typed
+extra, or typed right after passage characters that were left out. A
+skipped or doubled letter therefore marks one character, as the error
+count does, not everything after it.
+
+Every character before the clean offset, kept in a Tk mark so it moves
+with the text, is known to be tagged correctly. After an edit the tracker
+reports the first character whose alignment may have changed:
+
+- Typing at the end retags the few characters from there and moves the
+  mark along.
+- An edit in the middle pulls the mark back, because every later
+  character may now line up with a different passage character.
+
+The visible part of the dirty region is retagged as soon as the view
+changes. The rest is cleaned CLEAN_CHUNK characters at a time in the
+background, so the work per key press does not grow with the length of
+the passage.
+
+Mismatches are tagged as whole runs and Tk merges touching ranges of the
+same tag, so there is one tag range per run of wrong characters.
+"""
+import tkinter as tk
+
+TAG = "typo"
+CLEAN_MARK = "typo_clean"
+CLEAN_CHUNK = 2000  # Characters retagged per background step
+CLEAN_DELAY_MS = 1  # Pause between background steps, so key events are handled in between
+TYPO_COLOR = "#B00020"
+
+
+class ErrorHighlighter:
+    """Keeps the "typo" tag of a Text widget in step with an AccuracyTracker's typed text and passage."""
+
+    def __init__(self, window, widget, tracker):
+        """Initialize the highlighter; `window` schedules the background work, so closing it cancels that work."""
+        self.window = window
+        self.widget = widget
+        self.tracker = tracker
+        self.clean = 0  # Characters before this offset are tagged correctly
+        self._clean_id = None
+        self._refresh_id = None
+        widget.tag_configure(TAG, foreground=TYPO_COLOR, underline=True)
+        widget.mark_set(CLEAN_MARK, "1.0")
+        widget.mark_gravity(CLEAN_MARK, tk.LEFT)  # Text typed at the mark goes after it
+        self._previous_yscroll = widget.cget("yscrollcommand")
+        widget.configure(yscrollcommand=self._on_view_change)
+
+    def reset(self, tracker):
+        """Starts over for a new tracker, e.g. after a new passage was shown."""
+        for after_id in (self._clean_id, self._refresh_id):
+            if after_id is not None:
+                self.window.after_cancel(after_id)  # Would retag against the old tracker
+        self.tracker = tracker
+        self._clean_id = None
+        self._refresh_id = None
+        tracker.align()
+        self.clean = 0
+        self.widget.mark_set(CLEAN_MARK, "1.0")
+        self.widget.tag_remove(TAG, "1.0", tk.END)
+        self._schedule_clean()
+
+    def on_insert(self, index, offset, count):
+        """Tags `count` characters inserted at `index`, which is character `offset`."""
+        index = self.widget.index(index)
+        first = min(self.tracker.align(), offset)  # Characters before `first` keep their tags
+        end = offset + count
+        if first <= self.clean and end - first <= CLEAN_CHUNK:
+            # The new characters and the ones whose alignment changed show up right away
+            self._retag(f"{index}-{offset - first}c", first, end)
+            self.clean = end  # Anything after the insert moved and is dirty
+            self.widget.mark_set(CLEAN_MARK, f"{index}+{count}c")
+        else:
+            self._retag(index, offset, end)
+            if first < self.clean:
+                self.clean = first
+                self.widget.mark_set(CLEAN_MARK, f"{index}-{offset - first}c")
+        self._schedule_clean()
+        self._schedule_refresh()
+
+    def on_delete(self, index, offset):
+        """Marks the text after a deletion at `index`, which is character `offset`, as dirty."""
+        first = min(self.tracker.align(), offset)
+        if first < self.clean:
+            self.clean = first
+            self.widget.mark_set(CLEAN_MARK, f"{index}-{offset - first}c")
+            self._schedule_clean()
+        self._schedule_refresh()
+
+    def _count(self, index1, index2):
+        """Returns the number of characters from `index1` to `index2`."""
+        count = self.widget.count(index1, index2, "chars")
+        return count[0] if count else 0
+
+    def _retag(self, start_index, start, end):
+        """Retags characters `start` to `end`, where `start` is at `start_index`."""
+        wrong = self.tracker.wrong
+        widget = self.widget
+        widget.tag_remove(TAG, start_index, f"{start_index}+{end - start}c")
+        run = None  # Offset of the first wrong character of the current run
+        limit = min(end, len(wrong))
+        for i in range(start, limit):
+            if wrong[i]:
+                if run is None:
+                    run = i
+            elif run is not None:
+                widget.tag_add(TAG, f"{start_index}+{run - start}c", f"{start_index}+{i - start}c")
+                run = None
+        if run is not None:
+            widget.tag_add(TAG, f"{start_index}+{run - start}c", f"{start_index}+{limit - start}c")
+
+    def _schedule_clean(self):
+        if self._clean_id is None and self.clean < len(self.tracker.typed):
+            self._clean_id = self.window.after(CLEAN_DELAY_MS, self._clean_step)
+
+    def _clean_step(self):
+        """Retags the next CLEAN_CHUNK dirty characters."""
+        self._clean_id = None
+        end = min(len(self.tracker.typed), self.clean + CLEAN_CHUNK)
+        start_index = self.widget.index(CLEAN_MARK)
+        self._retag(start_index, self.clean, end)
+        self.widget.mark_set(CLEAN_MARK, f"{start_index}+{end - self.clean}c")
+        self.clean = end
+        self._schedule_clean()
+
+    def _on_view_change(self, first, last):
+        """yscrollcommand: called by Tk whenever the visible part of the text changes."""
+        if self._previous_yscroll:
+            self.widget.tk.eval(f"{self._previous_yscroll} {first} {last}")
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._refresh_id is None:
+            self._refresh_id = self.window.after(0, self._refresh)
+
+    def _refresh(self):
+        """Retags the visible characters that are still dirty."""
+        self._refresh_id = None
+        widget = self.widget
+        if self.clean >= len(self.tracker.typed):
+            return
+        bottom = widget.index(f"@{widget.winfo_width()},{widget.winfo_height()} lineend")
+        if widget.compare(bottom, "<=", CLEAN_MARK):
+            return
+        top = widget.index("@0,0")
+        from_clean = widget.compare(top, "<=", CLEAN_MARK)
+        start_index = widget.index(CLEAN_MARK) if from_clean else top
+        start = self.clean + self._count(CLEAN_MARK, start_index)
+        end = min(start + self._count(start_index, bottom), len(self.tracker.typed))
+        self._retag(start_index, start, end)
+        if from_clean:
+            self.widget.mark_set(CLEAN_MARK, f"{start_index}+{end - start}c")
+            self.clean = end
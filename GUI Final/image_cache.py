@@ -0,0 +1,38 @@
+import hashlib  # Cache keys are derived from the source image contents
+import os
+import tkinter as tk
+
+import instrumentation  # Optional timing of image loads
+
+# Folder next to the app that holds pre-resized images
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image_cache")
+
+
+def cached_path(path, size):
+    """Returns the cache file for `path` resized to `size`, keyed by the source hash and size."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}_{size[0]}x{size[1]}.png")
+
+
+@instrumentation.timed("image_load")
+def load_photo(master, path, size=None):
+    """Loads a PNG as a Tk PhotoImage, optionally resized to `size` (width, height).
+
+    Tk reads PNG files itself, so Pillow is only imported the first time a
+    resized copy has to be made; after that the copy is read from the cache.
+    """
+    if size is None:
+        return tk.PhotoImage(master=master, file=path)
+
+    cache_file = cached_path(path, size)
+    if not os.path.exists(cache_file):
+        # pip install pillow
+        from PIL import Image
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_file = cache_file + ".tmp"
+        with Image.open(path) as image:
+            image.resize(size).save(temp_file, format="PNG")
+        os.replace(temp_file, cache_file)
+    return tk.PhotoImage(master=master, file=cache_file)
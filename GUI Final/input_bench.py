@@ -0,0 +1,332 @@
+"""Keystroke-replay benchmark for the typing and stopwatch test windows.
+
+Usage:
+    python input_bench.py --rates 5 10 20 50 --seconds 10 --output input_bench.json
+    python input_bench.py --headless --baseline last_release.json
+
+A synthetic typist types the reference passages at each rate, making a
+typo and correcting it with BackSpace now and then. Window latency needs
+a display (for example xvfb-run): the keys are sent to the real windows
+with event_generate. Without a display, or with --headless, window
+latency is skipped and the same key stream measures the scoring path
+alone: the keystroke recorder, the running word and character counts and
+the accuracy tracker, fed the edits the keys make.
+
+For every window and rate the JSON output holds the key event handling
+time, how late the paced key events and the timer ticks ran, the cost of
+scoring the finished test and the Python memory used. --baseline compares
+the run with an earlier output file and exits with status 1 when a
+latency or scoring figure got more than --tolerance slower. The two modes
+measure different work, so runs are only compared with a baseline of the
+same mode.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tkinter as tk
+import tracemalloc
+
+# pip install numpy
+import numpy as np
+
+import accuracy  # Error counting against the reference passage
+import keystroke_capture  # Timestamped key event recording
+import scoring  # Word and character counting
+import timer_scheduler  # Drift-free timer of the test windows
+import typing_test  # One-minute test window and its passages
+
+WINDOWS = ("typing", "stopwatch")
+DEFAULT_RATES = (5, 10, 20, 50)  # Key presses per second; 10 is about 120 WPM
+TYPO_RATE = 0.03  # Share of characters typed wrong and corrected with BackSpace
+TICK_MS = 1000  # Timer period of both windows
+
+# Tk keysym names of the characters in the passages that are not letters or digits
+KEYSYM_NAMES = {" ": "space", ".": "period", ",": "comma", "!": "exclam", "?": "question", "'": "apostrophe",
+                "-": "minus", ";": "semicolon", ":": "colon"}
+BACKSPACE = (scoring.KEYSYM_BACKSPACE, "BackSpace", None)
+
+# Figures compared against --baseline; larger is worse for all of them
+REGRESSION_KEYS = ("event_p50_us", "event_p99_us", "feed_lateness_p99_ms", "scoring_ms", "memory_peak_kib")
+
+
+def synthetic_keys(rate, seconds, seed=0):
+    """Returns (keysym, Tk keysym name, character or None for BackSpace) for every press of a run."""
+    rng = random.Random(seed)
+    text = " ".join(typing_test.PASSAGES)
+    keys = []
+    i = 0
+    while len(keys) < rate * seconds:
+        char = text[i % len(text)]
+        i += 1
+        if char.isalpha() and rng.random() < TYPO_RATE:
+            typo = rng.choice("asdfjkl")
+            keys += [(ord(typo), typo, typo), BACKSPACE]
+        keys.append((ord(char), KEYSYM_NAMES.get(char, char), char))
+    return keys[:int(rate * seconds)]
+
+
+def percentile_summary(values, prefix, unit, scale):
+    """Returns the median, p99 and maximum of `values` divided by `scale`, named like "event_p99_us"."""
+    p50, p99, top = (np.percentile(values, [50, 99, 100]) / scale) if len(values) else (0.0, 0.0, 0.0)
+    return {f"{prefix}_p50_{unit}": float(p50), f"{prefix}_p99_{unit}": float(p99), f"{prefix}_max_{unit}": float(top)}
+
+
+class ScoringTarget:
+    """The scoring path of a test window, fed by an edit script instead of a widget.
+
+    Every key press is recorded by a KeystrokeRecorder and turned into the
+    insert or delete at the end of the text that Tk's Text bindings would
+    make. The edit goes to an IncrementalTextCounter and, for the typing
+    test, to an AccuracyTracker together with the incremental alignment the
+    error highlighting reads. The timer ticks on a bare Tcl interpreter and
+    computes the live speed like the windows' ticks do. Nothing is shown, so
+    the figures are the cost of scoring, not of a window.
+    """
+
+    def __init__(self, window):
+        """Initialize empty totals for a test of type `window`."""
+        self.widget = tk.Tcl()  # Runs the timer and the paced key callbacks
+        self.typed = []
+        self.keystrokes = keystroke_capture.KeystrokeRecorder()
+        self.counter = scoring.IncrementalTextCounter()
+        self.accuracy = accuracy.AccuracyTracker(typing_test.PASSAGES[0]) if window == "typing" else None
+        self.live_speed = ""
+        self.timer = timer_scheduler.TickScheduler(self.widget, TICK_MS, self.tick)
+
+    def tick(self, elapsed_ns):
+        """Computes the live speed a window shows on every timer tick."""
+        elapsed_time = elapsed_ns / 1e9
+        cps = scoring.chars_per_second(self.counter.characters, elapsed_time)
+        if self.accuracy is None:
+            self.live_speed = f"{scoring.format_hms(elapsed_time)}  CPS: {cps:.2f}"
+        else:
+            wpm = scoring.words_per_minute(self.counter.words, elapsed_time)
+            self.live_speed = f"WPM: {wpm:.0f}  CPS: {cps:.2f}  Errors: {self.accuracy.errors()}"
+
+    def press(self, key):
+        """Records one key press and release and scores the edit it makes."""
+        keysym, _, char = key
+        self.keystrokes.record(keysym, 0, keystroke_capture.PRESS)
+        left = self.typed[-1] if self.typed else ""
+        if char is None:
+            if self.typed:
+                removed = self.typed.pop()
+                self.counter.on_delete(self.typed[-1] if self.typed else "", removed, "")
+                if self.accuracy is not None:
+                    self.accuracy.delete(len(self.typed), 1)
+                    self.accuracy.align()
+        else:
+            self.typed.append(char)
+            self.counter.on_insert(left, char, "")
+            if self.accuracy is not None:
+                self.accuracy.insert(len(self.typed) - 1, char)
+                self.accuracy.align()
+        self.keystrokes.record(keysym, 0, keystroke_capture.RELEASE)
+
+    def pump(self):
+        """Runs pending timer and key callbacks; a bare interpreter has no event loop of its own."""
+        self.widget.dooneevent()
+
+    def close(self):
+        """Stops the timer."""
+        self.timer.stop()
+
+
+class WindowTarget:
+    """A real test window receiving generated key events."""
+
+    def __init__(self, root, window):
+        """Open a window of type `window` and start its test."""
+        import stopwatch_test  # Only needed with a display
+        self.widget = root
+        if window == "typing":
+            self.window = typing_test.TypingTestWindow(root)
+            self.window.start_typing_test()
+        else:
+            self.window = stopwatch_test.StopwatchTestWindow(root)
+            self.window.start_stopwatch()
+        self.keystrokes = self.window.keystrokes
+        self.counter = self.window.counter
+        self.accuracy = getattr(self.window, "accuracy", None)
+        self.timer = self.window.timer
+        self.text_box = self.window.text_box
+        self.window.update()
+        self.text_box.focus_force()
+
+    def press(self, key):
+        """Sends one key press and release through Tk's bindings; each is handled before returning."""
+        _, name, char = key
+        state = 1 if char is not None and char.isupper() else 0  # Shift
+        self.text_box.event_generate("<KeyPress>", keysym=name, state=state)
+        self.text_box.event_generate("<KeyRelease>", keysym=name, state=state)
+
+    def pump(self):
+        """Runs one pass of the Tk event loop."""
+        self.widget.update()
+
+    def close(self):
+        """Stops the test without showing its results and destroys the window."""
+        self.window.cancel_pending()
+        self.timer.stop()
+        self.window.destroy()
+
+
+def score(target):
+    """Scores a finished run the way the test windows and the classroom server do, and returns the results.
+
+    The server scores the recorded key events, so its totals must match
+    the window's running counts.
+    """
+    results = scoring.score_counts(target.counter.words, target.counter.characters, target.timer.elapsed_ns() / 1e9)
+    if target.accuracy is not None:
+        results["net_wpm"] = accuracy.net_words_per_minute(results["wpm"], target.accuracy.errors(),
+                                                           results["seconds"])
+    timestamps, keysyms, actions = target.keystrokes.snapshot()
+    server = scoring.score_text(scoring.text_from_keystrokes(keysyms, actions), results["seconds"])
+    assert (server["words"], server["characters"]) == (results["words"], results["characters"]), \
+        f"Server scored {server['words']} words, {server['characters']} characters; " \
+        f"the window counted {results['words']}, {results['characters']}"
+    return results
+
+
+def replay(target, keys, rate):
+    """Types `keys` into `target` at `rate` presses per second; returns (handling ns, lateness ns) per key."""
+    interval_ns = int(1e9 / rate)
+    handling = np.zeros(len(keys), dtype=np.int64)
+    lateness = np.zeros(len(keys), dtype=np.int64)
+    start_ns = time.perf_counter_ns()
+    target.timer.start()
+    sent = 0
+
+    def send():
+        nonlocal sent
+        now = time.perf_counter_ns()
+        lateness[sent] = now - (start_ns + sent * interval_ns)
+        target.press(keys[sent])
+        handling[sent] = time.perf_counter_ns() - now
+        sent += 1
+        if sent < len(keys):
+            target.widget.after(max(0, (start_ns + sent * interval_ns - time.perf_counter_ns()) // 1_000_000), send)
+
+    target.widget.after(0, send)
+    while sent < len(keys):
+        target.pump()
+    return handling, lateness
+
+
+def run_case(window, rate, seconds, root=None):
+    """Benchmarks one window at one rate and returns its figures."""
+    keys = synthetic_keys(rate, seconds)
+
+    def make_target():
+        return ScoringTarget(window) if root is None else WindowTarget(root, window)
+
+    target = make_target()
+    handling, lateness = replay(target, keys, rate)
+    started = time.perf_counter_ns()
+    results = score(target)
+    scoring_ns = time.perf_counter_ns() - started
+    jitter = target.timer.jitter_report()
+    target.close()
+
+    # Memory is measured on a second, identical run so tracemalloc does not slow the timed one
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    target = make_target()
+    replay(target, keys, rate)
+    score(target)
+    current, peak = tracemalloc.get_traced_memory()
+    target.close()
+    tracemalloc.stop()
+
+    case = {"window": window, "rate": rate, "presses": len(keys), "typed_characters": results["characters"]}
+    case.update(percentile_summary(handling, "event", "us", 1000))
+    case.update(percentile_summary(lateness, "feed_lateness", "ms", 1e6))
+    case["timer_mean_jitter_ms"] = jitter["mean_jitter_ms"]
+    case["timer_max_jitter_ms"] = jitter["max_jitter_ms"]
+    case["timer_missed_ticks"] = jitter["missed_ticks"]
+    case["scoring_ms"] = scoring_ns / 1e6
+    case["memory_peak_kib"] = (peak - before) / 1024
+    case["memory_retained_kib"] = (current - before) / 1024
+    return case
+
+
+def compare(cases, baseline, tolerance):
+    """Returns a line for every figure more than `tolerance` worse than in `baseline`."""
+    previous = {(case["window"], case["rate"]): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in cases:
+        old = previous.get((case["window"], case["rate"]))
+        if old is None:
+            continue
+        for key in REGRESSION_KEYS:
+            if old.get(key, 0) > 0 and case[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{case['window']} at {case['rate']}/s: {key} {old[key]:.2f} -> {case[key]:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the test windows with synthetic keystrokes.")
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="key presses per second")
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of each run")
+    parser.add_argument("--windows", nargs="+", choices=WINDOWS, default=WINDOWS)
+    parser.add_argument("--headless", action="store_true",
+                        help="measure only the scoring path, even with a display")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="earlier JSON output to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against --baseline")
+    args = parser.parse_args(argv)
+
+    root = None
+    if not args.headless:
+        try:
+            root = tk.Tk()
+            root.withdraw()
+        except tk.TclError:
+            print("No display: skipping window latency, which needs one (for example xvfb-run), "
+                  "and measuring the scoring path only", file=sys.stderr)
+
+    cases = []
+    for window in args.windows:
+        for rate in args.rates:
+            case = run_case(window, rate, args.seconds, root)
+            cases.append(case)
+            print(f"{window:9} {rate:6g}/s  event p50 {case['event_p50_us']:7.1f} us  p99 {case['event_p99_us']:7.1f} us"
+                  f"  feed p99 {case['feed_lateness_p99_ms']:6.2f} ms  tick jitter {case['timer_max_jitter_ms']:6.2f} ms"
+                  f"  scoring {case['scoring_ms']:6.2f} ms  peak {case['memory_peak_kib']:7.1f} KiB")
+    if root is not None:
+        root.destroy()
+
+    results = {
+        "mode": "scoring" if root is None else "gui",
+        "seconds": args.seconds,
+        "python": platform.python_version(),
+        "tk": tk.TkVersion,
+        "platform": platform.platform(),
+        "cases": cases,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("mode") != results["mode"]:
+            print(f"The baseline was measured in {baseline.get('mode')} mode, this run in {results['mode']} mode;"
+                  " not compared", file=sys.stderr)
+            return 2
+        regressions = compare(cases, baseline, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Opt-in timing of the app's hot paths and of Tk event-loop lag.
+
+Set TYPING_APP_METRICS to a file name to turn it on:
+
+    TYPING_APP_METRICS=metrics.prom python main.py    # Prometheus text format
+    TYPING_APP_METRICS=metrics.json python main.py    # JSON
+
+While the app runs, every timed function, measure() block and window
+after() callback adds its duration to a histogram, and an after() probe
+records how late the event loop wakes up. The file is rewritten every
+EXPORT_INTERVAL_MS and when the app closes.
+
+When the variable is not set, timed() returns the function unchanged and
+measure() returns a shared do-nothing context manager, so the only cost
+left in the app is a module attribute check.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+ENV_VAR = "TYPING_APP_METRICS"
+METRICS_PATH = os.environ.get(ENV_VAR) or None
+ENABLED = METRICS_PATH is not None
+
+# Histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS_S = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_NS = tuple(int(bound * 1e9) for bound in BUCKETS_S)
+
+LAG_PROBE_MS = 100  # How often the event-loop lag probe wakes up
+EXPORT_INTERVAL_MS = 10_000  # How often the metrics file is rewritten
+
+DURATION_METRIC = "typing_app_duration_seconds"
+LAG_METRIC = "typing_app_loop_lag_seconds"
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Counts of durations per bucket, with their total and maximum."""
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(BUCKETS_NS) + 1)  # The last slot counts durations above every bound
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def add(self, duration_ns):
+        """Records one duration."""
+        self.counts[bisect_left(BUCKETS_NS, duration_ns)] += 1
+        self.count += 1
+        self.sum_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def quantile(self, q):
+        """Returns the upper bound in seconds of the bucket holding quantile `q`."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_S, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_ns / 1e9
+
+
+class Registry:
+    """Histograms by (metric, name), safe to update from the Tk thread and the writer thread."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, metric, name, duration_ns):
+        """Adds one duration to the histogram `metric` labelled `name`."""
+        with self.lock:
+            histogram = self.histograms.get((metric, name))
+            if histogram is None:
+                histogram = self.histograms[(metric, name)] = Histogram()
+            histogram.add(duration_ns)
+
+    def to_prometheus(self):
+        """Returns every histogram in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            items = sorted(self.histograms.items())
+            for metric in sorted({metric for metric, _ in self.histograms}):
+                lines.append(f"# TYPE {metric} histogram")
+                for (item_metric, name), histogram in items:
+                    if item_metric != metric:
+                        continue
+                    label = f'name="{name}"'
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS_S, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{metric}_sum{{{label}}} {histogram.sum_ns / 1e9:.9f}")
+                    lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        """Returns a summary of every histogram as a JSON-ready dict."""
+        with self.lock:
+            return {f"{metric}/{name}": {
+                "count": histogram.count,
+                "mean_ms": histogram.sum_ns / histogram.count / 1e6 if histogram.count else 0.0,
+                "p50_ms_at_most": histogram.quantile(0.5) * 1000,
+                "p99_ms_at_most": histogram.quantile(0.99) * 1000,
+                "max_ms": histogram.max_ns / 1e6,
+                "buckets_s": dict(zip([str(bound) for bound in BUCKETS_S] + ["+Inf"], histogram.counts)),
+            } for (metric, name), histogram in sorted(self.histograms.items())}
+
+    def write(self, path):
+        """Writes the metrics to `path`: Prometheus text for .prom files, JSON otherwise."""
+        if path.endswith(".prom"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps({"written_unix": time.time(), "metrics": self.to_json()}, indent=2)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)  # Scrapers never see a half-written file
+
+
+registry = Registry()
+
+
+def timed(name):
+    """Decorator that records the duration of every call as `name`; a no-op unless ENABLED."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(DURATION_METRIC, name, time.perf_counter_ns() - started)
+
+        return wrapper
+
+    return decorate
+
+
+class _Measure:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        registry.observe(DURATION_METRIC, self.name, time.perf_counter_ns() - self.started)
+
+
+def measure(name):
+    """Context manager that records the duration of its block as `name`; a no-op unless ENABLED."""
+    return _Measure(name) if ENABLED else _NOOP
+
+
+def callback_name(func):
+    """Histogram name of an after() callback: its qualified name, e.g. "TickScheduler._tick"."""
+    return getattr(func, "__qualname__", None) or type(func).__name__
+
+
+class LoopLagProbe:
+    """Measures how late the Tk event loop runs an after() callback that should run every `period_ms`.
+
+    The lateness of each wakeup is time the loop spent in other callbacks;
+    long ones show up directly as lag in the histogram.
+    """
+
+    def __init__(self, widget, period_ms=LAG_PROBE_MS):
+        """Initialize the probe on `widget`; call start() to begin."""
+        self.widget = widget
+        self.period_ns = period_ms * 1_000_000
+        self.period_ms = period_ms
+        self._expected_ns = None
+        self._after_id = None
+
+    def start(self):
+        """Starts probing."""
+        self._expected_ns = time.perf_counter_ns() + self.period_ns
+        self._after_id = self.widget.after(self.period_ms, self._wake)
+
+    def _wake(self):
+        now = time.perf_counter_ns()
+        registry.observe(LAG_METRIC, "tk_main", max(0, now - self._expected_ns))
+        self._expected_ns = now + self.period_ns
+        self._after_id = self.widget.after(self.period_ms, self._wake)
+
+    def stop(self):
+        """Stops probing."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+
+class Session:
+    """Lag probe plus periodic export of the metrics file for one app run."""
+
+    def __init__(self, root, path=METRICS_PATH):
+        """Start probing `root` and writing metrics to `path`."""
+        self.root = root
+        self.path = path
+        self.probe = LoopLagProbe(root)
+        self.probe.start()
+        self._export_id = root.after(EXPORT_INTERVAL_MS, self._export)
+
+    def _export(self):
+        self.write()
+        self._export_id = self.root.after(EXPORT_INTERVAL_MS, self._export)
+
+    def write(self):
+        """Rewrites the metrics file; a failed write never interrupts the app."""
+        try:
+            registry.write(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        """Stops probing and writes the final metrics."""
+        self.probe.stop()
+        self.root.after_cancel(self._export_id)
+        self.write()
+
+
+def start(root):
+    """Starts instrumenting the app whose main window is `root`; returns None unless ENABLED."""
+    return Session(root) if ENABLED else None
+
+
+# Overhead check: cost per call of a timed function, with and without instrumentation
+if __name__ == "__main__":
+    CALLS = 1_000_000
+
+    def work():
+        return None
+
+    disabled = timed("work")(work)
+    ENABLED = True  # Module global: decorate the same function as if the variable were set
+    enabled = timed("work")(work)
+    ENABLED = False
+
+    for label, func in (("plain", work), ("disabled", disabled), ("enabled", enabled)):
+        started = time.perf_counter_ns()
+        for _ in range(CALLS):
+            func()
+        print(f"{label:8}: {(time.perf_counter_ns() - started) / CALLS:.0f} ns per call")
+    print(registry.to_prometheus().splitlines()[-1])
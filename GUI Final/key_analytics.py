@@ -0,0 +1,345 @@
+"""Per-key and bigram latency analytics over saved keystroke logs.
+
+Usage:
+    python key_analytics.py keystroke_logs/ --heatmap slow_keys.png --output bigrams.csv
+
+Every press in every log is gathered into flat NumPy arrays once, and all
+statistics are computed with sorts, np.unique and bincount over those
+arrays; there are no per-keystroke Python loops. The latency of a press is
+the time since the previous character key of the same session, so it
+measures how long it took to reach that key (or, for a bigram, to go from
+the first key to the second). A key counts as an error when the next
+press is BackSpace.
+
+KeyHeatmapWindow shows the median latency of each key as a heatmap drawn
+over keyboard.png, with the slowest bigrams and error hotspots below it.
+The logs are analyzed and the heatmap is drawn on a worker thread of the
+window's own, so neither the window nor the saving of results waits for
+the analysis, however many sessions are saved.
+"""
+import argparse
+import csv
+import os
+import queue
+import sys
+import threading
+import tkinter as tk
+
+# pip install numpy
+import numpy as np
+
+import keystroke_capture  # Key event action codes
+import keystroke_log  # Binary keystroke logs
+import scoring  # Keysym constants
+import window_manager  # Reusable windows
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+KEYBOARD_IMAGE = os.path.join(ASSET_DIR, "keyboard.png")
+MIN_SAMPLES = 5  # Keys and bigrams pressed fewer times than this are left out of the rankings
+TOP_COUNT = 8  # Rows listed under the heatmap
+ANALYSIS_POLL_MS = 100  # How often the window checks whether the analysis has finished
+
+# Define constants for colors
+BG_COLOR = "#D3BDB0"
+BUTTON_COLOR = "#89937C"
+TEXT_COLOR = "white"
+
+# Keysyms of keys that only modify other keys; they are not part of the typing rhythm
+MODIFIER_KEYSYMS = range(0xFFE1, 0xFFEF)  # Shift_L .. Hyper_R, including Caps_Lock
+
+# Pixel boxes (left, top, right, bottom) of the keys in keyboard.png, row by row
+KEY_ROWS = [
+    (67, 107, [("`", 33, 73), ("1", 81, 121), ("2", 130, 170), ("3", 178, 218), ("4", 226, 267),
+               ("5", 275, 315), ("6", 323, 363), ("7", 372, 412), ("8", 420, 460), ("9", 468, 509),
+               ("0", 517, 557), ("-", 565, 605), ("=", 613, 654), (scoring.KEYSYM_BACKSPACE, 662, 733)]),
+    (113, 154, [(0xFF09, 33, 104), ("q", 109, 150), ("w", 158, 198), ("e", 207, 247), ("r", 255, 295),
+                ("t", 304, 344), ("y", 352, 392), ("u", 401, 441), ("i", 449, 489), ("o", 498, 538),
+                ("p", 546, 586), ("[", 595, 635), ("]", 643, 683), ("\\", 692, 732)]),
+    (161, 201, [(0xFFE5, 33, 123), ("a", 130, 170), ("s", 179, 219), ("d", 227, 268), ("f", 276, 316),
+                ("g", 325, 365), ("h", 374, 414), ("j", 422, 463), ("k", 471, 511), ("l", 520, 560),
+                (";", 569, 609), ("'", 617, 658), (0xFF0D, 664, 732)]),
+    (207, 247, [(0xFFE1, 33, 136), ("z", 144, 185), ("x", 193, 233), ("c", 241, 282), ("v", 290, 330),
+                ("b", 339, 379), ("n", 387, 427), ("m", 436, 476), (",", 484, 524), (".", 533, 573),
+                ("/", 581, 621), (0xFFE2, 629, 732)]),
+    (252, 292, [(0xFFE3, 33, 73), (0xFFEB, 82, 122), (0xFFE9, 179, 219), (" ", 226, 583),
+                (0xFFE4, 588, 685), (0xFFEA, 691, 732)]),
+]
+KEY_BOXES = {(ord(key) if isinstance(key, str) else key): (left, top, right, bottom)
+             for top, bottom, keys in KEY_ROWS for key, left, right in keys}
+
+# Shifted characters map to the key they are typed on
+SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+BASE_KEYSYM = np.arange(0x100, dtype=np.int64)
+BASE_KEYSYM[ord("A"):ord("Z") + 1] += ord("a") - ord("A")
+for shifted, base in SHIFTED.items():
+    BASE_KEYSYM[ord(shifted)] = ord(base)
+LOOKUP_SIZE = 0x10000  # Keysyms below this are numbered through a lookup table
+LATENCY_BITS = 40  # Latencies are capped at 2**40 ns (about 18 minutes) so a key id fits above them
+LATENCY_MASK = (1 << LATENCY_BITS) - 1
+PACKED_GROUPS = 1 << (63 - LATENCY_BITS)  # Group ids below this fit above a latency in one int64
+KEY_NAMES = {scoring.KEYSYM_BACKSPACE: "BackSpace", 0xFF09: "Tab", 0xFF0D: "Return", 0x20: "Space"}
+
+
+def key_name(keysym):
+    """Returns a short readable name for a keysym."""
+    if keysym in KEY_NAMES:
+        return KEY_NAMES[keysym]
+    char = scoring.keysym_to_char(keysym)
+    return char if char is not None else f"0x{keysym:X}"
+
+
+def gather_presses(sessions):
+    """Concatenates the character key presses of many sessions.
+
+    `sessions` is the list returned by keystroke_log.load_sessions(). Returns
+    (session, t_ns, keysym) arrays in session order; shifted characters are
+    mapped to the key they are typed on.
+    """
+    session_ids, times, keysyms = [], [], []
+    for index, (_, _, records) in enumerate(sessions):
+        keysym = records["keysym"].astype(np.int64)
+        keep = (records["action"] == keystroke_capture.PRESS) & ((keysym < MODIFIER_KEYSYMS.start) |
+                                                                 (keysym >= MODIFIER_KEYSYMS.stop))
+        session_ids.append(np.full(int(keep.sum()), index, dtype=np.int32))
+        times.append(records["t_ns"][keep])
+        keysyms.append(keysym[keep])
+    if not session_ids:
+        return np.zeros(0, np.int32), np.zeros(0, np.int64), np.zeros(0, np.int64)
+    keysym = np.concatenate(keysyms)
+    latin1 = keysym < 0x100
+    keysym[latin1] = BASE_KEYSYM[keysym[latin1]]
+    return np.concatenate(session_ids), np.concatenate(times), keysym
+
+
+def dense_ids(keysym):
+    """Numbers the distinct keysyms 0..k-1; returns (keysyms in id order, id of every press).
+
+    Nearly every keysym is below 0x10000, so those are numbered with a
+    lookup table instead of sorting millions of presses.
+    """
+    small = keysym < LOOKUP_SIZE
+    present = np.bincount(keysym[small], minlength=LOOKUP_SIZE) > 0
+    large = np.unique(keysym[~small])
+    keys = np.concatenate([np.flatnonzero(present), large])
+    ids = np.empty(len(keysym), dtype=np.int64)
+    ids[small] = (np.cumsum(present) - 1)[keysym[small]]
+    ids[~small] = np.searchsorted(large, keysym[~small]) + int(present.sum())
+    return keys, ids
+
+
+def transitions(session, t_ns, key_id):
+    """Returns (previous key id, key id, latency ns) for consecutive presses within a session."""
+    same_session = session[1:] == session[:-1]
+    return key_id[:-1][same_session], key_id[1:][same_session], (t_ns[1:] - t_ns[:-1])[same_session]
+
+
+def group_percentiles(group, group_count, values, percentiles=(50, 95)):
+    """Splits `values` by `group` (0..group_count-1) and returns (counts, one array per percentile).
+
+    Percentiles use the nearest-rank method. When the group ids leave room,
+    group and value are packed into one int64 so a single sort orders every
+    group's values at once; with more groups (bigrams of thousands of keys)
+    a lexsort on (group, value) does the same more slowly. Each group's
+    percentile is then a single fancy index. Groups with no values get 0.
+    """
+    counts = np.bincount(group, minlength=group_count)
+    if len(values) == 0:
+        return counts, *(np.zeros(group_count, dtype=np.int64) for _ in percentiles)
+    values = np.minimum(values, LATENCY_MASK)
+    if group_count <= PACKED_GROUPS:
+        ordered = np.sort((group << LATENCY_BITS) | values) & LATENCY_MASK
+    else:
+        ordered = values[np.lexsort((values, group))]
+    starts = np.cumsum(counts) - counts
+    results = []
+    for p in percentiles:
+        rank = np.maximum(np.ceil(counts * p / 100).astype(np.int64) - 1, 0)
+        results.append(np.where(counts > 0, ordered[np.minimum(starts + rank, len(ordered) - 1)], 0))
+    return counts, *results
+
+
+def key_latency(keys, current, latency):
+    """Median and 95th percentile latency to reach each key, in ns."""
+    counts, median, p95 = group_percentiles(current, len(keys), latency)
+    return {"key": keys, "count": counts, "median_ns": median, "p95_ns": p95}
+
+
+def bigram_latency(keys, previous, current, latency):
+    """Median and 95th percentile latency of each key-to-key transition, in ns."""
+    counts, median, p95 = group_percentiles(previous * len(keys) + current, len(keys) ** 2, latency)
+    seen = np.flatnonzero(counts)
+    return {"first": keys[seen // len(keys)], "second": keys[seen % len(keys)], "count": counts[seen],
+            "median_ns": median[seen], "p95_ns": p95[seen]}
+
+
+def error_hotspots(keys, session, key_id):
+    """Per-key press counts and the share of presses that were followed by BackSpace."""
+    backspace = keys[key_id] == scoring.KEYSYM_BACKSPACE
+    corrected = np.zeros(len(key_id), dtype=bool)
+    corrected[:-1] = backspace[1:] & (session[1:] == session[:-1])
+    typed = ~backspace
+    presses = np.bincount(key_id[typed], minlength=len(keys))
+    errors = np.bincount(key_id[typed], weights=corrected[typed], minlength=len(keys)).astype(np.int64)
+    seen = np.flatnonzero(presses)
+    return {"key": keys[seen], "count": presses[seen], "errors": errors[seen],
+            "error_rate": errors[seen] / presses[seen]}
+
+
+def latency_histogram(latency, bucket_ms=10, max_ms=1000):
+    """Counts of inter-key latencies in `bucket_ms` buckets; the last bucket holds everything slower."""
+    buckets = np.minimum(latency // (bucket_ms * 1_000_000), max_ms // bucket_ms)
+    return np.bincount(buckets.astype(np.int64), minlength=max_ms // bucket_ms + 1)
+
+
+def analyze(sessions):
+    """Computes every statistic for a list of loaded sessions."""
+    session, t_ns, keysym = gather_presses(sessions)
+    keys, key_id = dense_ids(keysym)
+    previous, current, latency = transitions(session, t_ns, key_id)
+    return {
+        "presses": len(keysym),
+        "latency": {
+            "median_ns": float(np.median(latency)) if len(latency) else 0.0,
+            "p95_ns": float(np.percentile(latency, 95)) if len(latency) else 0.0,
+            "histogram_10ms": latency_histogram(latency),
+        },
+        "keys": key_latency(keys, current, latency),
+        "bigrams": bigram_latency(keys, previous, current, latency),
+        "errors": error_hotspots(keys, session, key_id),
+    }
+
+
+def ranked(table, column, min_count=MIN_SAMPLES, top=TOP_COUNT):
+    """Indexes of the `top` rows with the largest `column`, among rows seen at least `min_count` times."""
+    candidates = np.flatnonzero(table["count"] >= min_count)
+    return candidates[np.argsort(table[column][candidates])[::-1][:top]]
+
+
+def render_heatmap(keys, output_path, min_count=MIN_SAMPLES):
+    """Draws each key's median latency over keyboard.png, from green (fastest) to red (slowest)."""
+    # pip install pillow
+    from PIL import Image, ImageDraw
+
+    with Image.open(KEYBOARD_IMAGE) as keyboard:
+        image = keyboard.convert("RGBA")
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+
+    shown = [i for i in np.flatnonzero(keys["count"] >= min_count) if int(keys["key"][i]) in KEY_BOXES]
+    if shown:
+        medians = keys["median_ns"][shown].astype(np.float64)
+        span = medians.max() - medians.min()
+        heat = (medians - medians.min()) / span if span else np.zeros(len(shown))
+        for i, level in zip(shown, heat):
+            colour = (int(255 * level), int(200 * (1 - level)), 0, 140)
+            draw.rounded_rectangle(KEY_BOXES[int(keys["key"][i])], radius=4, fill=colour)
+    Image.alpha_composite(image, overlay).save(output_path, format="PNG")
+
+
+def write_bigrams(bigrams, output):
+    """Writes the bigram table as CSV, slowest first."""
+    writer = csv.writer(output)
+    writer.writerow(["First", "Second", "Count", "Median ms", "P95 ms"])
+    for i in np.argsort(bigrams["median_ns"])[::-1]:
+        writer.writerow([key_name(int(bigrams["first"][i])), key_name(int(bigrams["second"][i])),
+                         int(bigrams["count"][i]), f"{bigrams['median_ns'][i] / 1e6:.1f}",
+                         f"{bigrams['p95_ns'][i] / 1e6:.1f}"])
+
+
+def summary_lines(stats):
+    """Text summary of the slowest keys, slowest bigrams and error hotspots."""
+    keys, bigrams, errors = stats["keys"], stats["bigrams"], stats["errors"]
+    lines = [f"{stats['presses']} key presses, median gap {stats['latency']['median_ns'] / 1e6:.0f} ms"]
+    lines.append("Slowest keys: " + ", ".join(
+        f"{key_name(int(keys['key'][i]))} {keys['median_ns'][i] / 1e6:.0f} ms" for i in ranked(keys, "median_ns")))
+    lines.append("Slowest bigrams: " + ", ".join(
+        f"{key_name(int(bigrams['first'][i]))}{key_name(int(bigrams['second'][i]))} "
+        f"{bigrams['median_ns'][i] / 1e6:.0f} ms" for i in ranked(bigrams, "median_ns")))
+    lines.append("Most corrected: " + ", ".join(
+        f"{key_name(int(errors['key'][i]))} {errors['error_rate'][i]:.0%}" for i in ranked(errors, "error_rate")))
+    return lines
+
+
+class KeyHeatmapWindow(window_manager.ManagedWindow):
+    """Shows the keyboard heatmap and the slowest keys of every saved session."""
+
+    def __init__(self, master, log_dir=keystroke_log.LOG_DIR):
+        """Initialize the window; call refresh() each time it is shown to analyze the latest logs."""
+        super().__init__(master)
+        self.title("Slow Keys")
+        self.configure(bg=BG_COLOR)
+        self.log_dir = log_dir
+        self.heatmap_path = os.path.join(log_dir, "heatmap.png")
+        self.analyzing = False  # True while the worker thread is analyzing the logs
+        self.outcome = queue.SimpleQueue()  # (error, stats) handed from the worker thread to the Tk thread
+        self.image_label = tk.Label(self, bg=BG_COLOR)
+        self.image_label.pack(pady=5)
+        self.summary_label = tk.Label(self, justify=tk.LEFT, wraplength=740, bg=BG_COLOR)
+        self.summary_label.pack(padx=10, pady=5)
+        tk.Button(self, text="Go Back", command=self.close, bg=BUTTON_COLOR, fg=TEXT_COLOR).pack(pady=10)
+
+    def refresh(self):
+        """Analyzes the saved keystroke logs on a worker thread, then redraws the heatmap."""
+        if not self.analyzing:
+            self.analyzing = True
+            self.summary_label.config(text="Analyzing keystroke logs...")
+            threading.Thread(target=self.analyze_logs, name="key-analytics", daemon=True).start()
+        self.after(ANALYSIS_POLL_MS, self.check_analysis)  # close() cancels the poll; refresh() restarts it
+
+    def analyze_logs(self):
+        """Analyzes every saved log and draws the heatmap; runs on the worker thread."""
+        try:
+            sessions = keystroke_log.load_sessions(self.log_dir) if os.path.isdir(self.log_dir) else []
+            stats = analyze(sessions)
+            del sessions  # Release the memory-mapped logs
+            if stats["presses"]:
+                render_heatmap(stats["keys"], self.heatmap_path)
+        except Exception as e:  # Shown in the window instead of killing the thread silently
+            self.outcome.put((e, None))
+        else:
+            self.outcome.put((None, stats))
+
+    def check_analysis(self):
+        """Shows the analysis once the worker thread has finished it."""
+        if not self.analyzing:
+            return  # Another poll already showed it
+        try:
+            error, stats = self.outcome.get_nowait()
+        except queue.Empty:
+            self.after(ANALYSIS_POLL_MS, self.check_analysis)
+            return
+        self.analyzing = False
+        if error is not None:
+            self.image_label.config(image="")
+            self.summary_label.config(text=f"Could not analyze keystroke logs: {error}")
+            return
+        if stats["presses"] == 0:
+            self.image_label.config(image="")
+            self.summary_label.config(text="No recorded sessions yet. Take a typing test first.")
+            return
+        photo = tk.PhotoImage(master=self, file=self.heatmap_path)
+        self.image_label.config(image=photo)
+        self.image_label.image = photo  # Keep a reference to avoid garbage collection
+        self.summary_label.config(text="\n".join(summary_lines(stats)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find slow keys and slow key transitions in saved sessions.")
+    parser.add_argument("folder", nargs="?", default=keystroke_log.LOG_DIR, help="folder of keystroke logs")
+    parser.add_argument("--heatmap", help="PNG file for the keyboard heatmap")
+    parser.add_argument("--output", help="CSV file for the bigram table (default: stdout)")
+    args = parser.parse_args(argv)
+
+    stats = analyze(keystroke_log.load_sessions(args.folder))
+    print("\n".join(summary_lines(stats)), file=sys.stderr)
+    if args.heatmap:
+        render_heatmap(stats["keys"], args.heatmap)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            write_bigrams(stats["bigrams"], f)
+    else:
+        write_bigrams(stats["bigrams"], sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
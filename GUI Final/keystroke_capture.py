@@ -0,0 +1,116 @@
+from array import array  # Compact, preallocated storage for key events
+import time  # perf_counter_ns provides the monotonic event timestamps
+
+# Default ring buffer size; must be a power of two (65,536 events is over an hour at 150 WPM)
+DEFAULT_CAPACITY = 1 << 16
+
+# Action codes stored for each key event
+PRESS = 1
+RELEASE = 2
+MODIFIED = 4  # Set together with PRESS/RELEASE when Control or Alt was held down
+
+# Tk event state bits for Control (0x4) and Alt/Mod1 (0x8)
+MODIFIER_STATE_MASK = 0x4 | 0x8
+
+
+class KeystrokeRecorder:
+    """Records every key event of a Text widget into a preallocated ring buffer.
+
+    Each event is stored as three parallel array entries: a perf_counter_ns
+    timestamp, the X11 keysym number and an action code. Events are bound as
+    a raw Tcl command with %N/%s substitutions, so tkinter never builds an
+    Event object and the hot path only writes into the arrays.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Initialize the recorder with room for `capacity` events."""
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.keysyms = array('I', bytes(4 * capacity))
+        self.actions = array('B', bytes(capacity))
+        self.count = 0  # Events recorded since the last reset, including overwritten ones
+        self._command = None
+        self._widget = None
+
+    def attach(self, widget):
+        """Starts recording the key presses and releases of `widget`."""
+        self._widget = widget
+        self._command = widget.register(self.record)
+        widget.bind("<KeyPress>", f"+{self._command} %N %s {PRESS}")
+        widget.bind("<KeyRelease>", f"+{self._command} %N %s {RELEASE}")
+
+    def detach(self):
+        """Stops recording and frees the Tcl command."""
+        if self._widget is None:
+            return
+        self._widget.unbind("<KeyPress>")
+        self._widget.unbind("<KeyRelease>")
+        self._widget.deletecommand(self._command)
+        self._widget = None
+        self._command = None
+
+    def record(self, keysym, state, action):
+        """Stores one key event; called by Tk with the substituted event fields."""
+        i = self.count & self.mask
+        self.timestamps[i] = time.perf_counter_ns()
+        self.keysyms[i] = int(keysym)
+        action = int(action)
+        if int(state) & MODIFIER_STATE_MASK:
+            action |= MODIFIED
+        self.actions[i] = action
+        self.count += 1
+
+    def reset(self):
+        """Forgets every recorded event without reallocating the buffers."""
+        self.count = 0
+
+    def __len__(self):
+        """Returns the number of events currently held in the buffer."""
+        return min(self.count, self.capacity)
+
+    @property
+    def dropped(self):
+        """Number of oldest events overwritten because the buffer was full."""
+        return max(0, self.count - self.capacity)
+
+    def events_since(self, start):
+        """Returns (timestamps, keysyms, actions) of the events recorded after the first `start`.
+
+        Events already overwritten by the ring buffer are skipped. Pass the
+        previous value of `count` to collect only the events added since.
+        """
+        start = max(start, self.count - self.capacity)
+        n = self.count - start
+        i = start & self.mask
+        if i + n <= self.capacity:
+            return self.timestamps[i:i + n], self.keysyms[i:i + n], self.actions[i:i + n]
+        j = i + n - self.capacity
+        return (self.timestamps[i:] + self.timestamps[:j],
+                self.keysyms[i:] + self.keysyms[:j],
+                self.actions[i:] + self.actions[:j])
+
+    def snapshot(self):
+        """Returns copies of (timestamps, keysyms, actions) in chronological order."""
+        if self.count <= self.capacity:
+            n = self.count
+            return self.timestamps[:n], self.keysyms[:n], self.actions[:n]
+        start = self.count & self.mask
+        return (self.timestamps[start:] + self.timestamps[:start],
+                self.keysyms[start:] + self.keysyms[:start],
+                self.actions[start:] + self.actions[:start])
+
+
+# Benchmark: cost of recording one key event
+if __name__ == "__main__":
+    recorder = KeystrokeRecorder()
+    events = 1_000_000
+    start = time.perf_counter_ns()
+    for _ in range(events):
+        recorder.record("97", "0", PRESS)  # Tk passes the substituted fields as strings
+    per_event = (time.perf_counter_ns() - start) / events
+    print(f"{per_event:.0f} ns per key event")
+    # 150 WPM is about 12.5 key presses (25 events with releases) per second
+    print(f"Share of one second spent recording at 150 WPM: {per_event * 25 / 1e9:.6%}")
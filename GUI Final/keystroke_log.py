@@ -0,0 +1,169 @@
+"""Compact binary keystroke logs (.ksl) for replay and analytics.
+
+A log is a 40-byte header followed by fixed-width 16-byte records:
+
+    header:  magic "KSL1", version (u16), record size (u16), test type (u8),
+             flags (u8), 2 pad bytes, session start as Unix time in ns (i64),
+             session duration in ns (i64), record count (u64), 4 pad bytes
+    record:  time since the test started in ns (i64), keysym (u32),
+             action (u8, see keystroke_capture), 3 pad bytes
+
+All fields are little-endian. Records are 8-byte aligned, so a log can be
+memory-mapped and viewed as a NumPy structured array without copying.
+"""
+import contextlib
+import glob
+import itertools
+import mmap
+import os
+import struct
+import sys
+import time
+
+import instrumentation  # Optional timing of log saves
+
+MAGIC = b"KSL1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHBB2xqqQ4x")
+RECORD = struct.Struct("<qIB3x")
+LOG_DIR = "keystroke_logs"
+LOG_EXTENSION = ".ksl"
+
+# Test type codes stored in the header
+TEST_TYPES = {"OneMinute": 1, "Stopwatch": 2}
+TEST_TYPE_NAMES = {code: name for name, code in TEST_TYPES.items()}
+
+
+def record_dtype():
+    """NumPy dtype matching one log record."""
+    # pip install numpy
+    import numpy as np
+
+    return np.dtype({"names": ["t_ns", "keysym", "action"],
+                     "formats": ["<i8", "<u4", "u1"],
+                     "offsets": [0, 8, 12],
+                     "itemsize": RECORD.size})
+
+
+def write_log(path, test_type, start_unix_ns, duration_ns, timestamps, keysyms, actions, origin_ns):
+    """Writes one session; `timestamps` are perf_counter_ns values, stored relative to `origin_ns`."""
+    count = len(timestamps)
+    data = bytearray(HEADER.size + count * RECORD.size)
+    HEADER.pack_into(data, 0, MAGIC, VERSION, RECORD.size, TEST_TYPES[test_type], 0,
+                     start_unix_ns, duration_ns, count)
+    offset = HEADER.size
+    for timestamp, keysym, action in zip(timestamps, keysyms, actions):
+        RECORD.pack_into(data, offset, timestamp - origin_ns, keysym, action)
+        offset += RECORD.size
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+@instrumentation.timed("keystroke_log_save")
+def save_session(recorder, test_type, origin_ns, duration_ns, log_dir=LOG_DIR):
+    """Saves the events of a KeystrokeRecorder to a new log file and returns its path.
+
+    `origin_ns` is the perf_counter_ns value at which the test started.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    start_unix_ns = time.time_ns() - (time.perf_counter_ns() - origin_ns)
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(start_unix_ns / 1e9))
+    base = os.path.join(log_dir, f"{test_type}_{stamp}_{start_unix_ns % 1_000_000_000 // 1_000_000:03}")
+    for attempt in itertools.count(1):
+        # Sessions saved in the same millisecond get "_2", "_3"... instead of overwriting each other
+        path = base + (f"_{attempt}" if attempt > 1 else "") + LOG_EXTENSION
+        try:
+            with open(path, "xb"):
+                break  # The empty file reserves the name until write_log() replaces it
+        except FileExistsError:
+            continue
+    timestamps, keysyms, actions = recorder.snapshot()
+    try:
+        write_log(path, test_type, start_unix_ns, duration_ns, timestamps, keysyms, actions, origin_ns)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(path)  # Do not leave the empty reserved file behind
+        raise
+    return path
+
+
+def read_header(buffer):
+    """Parses and checks a log header."""
+    magic, version, record_size, test_type, flags, start_unix_ns, duration_ns, count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError("Not a version 1 keystroke log")
+    return {
+        "test_type": TEST_TYPE_NAMES.get(test_type, "Unknown"),
+        "start_unix_ns": start_unix_ns,
+        "duration_ns": duration_ns,
+        "count": count,
+    }
+
+
+def open_log(path):
+    """Memory-maps a log and returns (header, records) without copying the records.
+
+    `records` is a NumPy structured array with fields t_ns, keysym and action.
+    Raises ValueError for a file that is empty, not a keystroke log, or
+    shorter than its header's record count says (e.g. cut off by a crash).
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"Too short to be a keystroke log ({size} bytes)")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(buffer)
+    expected = HEADER.size + header["count"] * RECORD.size
+    if size < expected:
+        raise ValueError(f"Truncated log: {header['count']} records need {expected} bytes, "
+                         f"the file has {size}")
+    records = np.frombuffer(buffer, dtype=record_dtype(), count=header["count"], offset=HEADER.size)
+    return header, records
+
+
+def load_sessions(folder=LOG_DIR):
+    """Memory-maps every log in `folder`, oldest first, and returns a list of (path, header, records).
+
+    Logs that cannot be read are skipped with a warning on stderr, so one
+    damaged file does not hide every other session.
+    """
+    sessions = []
+    for path in sorted(glob.glob(os.path.join(folder, "*" + LOG_EXTENSION))):
+        try:
+            header, records = open_log(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping keystroke log {path}: {e}", file=sys.stderr)
+            continue
+        sessions.append((path, header, records))
+    sessions.sort(key=lambda session: session[1]["start_unix_ns"])
+    return sessions
+
+
+# Benchmark: write a year's worth of sessions and time how long loading them takes
+if __name__ == "__main__":
+    import tempfile
+    from array import array
+
+    SESSIONS = 2000  # About five tests a day for a year
+    EVENTS = 700  # A one-minute test at 70 WPM, with key releases
+
+    with tempfile.TemporaryDirectory() as folder:
+        timestamps = array('q', range(0, EVENTS * 80_000_000, 80_000_000))
+        keysyms = array('I', [97 + i % 26 for i in range(EVENTS)])
+        actions = array('B', [1 + i % 2 for i in range(EVENTS)])
+        for i in range(SESSIONS):
+            write_log(os.path.join(folder, f"session_{i:05}{LOG_EXTENSION}"), "OneMinute",
+                      1_700_000_000_000_000_000 + i, 60_000_000_000, timestamps, keysyms, actions, 0)
+
+        start = time.perf_counter()
+        sessions = load_sessions(folder)
+        total = sum(len(records) for _, _, records in sessions)
+        presses = sum(int((records["action"] == 1).sum()) for _, _, records in sessions)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {len(sessions)} sessions ({total} events, {presses} presses) in {elapsed:.2f} s")
+        del sessions
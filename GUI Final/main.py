@@ -1,21 +1,33 @@
 import tkinter as tk  # Import tkinter library for GUI
-from logging import root
 from tkinter import messagebox  # Import messagebox for displaying messages
+from tkinter import filedialog  # Import filedialog for picking keystroke logs to replay
 
 import typing_test  # Import the TypingTestWindow class from typing_test module
 import stopwatch_test  # Import the StopwatchTestWindow class from stopwatch_test module
 import os  # Import os module for file operations
-import openpyxl  # Import openpyxl library for working with Excel files
-from openpyxl import Workbook  # Import Workbook class from openpyxl
-from openpyxl.utils import get_column_letter  # Utility function to get column letter from column index
-# pip install pillow
-from PIL import Image, ImageTk, ImageDraw
+import results_store  # Results storage backends (SQLite database or Excel journal)
+import image_cache  # Loads images without Pillow once their resized copies are cached
+import window_manager  # Reusable windows instead of nested main loops
+import keystroke_log  # Where recorded typing sessions are saved
+import session_replay  # Plays back recorded typing sessions
+import results_dashboard  # In-app results view with incrementally updated statistics
+import argparse  # Command-line options for joining a classroom session
+import instrumentation  # Opt-in timing and event-loop lag metrics (TYPING_APP_METRICS)
+
+# key_analytics and bulk_import load NumPy, and classroom_client loads asyncio, so they are imported inside the
+# handlers that use them
+
+# Folder holding the app's images, so the app can be started from any directory
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Define color constants from the palette
 BG_COLOR = "#D3BDB0"
 BUTTON_COLOR = "#89937C"
 TEXT_COLOR = "white"
 
+# Results backend used by the record windows: "sqlite" or "journal"
+RESULTS_BACKEND = "sqlite"
+
 
 # Define the main application class
 class TypingTestApp(tk.Tk):
@@ -25,19 +37,26 @@ class TypingTestApp(tk.Tk):
         self.geometry("600x500")  # Set window size
         self.configure(bg=BG_COLOR)  # Set background color
 
+        # One results store per test type; all disk writes happen on the background writer
+        self.results_stores = {test_type: results_store.open_store(test_type, RESULTS_BACKEND)
+                               for test_type in results_store.LAYOUTS}
+        self.results_writer = results_store.ResultsWriter(self)  # Keeps disk writes off the Tk thread
+        self.import_existing_results()
+        self.results_aggregates = {}  # Statistics per test type, built the first time its results are viewed
+        self.windows = window_manager.WindowManager(self)  # One reusable instance per window type
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.metrics = instrumentation.start(self)  # None unless TYPING_APP_METRICS is set
+
         # Load images
-        keyboard_image = Image.open("keyboard.png")
-        keyboard_photo = ImageTk.PhotoImage(keyboard_image)
+        keyboard_photo = image_cache.load_photo(self, os.path.join(ASSET_DIR, "keyboard.png"))
 
         # Create labels for images
         keyboard_label = tk.Label(self, image=keyboard_photo, bg=BG_COLOR)
         keyboard_label.image = keyboard_photo  # Keep a reference to avoid garbage collection
         keyboard_label.pack(pady=0.5)
 
-        # Load images
-        computer_image = Image.open("output-onlinepngtools.png")
-        resized = computer_image.resize((200, 200))
-        new_pic = ImageTk.PhotoImage(resized)
+        # Load images (the 200x200 copy is cached on disk after the first launch)
+        new_pic = image_cache.load_photo(self, os.path.join(ASSET_DIR, "output-onlinepngtools.png"), (200, 200))
 
         # Create labels for images
         computer_label = tk.Label(self, image=new_pic, bg=BG_COLOR)
@@ -63,35 +82,100 @@ class TypingTestApp(tk.Tk):
                                    bg=BUTTON_COLOR, fg=TEXT_COLOR)
         record_button2.pack(pady=5)  # Pack the button into the window
 
+        # Create button for replaying a recorded session
+        replay_button = tk.Button(self, text="Replay Typing Session", command=self.open_replay, bg=BUTTON_COLOR,
+                                  fg=TEXT_COLOR)
+        replay_button.pack(pady=5)  # Pack the button into the window
+
+        # Create button for the slow keys heatmap
+        heatmap_button = tk.Button(self, text="Slow Keys Heatmap", command=self.open_key_heatmap, bg=BUTTON_COLOR,
+                                   fg=TEXT_COLOR)
+        heatmap_button.pack(pady=5)  # Pack the button into the window
+
+    # Method to migrate results saved by older versions of the app into a new, empty database
+    @instrumentation.timed("import_existing_results")
+    def import_existing_results(self):
+        if RESULTS_BACKEND != "sqlite":
+            return
+        for test_type, store in self.results_stores.items():
+            if os.path.exists(store.filename) and store.is_empty():
+                # One transaction: after a failure the database is still empty, so the next launch retries
+                self.results_writer.call(
+                    lambda store=store, test_type=test_type: results_store.import_xlsx(
+                        store.filename, store, results_store.LEGACY_SHEETS[test_type]),
+                    lambda error, store=store: self.on_results_imported(store, error))
+
+    # Method to report a failed migration; the saved results stay in the Excel file
+    def on_results_imported(self, store, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Could not import the results saved in {store.filename}: {error}\n"
+                                          "Nothing was imported; the app will try again the next time it starts.")
+
+    # Method to save any pending results before the app exits
+    def on_close(self):
+        self.windows.close_all()
+        self.results_writer.close()  # Drain pending writes before closing the stores
+        for store in self.results_stores.values():
+            store.close()
+        if self.metrics is not None:
+            self.metrics.close()  # Final metrics, including the saves drained while closing
+        self.destroy()
 
     # Method to open the One-Minute Typing Test window
     def open_typing_test(self):
-        typing_test_app = typing_test.TypingTestWindow(self)
-        typing_test_app.mainloop()  # Start the typing test window
+        self.windows.show("typing", lambda: typing_test.TypingTestWindow(self))
 
     # Method to open the Stopwatch Timing Test window
     def open_stopwatch_test(self):
-        stopwatch_test_app = stopwatch_test.StopwatchTestWindow(self)
-        stopwatch_test_app.mainloop()  # Start the stopwatch test window
+        self.windows.show("stopwatch", lambda: stopwatch_test.StopwatchTestWindow(self))
 
     # Method to open the window for recording results of One-Minute Typing Test
     def record_one_minute_test(self):
-        record_window = RecordTestWindow(self, test_type="OneMinute")
-        record_window.mainloop()  # Start the record window
+        self.windows.show("record-OneMinute", lambda: RecordTestWindow(self, test_type="OneMinute"))
 
     # Method to open the window for recording results of Stopwatch Timing Test
     def record_stopwatch_test(self):
-        record_window = RecordTestWindow(self, test_type="Stopwatch")
-        record_window.mainloop()  # Start the record window
+        self.windows.show("record-Stopwatch", lambda: RecordTestWindow(self, test_type="Stopwatch"))
+
+    # Method to open the results dashboard of one test type
+    def open_results_dashboard(self, test_type):
+        store = self.results_stores[test_type]
+        aggregates = self.results_aggregates.get(test_type)
+        if aggregates is None or aggregates.error is not None:  # Not scanned yet, or the last scan failed
+            aggregates = self.results_aggregates.setdefault(test_type, results_dashboard.ResultsAggregates())
+            aggregates.error = None
+            self.results_writer.call(lambda: aggregates.load(store))  # Scans once, in order with pending writes
+        title = "One-Minute Test Results" if test_type == "OneMinute" else "Stopwatch Test Results"
+        self.windows.show(f"results-{test_type}", lambda: results_dashboard.ResultsDashboard(
+            self, store, self.results_aggregates[test_type], title)).refresh()
+
+    # Method to pick a saved keystroke log and play it back
+    def open_replay(self):
+        path = filedialog.askopenfilename(parent=self, initialdir=keystroke_log.LOG_DIR,
+                                          filetypes=[("Keystroke logs", "*" + keystroke_log.LOG_EXTENSION)])
+        if path:
+            self.windows.show("replay", lambda: session_replay.ReplayWindow(self)).load(path)
+
+    # Method to open the keyboard heatmap of slow keys, analyzing every recorded session
+    def open_key_heatmap(self):
+        import key_analytics  # Slow keys and key transitions across recorded sessions
+
+        self.windows.show("key-heatmap", lambda: key_analytics.KeyHeatmapWindow(self)).refresh()
+
+    # Method to take the one-minute test in a classroom session run by session_server.py
+    def join_classroom(self, host, port, name):
+        import classroom_client  # Thin client mode for classroom sessions
+
+        self.windows.show("classroom", lambda: classroom_client.ClassroomTestWindow(self, host, port, name))
 
 
 # Class for the window to record test results
-class RecordTestWindow(tk.Toplevel):
+class RecordTestWindow(window_manager.ManagedWindow):
     def __init__(self, parent, test_type):
         super().__init__(parent)  # Initialize the Toplevel window
         self.parent = parent  # Store reference to parent window
         self.title("Record Test")  # Set window title
-        self.geometry("400x300")  # Set window size
+        self.geometry("400x360")  # Set window size
         self.configure(bg=BG_COLOR)  # Set background color
 
         self.test_type = test_type  # Store the type of test (OneMinute or Stopwatch)
@@ -133,96 +217,86 @@ class RecordTestWindow(tk.Toplevel):
         self.chars_per_sec_entry.pack()
 
         # Button to add data
-        add_button = tk.Button(self, text="Add", command=self.add_to_excel, bg=BUTTON_COLOR, fg=TEXT_COLOR)
-        add_button.pack(pady=10)
+        self.add_button = tk.Button(self, text="Add", command=self.add_to_excel, bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        self.add_button.pack(pady=10)
 
         # Button to view results
         view_button = tk.Button(self, text="View Results", command=self.view_results, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         view_button.pack()
 
+        # Button to import a whole table of results at once
+        bulk_button = tk.Button(self, text="Bulk Import", command=self.open_bulk_import, bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        bulk_button.pack(pady=5)
+
+    # Method to clear the form for the next entry
+    def reset(self):
+        for entry in (self.date_entry, self.words_entry, self.chars_entry, self.chars_per_sec_entry):
+            entry.delete(0, tk.END)
+        if self.test_type == "Stopwatch":
+            self.time_entry.delete(0, tk.END)
+        self.add_button.config(state=tk.NORMAL)
+
     # Method to add test results to Excel
     def add_to_excel(self):
+        import bulk_import  # Validation and bulk entry of results
+
+        # Get values from entry boxes, in the column order of the results layout
+        values = [self.date_entry.get(), self.words_entry.get(), self.chars_entry.get(), self.chars_per_sec_entry.get()]
+        if self.test_type == "Stopwatch":
+            values.insert(1, self.time_entry.get())
+
+        # Validate with the same rules as bulk imports
+        store = self.parent.results_stores[self.test_type]
+        rows, errors = bulk_import.validate_rows([values], store.headers)
+        if errors:
+            message = errors[0][1]
+            messagebox.showerror("Error", message[0].upper() + message[1:] + ".")
+            return
+
         try:
-            # Get values from entry boxes
-            date = self.date_entry.get().strip()
-            words = int(self.words_entry.get().strip())
-            chars = int(self.chars_entry.get().strip())
-            chars_per_sec = float(self.chars_per_sec_entry.get().strip())
-
-            if self.test_type == "Stopwatch":
-                time = self.time_entry.get().strip()
-
-                # Validate time format
-                if len(time.split(':')) != 3:
-                    raise ValueError("Invalid time format. Use HH:MM:SS.")
-
-            # Validate date format
-            if len(date.split('/')) != 3:
-                raise ValueError("Invalid date format. Use MM/DD/YYYY.")
-
-            # Validate integers
-            if not (isinstance(words, int) and isinstance(chars, int)):
-                raise ValueError("Words and Characters must be integers.")
-
-            # Validate float
-            if not isinstance(chars_per_sec, float):
-                raise ValueError("Characters per Second must be a float.")
-
-            # Create or load workbook and add data
-            if self.test_type == "OneMinute":
-                filename = "One_Minute_Test_Results.xlsx"
-                headers = ['Date', 'Number of Words Typed', 'Number of Characters Typed',
-                           'Number of Characters per Second']
-            else:
-                filename = "Stopwatch_Timing_Test.xlsx"
-                headers = ['Date', 'Stopwatch Time', 'Number of Words Typed', 'Number of Characters Typed',
-                           'Number of Characters per Second']
-
-            wb = openpyxl.Workbook()
-
-            # Check if sheet exists, otherwise create it
-            if "Sheet" in wb.sheetnames:
-                ws = wb["Sheet"]
-            else:
-                ws = wb.active
-
-            # Write headers if the sheet is new
-            if ws.max_row == 1:
-                ws.append(headers)
-
-            # Prepare data and append to the sheet
-            if self.test_type == "Stopwatch":
-                data = [date, time, words, chars, chars_per_sec]
-            else:
-                data = [date, words, chars, chars_per_sec]
-
-            ws.append(data)
-
-            # Save the workbook
-            wb.save(filename)
-            messagebox.showinfo("Success", "Data added successfully!")
-            self.destroy()  # Close the record window after successful data addition
-
-        except ValueError as e:
+            # Hand the row to the background writer; on_saved runs once it is on disk
+            self.parent.results_writer.submit(store, rows[0], self.on_saved)
+            self.add_button.config(state=tk.DISABLED)
+        except RuntimeError as e:
             messagebox.showerror("Error", str(e))
+
+    # Method called by the results writer once the row has been saved
+    def on_saved(self, error):
+        if not self.winfo_exists():
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Could not save results: {error}")
+            self.add_button.config(state=tk.NORMAL)
             return
+        messagebox.showinfo("Success", "Data added successfully!")
+        self.close()  # Close the record window after successful data addition
 
-    # Method to view results from the Excel file
-    def view_results(self):
-        if self.test_type == "OneMinute":
-            filename = "One_Minute_Test_Results.xlsx"
-        elif self.test_type == "Stopwatch":
-            filename = "Stopwatch_Timing_Test.xlsx"
+    # Method to open the window for pasting or loading many results at once
+    def open_bulk_import(self):
+        import bulk_import  # Validation and bulk entry of results
+
+        self.parent.windows.show(f"bulk-{self.test_type}",
+                                 lambda: bulk_import.BulkImportWindow(self.parent, self.test_type))
 
+    # Method to view the saved results inside the app
+    def view_results(self):
         try:
-            os.startfile(filename)  # Open the Excel file
-        except FileNotFoundError:
-            messagebox.showerror("Error", f"No results found in {filename}")
+            self.parent.open_results_dashboard(self.test_type)
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
 
 
 # Entry point of the program
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Typing Test App")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="join a classroom session run by session_server.py")
+    parser.add_argument("--name", default=os.environ.get("USER", "student"), help="name shown to the instructor")
+    args = parser.parse_args()
+
     app = TypingTestApp()  # Create an instance of the main application
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        app.join_classroom(host or "127.0.0.1", int(port), args.name)
     app.mainloop()  # Start the tkinter main loop
 
 """Explanation:
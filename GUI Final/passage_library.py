@@ -0,0 +1,312 @@
+"""Library of typing test passages with a precomputed difficulty index (.kpl).
+
+Usage:
+    python passage_library.py build books/ articles.txt --output passages.kpl
+    python passage_library.py sample --band hard --count 3
+    python passage_library.py info
+
+Building splits every text file into paragraph-sized passages. For each
+passage it works out the mean word length, the share of characters that
+need Shift or a reach off the letter keys, and how rare its letter
+bigrams are in the whole corpus. All of this is computed in one NumPy
+pass over the concatenated corpus. The three measures are standardized
+and summed into a difficulty score, and the corpus is split into easy,
+medium and hard bands at the score's terciles.
+
+Within each band a passage is weighted by how close it comes to a full
+one-minute test. A Walker/Vose alias table of those weights is stored in
+the index, so drawing a passage costs one random number and two array
+lookups however big the library is.
+
+The file is a header, a table of bands and fixed-width 48-byte records
+sorted by band, followed by the UTF-8 texts:
+
+    header:  magic "KPL1", version (u16), record size (u16),
+             passage count (u64), offset of the texts (u64)
+    band:    first record (u64), record count (u64), total weight (f64),
+             lowest and highest difficulty (f64, f64)
+    record:  text offset (u64), text length in bytes (u32), characters (u32),
+             difficulty, mean word length, symbol share, bigram rarity (f32 each),
+             alias (u32), alias probability (f32), band (u8), 7 pad bytes
+
+Opening a library only memory-maps the file, and a passage's text is
+decoded only when that passage is drawn.
+"""
+import argparse
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+
+MAGIC = b"KPL1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+BAND = struct.Struct("<QQddd")
+RECORD = struct.Struct("<QIIffffIfB7x")
+BANDS = ("easy", "medium", "hard")
+LIBRARY_EXTENSION = ".kpl"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "passages" + LIBRARY_EXTENSION)
+
+MIN_PASSAGE_CHARS = 80
+MAX_PASSAGE_CHARS = 400
+TARGET_CHARS = 300  # About one minute of typing at 60 WPM
+
+# Typographic characters replaced by what a keyboard types
+REPLACEMENTS = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"', "\u2013": "-",
+                              "\u2014": "-", "\u2026": "...", "\u00a0": " "})
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def record_dtype():
+    """NumPy dtype matching one passage record."""
+    # pip install numpy
+    import numpy as np
+
+    return np.dtype({"names": ["offset", "length", "chars", "difficulty", "word_length", "symbol_share",
+                               "bigram_rarity", "alias", "alias_prob", "band"],
+                     "formats": ["<u8", "<u4", "<u4", "<f4", "<f4", "<f4", "<f4", "<u4", "<f4", "u1"],
+                     "offsets": [0, 8, 12, 16, 20, 24, 28, 32, 36, 40],
+                     "itemsize": RECORD.size})
+
+
+def split_passages(text):
+    """Yields the passages of a text: paragraphs, with long ones cut at sentence ends."""
+    for paragraph in re.split(r"\n\s*\n", text.translate(REPLACEMENTS)):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) < MIN_PASSAGE_CHARS:
+            continue
+        if not all(" " <= char <= "~" or "\u00a1" <= char <= "\u00ff" for char in paragraph):
+            continue  # Characters the test's keysym handling does not type
+        passage = ""
+        for sentence in SENTENCE_END.split(paragraph):
+            if passage and len(passage) + 1 + len(sentence) > MAX_PASSAGE_CHARS:
+                if len(passage) >= MIN_PASSAGE_CHARS:
+                    yield passage
+                passage = ""
+            passage = f"{passage} {sentence}" if passage else sentence
+        if MIN_PASSAGE_CHARS <= len(passage) <= MAX_PASSAGE_CHARS:
+            yield passage
+
+
+def find_texts(paths):
+    """Yields every .txt file under `paths`."""
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.endswith(".txt"):
+                        yield os.path.join(folder, filename)
+        else:
+            yield path
+
+
+def passage_statistics(passages):
+    """Returns (word length, symbol share, bigram rarity) arrays, one entry per passage.
+
+    The passages are concatenated into one code point array, so every
+    statistic is a handful of vectorized passes over the whole corpus.
+    """
+    import numpy as np
+
+    lengths = np.array([len(passage) for passage in passages], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    codes = np.frombuffer("".join(passages).encode("utf-32-le"), dtype="<u4")
+
+    lower = (codes >= ord("a")) & (codes <= ord("z"))
+    space = codes == ord(" ")
+    words = np.add.reduceat(space.astype(np.int64), starts) + 1  # Passages are single-spaced and trimmed
+    word_length = (lengths - words + 1) / words
+    symbol_share = np.add.reduceat((~(lower | space)).astype(np.int64), starts) / lengths
+
+    # Letter bigrams, case-folded to 26 letters; anything else ends a bigram
+    folded = np.where((codes >= ord("A")) & (codes <= ord("Z")), codes + 32, codes)
+    letter = (folded >= ord("a")) & (folded <= ord("z"))
+    ids = np.where(letter, folded - ord("a"), 0).astype(np.int64)
+    pair = letter[:-1] & letter[1:]
+    pair[starts[1:] - 1] = False  # No bigrams across passages
+    bigrams = ids[:-1] * 26 + ids[1:]
+    counts = np.bincount(bigrams[pair], minlength=26 * 26).astype(np.float64)
+    surprisal = -np.log2((counts + 1) / (counts.sum() + counts.size))  # Add-one smoothing
+    rarity = np.append(np.where(pair, surprisal[bigrams], 0.0), 0.0)
+    pairs = np.add.reduceat(np.append(pair, False).astype(np.int64), starts)
+    bigram_rarity = np.add.reduceat(rarity, starts) / np.maximum(pairs, 1)
+    return word_length, symbol_share, bigram_rarity
+
+
+def alias_table(weights):
+    """Builds Vose's alias table for `weights`; returns (alias, probability) lists."""
+    n = len(weights)
+    total = sum(weights)
+    scaled = [weight * n / total for weight in weights]
+    alias = list(range(n))
+    probability = [1.0] * n
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return alias, probability
+
+
+def build(paths, output):
+    """Builds a library from the text files under `paths`; returns the number of passages."""
+    import numpy as np
+
+    passages = []
+    for path in find_texts(paths):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            passages.extend(split_passages(f.read()))
+    passages = list(dict.fromkeys(passages))  # Drop repeated passages, keeping the first
+    if not passages:
+        raise ValueError("No passages found")
+
+    word_length, symbol_share, bigram_rarity = passage_statistics(passages)
+    measures = np.stack([word_length, symbol_share, bigram_rarity])
+    spread = measures.std(axis=1, keepdims=True)
+    difficulty = ((measures - measures.mean(axis=1, keepdims=True)) / np.where(spread > 0, spread, 1)).sum(axis=0)
+    bands = np.searchsorted(np.quantile(difficulty, [1 / 3, 2 / 3]), difficulty, side="right")
+    order = np.lexsort((difficulty, bands))
+
+    encoded = [passages[i].encode("utf-8") for i in order]
+    records = np.zeros(len(passages), dtype=record_dtype())
+    records["length"] = [len(data) for data in encoded]
+    records["offset"] = np.concatenate(([0], np.cumsum(records["length"], dtype=np.uint64)[:-1]))
+    records["chars"] = [len(passages[i]) for i in order]
+    records["difficulty"] = difficulty[order]
+    records["word_length"] = word_length[order]
+    records["symbol_share"] = symbol_share[order]
+    records["bigram_rarity"] = bigram_rarity[order]
+    records["band"] = bands[order]
+    weights = np.minimum(records["chars"], TARGET_CHARS) / TARGET_CHARS  # Prefer passages that fill a test
+
+    band_table = []
+    for band in range(len(BANDS)):
+        members = np.flatnonzero(records["band"] == band)
+        start, count = (int(members[0]), len(members)) if len(members) else (0, 0)
+        if count:
+            alias, probability = alias_table(weights[start:start + count].tolist())
+            records["alias"][start:start + count] = alias
+            records["alias_prob"][start:start + count] = probability
+            low, high = float(records["difficulty"][start]), float(records["difficulty"][start + count - 1])
+        else:
+            low = high = 0.0
+        band_table.append(BAND.pack(start, count, float(weights[start:start + count].sum()), low, high))
+
+    text_offset = HEADER.size + len(band_table) * BAND.size + records.nbytes
+    temp_path = output + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(passages), text_offset))
+        f.write(b"".join(band_table))
+        f.write(records.tobytes())
+        for data in encoded:
+            f.write(data)
+    os.replace(temp_path, output)
+    return len(passages)
+
+
+class PassageLibrary:
+    """A memory-mapped passage library; passages are decoded only when drawn."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Open the library at `path`."""
+        import numpy as np
+
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, self.text_offset = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError("Not a version 1 passage library")
+        self.bands = [BAND.unpack_from(self.buffer, HEADER.size + i * BAND.size) for i in range(len(BANDS))]
+        self.records = np.frombuffer(self.buffer, dtype=record_dtype(), count=count,
+                                     offset=HEADER.size + len(BANDS) * BAND.size)
+        self.rng = random.Random()
+
+    def __len__(self):
+        """Returns the number of passages."""
+        return len(self.records)
+
+    def passage(self, index):
+        """Returns the text of passage `index`."""
+        record = self.records[index]
+        start = self.text_offset + int(record["offset"])
+        return self.buffer[start:start + int(record["length"])].decode("utf-8")
+
+    def sample_index(self, band=None):
+        """Draws a passage index from `band` ("easy", "medium" or "hard"), or from any band, in O(1)."""
+        rng = self.rng
+        if band is None:
+            pick = rng.random() * sum(entry[2] for entry in self.bands)
+            for band_number, entry in enumerate(self.bands):
+                pick -= entry[2]
+                if pick < 0:
+                    break
+        else:
+            band_number = BANDS.index(band)
+        start, count = self.bands[band_number][:2]
+        if count == 0:
+            raise ValueError(f"The library has no {BANDS[band_number]} passages")
+        slot = rng.randrange(count)
+        record = self.records[start + slot]
+        return start + (slot if rng.random() < record["alias_prob"] else int(record["alias"]))
+
+    def sample(self, band=None):
+        """Returns the text of a passage drawn from `band`, or from any band."""
+        return self.passage(self.sample_index(band))
+
+    def close(self):
+        """Releases the memory map."""
+        self.records = None
+        self.buffer.close()
+
+
+_library = None
+
+
+def default_library():
+    """Returns the library at DEFAULT_PATH, opened the first time it is needed, or None if there is none."""
+    global _library
+    if _library is None and os.path.exists(DEFAULT_PATH):
+        try:
+            _library = PassageLibrary(DEFAULT_PATH)
+        except (OSError, ValueError):
+            return None
+    return _library
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the typing test passage library.")
+    parser.add_argument("--library", default=DEFAULT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="build a library from text files")
+    build_parser.add_argument("paths", nargs="+", help="text files or folders of .txt files")
+    build_parser.add_argument("--output", help="library file (default: --library)")
+    sample_parser = commands.add_parser("sample", help="print random passages")
+    sample_parser.add_argument("--band", choices=BANDS)
+    sample_parser.add_argument("--count", type=int, default=1)
+    commands.add_parser("info", help="print the size and difficulty range of each band")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(args.paths, args.output or args.library)
+        print(f"Indexed {count} passages")
+        return 0
+
+    library = PassageLibrary(args.library)
+    if args.command == "sample":
+        for _ in range(args.count):
+            print(library.sample(args.band), end="\n\n")
+    else:
+        print(f"{len(library)} passages")
+        for name, (start, count, weight, low, high) in zip(BANDS, library.bands):
+            print(f"{name:6}: {count} passages, difficulty {low:.2f} to {high:.2f}")
+    library.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
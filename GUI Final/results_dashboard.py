@@ -0,0 +1,319 @@
+"""In-app view of saved results: trends, rolling averages, percentiles and personal bests.
+
+ResultsAggregates scans a results store once, on the writer thread, and
+then follows it as a listener, so every later append updates the running
+totals, rolling windows, CPS histogram and daily means in O(1) instead of
+rereading the whole history. ResultsDashboard draws a snapshot of those
+aggregates and shows the rows themselves one page at a time, so the table
+stays instant no matter how many results are stored. Stores without an
+indexed page() (the Excel journal) would rescan the workbook for every
+page, so for those the aggregates also keep the rows in memory.
+"""
+import math
+import threading
+import tkinter as tk
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate
+from tkinter import messagebox, ttk
+
+import results_store  # Date helpers shared with the results database
+import window_manager  # Reusable windows
+
+# Define constants for colors
+BG_COLOR = "#D3BDB0"
+BUTTON_COLOR = "#89937C"
+TEXT_COLOR = "white"
+
+ROLLING_WINDOWS = (10, 100)  # Rolling averages over the last N tests
+PERCENTILES = (50, 90, 99)
+CPS_BIN_WIDTH = 0.01  # Percentiles are exact to one hundredth of a character per second
+CPS_BINS = 5000  # Covers 0 to 50 CPS; faster results land in the last bin
+TREND_DAYS = 30  # Days with results shown in the trend chart
+PAGE_SIZE = 50  # Rows shown in the table at a time
+CHART_WIDTH = 460
+CHART_HEIGHT = 140
+CHART_MARGIN = 30
+
+
+class ResultsAggregates:
+    """Running statistics of one results store.
+
+    Rows are layout rows of any results sheet: the date comes first, then
+    the stopwatch time on stopwatch sheets, then words, characters and
+    characters per second.
+    load() and the append listener run on the writer thread; snapshot() and
+    page() may be called from the Tk thread at any time.
+    """
+
+    def __init__(self):
+        """Initialize empty aggregates."""
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forgets every result, so a failed load() can be run again."""
+        self.loaded = False
+        self.error = None  # Exception raised by the last load(), shown by the dashboard
+        self.rows = None  # Every stored row, kept by load() for stores without an indexed page()
+        self.count = 0
+        self.total_cps = 0.0
+        self.best_cps = None  # (characters per second, date)
+        self.best_words = None  # (words, date)
+        self.recent = deque(maxlen=max(ROLLING_WINDOWS))
+        self.rolling_sums = dict.fromkeys(ROLLING_WINDOWS, 0.0)
+        self.histogram = array('q', bytes(8 * CPS_BINS))
+        self.daily = {}  # YYYY-MM-DD -> [tests, sum of CPS]
+        self.words_column = 1  # Set by load() for layouts with a stopwatch time
+
+    def load(self, store):
+        """Reads every stored row once, then follows the store's appends. Runs on the writer thread."""
+        with self.lock:
+            self.clear()
+            self.words_column = 2 if "Stopwatch Time" in store.headers else 1
+            if not store.indexed_page:
+                self.rows = []
+        try:
+            for rows in batched(store.iter_rows(), results_store.IMPORT_BATCH_SIZE):
+                self.add_rows(rows)
+        except Exception as e:  # Shown by the dashboard instead of waiting forever
+            self.error = e
+            raise
+        store.add_listener(self.add_rows)
+        self.loaded = True
+
+    def add_rows(self, rows):
+        """Updates the aggregates with newly stored rows."""
+        with self.lock:
+            if self.rows is not None:
+                self.rows.extend(rows)
+            for row in rows:
+                try:
+                    words, cps = int(row[self.words_column]), float(row[self.words_column + 2])
+                except (TypeError, ValueError, IndexError):
+                    continue  # Skip malformed rows from hand-edited workbooks
+                self._add(results_store.format_date(row[0]), words, cps)
+
+    def _add(self, date, words, cps):
+        self.count += 1
+        self.total_cps += cps
+        if self.best_cps is None or cps > self.best_cps[0]:
+            self.best_cps = (cps, date)
+        if self.best_words is None or words > self.best_words[0]:
+            self.best_words = (words, date)
+
+        # Each window's sum gains the new result and loses the one that just fell out of it
+        for window in ROLLING_WINDOWS:
+            self.rolling_sums[window] += cps
+            if len(self.recent) >= window:
+                self.rolling_sums[window] -= self.recent[-window]
+        self.recent.append(cps)
+
+        self.histogram[min(max(int(cps / CPS_BIN_WIDTH), 0), CPS_BINS - 1)] += 1
+        day = results_store.iso_date(date)
+        if day is not None:
+            totals = self.daily.setdefault(day, [0, 0.0])
+            totals[0] += 1
+            totals[1] += cps
+
+    def percentile(self, p):
+        """Characters per second below which `p` percent of results fall."""
+        if self.count == 0:
+            return 0.0
+        cumulative = list(accumulate(self.histogram))
+        return (bisect_left(cumulative, math.ceil(self.count * p / 100)) + 0.5) * CPS_BIN_WIDTH
+
+    def page(self, store, offset, limit):
+        """Returns up to `limit` rows, newest first, skipping the `offset` newest."""
+        if self.rows is None:
+            return store.page(offset, limit)
+        with self.lock:
+            end = len(self.rows) - offset
+            return self.rows[max(end - limit, 0):max(end, 0)][::-1]
+
+    def snapshot(self):
+        """Returns a consistent copy of the statistics for display."""
+        with self.lock:
+            return {
+                "count": self.count,
+                "mean_cps": self.total_cps / self.count if self.count else 0.0,
+                "rolling": {window: total / min(window, len(self.recent))
+                            for window, total in self.rolling_sums.items() if self.recent},
+                "percentiles": {p: self.percentile(p) for p in PERCENTILES},
+                "best_cps": self.best_cps,
+                "best_words": self.best_words,
+                "trend": [(day, totals[1] / totals[0]) for day, totals in sorted(self.daily.items())[-TREND_DAYS:]],
+            }
+
+
+def batched(rows, size):
+    """Yields lists of up to `size` rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ResultsDashboard(window_manager.ManagedWindow):
+    """Window with the statistics, trend chart and paged table of one results store."""
+
+    def __init__(self, master, store, aggregates, title="Results"):
+        """Initialize the dashboard for `store`; call refresh() each time it is shown."""
+        super().__init__(master)
+        self.title(title)
+        self.configure(bg=BG_COLOR)
+        self.store = store
+        self.aggregates = aggregates
+        self.page_number = 0
+
+        self.summary_label = tk.Label(self, justify=tk.LEFT, bg=BG_COLOR, font=("Helvetica", 11))
+        self.summary_label.pack(padx=10, pady=5)
+        self.chart = tk.Canvas(self, width=CHART_WIDTH, height=CHART_HEIGHT, bg="white", highlightthickness=0)
+        self.chart.pack(padx=10, pady=5)
+
+        self.table = ttk.Treeview(self, columns=list(range(len(store.headers))), show="headings", height=12)
+        for column, header in enumerate(store.headers):
+            self.table.heading(column, text=header)
+            self.table.column(column, width=max(80, 7 * len(header)), anchor=tk.CENTER)
+        self.table.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+        pager = tk.Frame(self, bg=BG_COLOR)
+        pager.pack()
+        self.prev_button = tk.Button(pager, text="< Newer", command=lambda: self.show_page(self.page_number - 1),
+                                     bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        self.prev_button.pack(side=tk.LEFT, padx=5)
+        self.page_label = tk.Label(pager, bg=BG_COLOR)
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        self.next_button = tk.Button(pager, text="Older >", command=lambda: self.show_page(self.page_number + 1),
+                                     bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        self.next_button.pack(side=tk.LEFT, padx=5)
+
+        buttons = tk.Frame(self, bg=BG_COLOR)
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Export to Excel", command=self.export, bg=BUTTON_COLOR,
+                  fg=TEXT_COLOR).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Go Back", command=self.close, bg=BUTTON_COLOR, fg=TEXT_COLOR).pack(side=tk.LEFT, padx=5)
+
+    def reset(self):
+        """Goes back to the newest page for the next time the window is shown."""
+        self.page_number = 0
+
+    def refresh(self):
+        """Redraws the statistics and the current page, or waits until the first scan has finished."""
+        if self.aggregates.error is not None:
+            self.summary_label.config(text=f"Could not load results: {self.aggregates.error}")
+            return
+        if not self.aggregates.loaded:
+            self.summary_label.config(text="Loading results...")
+            self.after(100, self.refresh)
+            return
+        stats = self.aggregates.snapshot()
+        self.show_summary(stats)
+        self.draw_trend(stats["trend"])
+        self.show_page(self.page_number)
+
+    def show_summary(self, stats):
+        """Shows the totals, rolling averages, percentiles and personal bests."""
+        if stats["count"] == 0:
+            self.summary_label.config(text="No results saved yet.")
+            return
+        lines = [f"Tests: {stats['count']}    Average: {stats['mean_cps']:.2f} CPS"]
+        lines.append("    ".join(f"Last {window}: {average:.2f} CPS" for window, average in stats["rolling"].items()))
+        lines.append("    ".join(f"P{p}: {value:.2f} CPS" for p, value in stats["percentiles"].items()))
+        best_cps, best_cps_date = stats["best_cps"]
+        best_words, best_words_date = stats["best_words"]
+        lines.append(f"Best: {best_cps:.2f} CPS on {best_cps_date}    {best_words} words on {best_words_date}")
+        self.summary_label.config(text="\n".join(lines))
+
+    def draw_trend(self, trend):
+        """Plots the average characters per second of each of the most recent days."""
+        self.chart.delete("all")
+        if not trend:
+            return
+        values = [average for _, average in trend]
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        step = (CHART_WIDTH - 2 * CHART_MARGIN) / max(len(trend) - 1, 1)
+        points = []
+        for i, value in enumerate(values):
+            points.append(CHART_MARGIN + i * step)
+            points.append(CHART_HEIGHT - CHART_MARGIN - (value - low) / span * (CHART_HEIGHT - 2 * CHART_MARGIN))
+        if len(points) >= 4:
+            self.chart.create_line(*points, fill=BUTTON_COLOR, width=2)
+        for x, y in zip(points[::2], points[1::2]):
+            self.chart.create_oval(x - 2, y - 2, x + 2, y + 2, fill=BUTTON_COLOR, outline="")
+        self.chart.create_text(5, CHART_MARGIN, text=f"{high:.1f}", anchor=tk.W)
+        self.chart.create_text(5, CHART_HEIGHT - CHART_MARGIN, text=f"{low:.1f}", anchor=tk.W)
+        self.chart.create_text(CHART_MARGIN, CHART_HEIGHT - 5, text=trend[0][0], anchor=tk.SW)
+        self.chart.create_text(CHART_WIDTH - 5, CHART_HEIGHT - 5, text=trend[-1][0], anchor=tk.SE)
+        self.chart.create_text(CHART_WIDTH / 2, 10, text="Average CPS per day")
+
+    def show_page(self, page_number):
+        """Fills the table with one page of rows, newest first."""
+        pages = max(1, math.ceil(self.aggregates.count / PAGE_SIZE))
+        self.page_number = min(max(page_number, 0), pages - 1)
+        self.table.delete(*self.table.get_children())
+        for row in self.aggregates.page(self.store, self.page_number * PAGE_SIZE, PAGE_SIZE):
+            self.table.insert("", tk.END, values=["" if value is None else value for value in row])
+        self.page_label.config(text=f"Page {self.page_number + 1} of {pages}")
+        self.prev_button.config(state=tk.NORMAL if self.page_number > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page_number < pages - 1 else tk.DISABLED)
+
+    def export(self):
+        """Writes the results to the store's Excel file in the background."""
+        def on_done(error):
+            if error is not None:
+                messagebox.showerror("Error", f"Could not export results: {error}", parent=self)
+            else:
+                messagebox.showinfo("Export", f"Results saved to {self.store.filename}", parent=self)
+
+        try:
+            self.master.results_writer.write_workbook(self.store, on_done)
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+
+
+# Benchmark: build the aggregates for 100k results, then time single appends and one table page
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import time
+
+    ROWS = 100_000
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as folder:
+        store = results_store.SQLiteResultsStore(os.path.join(folder, "results.db"), "OneMinute")
+        store.append_many([[f"{rng.randint(1, 12):02}/{rng.randint(1, 28):02}/{rng.randint(2020, 2024)}",
+                            rng.randint(20, 90), rng.randint(100, 450), round(rng.uniform(1, 8), 2)]
+                           for _ in range(ROWS)])
+
+        aggregates = ResultsAggregates()
+        start = time.perf_counter()
+        aggregates.load(store)
+        print(f"Initial scan of {ROWS} rows: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        expected = sorted(row[-1] for row in store.iter_rows())
+        snapshot = aggregates.snapshot()
+        assert snapshot["count"] == len(expected)
+        assert abs(snapshot["percentiles"][50] - expected[math.ceil(len(expected) / 2) - 1]) <= CPS_BIN_WIDTH
+        assert snapshot["best_cps"][0] == expected[-1]
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            aggregates.add_rows([["01/01/2025", 60, 300, 5.0]])
+        print(f"Incremental update: {(time.perf_counter() - start) * 1000:.3f} us per result")
+
+        start = time.perf_counter()
+        aggregates.snapshot()
+        print(f"Snapshot: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        store.page((ROWS // PAGE_SIZE - 1) * PAGE_SIZE, PAGE_SIZE)
+        print(f"Last table page: {(time.perf_counter() - start) * 1000:.2f} ms")
+        store.close()
@@ -0,0 +1,709 @@
+import functools  # Date conversions are cached; the same few dates repeat across thousands of rows
+import hashlib  # Row hashes used to skip duplicate results
+import json  # Journal rows are stored one JSON list per line
+import os  # Import os module for file operations
+import queue  # Bounded hand-off between the Tk thread and the writer thread
+import sqlite3  # Indexed results database
+import sys  # Failed writer callbacks are reported through Tk with sys.exc_info()
+import threading  # Workbook I/O runs on a background writer thread
+import time  # Used by the benchmark at the bottom of the file
+from collections import deque
+from datetime import datetime
+
+import instrumentation  # Optional timing of workbook saves
+
+# openpyxl is slow to import, so it is imported inside the functions that read or write workbooks
+
+# Result layouts used by the record windows
+ONE_MINUTE_FILENAME = "One_Minute_Test_Results.xlsx"
+STOPWATCH_FILENAME = "Stopwatch_Timing_Test.xlsx"
+ONE_MINUTE_HEADERS = ['Date', 'Number of Words Typed', 'Number of Characters Typed',
+                      'Number of Characters per Second']
+STOPWATCH_HEADERS = ['Date', 'Stopwatch Time', 'Number of Words Typed', 'Number of Characters Typed',
+                     'Number of Characters per Second', 'Lap Splits']
+OPTIONAL_HEADERS = ['Lap Splits']  # Columns that may be left empty
+MAX_LAP_SPLIT_SECONDS = 100 * 3600  # Stopwatch times have two-digit hours
+LAYOUTS = {
+    "OneMinute": (ONE_MINUTE_FILENAME, ONE_MINUTE_HEADERS),
+    "Stopwatch": (STOPWATCH_FILENAME, STOPWATCH_HEADERS),
+}
+# Sheets older versions of the app saved results to; the standalone typing app used its own sheet
+LEGACY_SHEETS = {
+    "OneMinute": ("Sheet", "Typing Test Results"),
+    "Stopwatch": ("Sheet",),
+}
+
+# SQLite results database shared by every test type
+DATABASE_FILENAME = "Typing_Test_Results.db"
+RECORD_COLUMNS = "date, stopwatch_time, words, characters, chars_per_sec, lap_splits"  # Read back as layout rows
+INSERT_RECORDS = ("INSERT INTO results (test_type, date, date_iso, stopwatch_time, words, characters, chars_per_sec,"
+                  " lap_splits, row_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+IMPORT_BATCH_SIZE = 5000  # Rows inserted per transaction by import_xlsx()
+HASH_LOOKUP_SIZE = 500  # Row hashes checked per duplicate lookup query
+
+# Background writer settings
+WRITER_QUEUE_SIZE = 256  # Requests that may wait for the writer before submit() gives up
+WRITER_BATCH_SIZE = 64  # Requests handled together in one flush
+WRITER_POLL_MS = 50  # How often the Tk thread collects finished requests
+SUBMIT_TIMEOUT = 0.5  # Seconds submit() waits for room in a full queue
+
+
+def open_store(test_type, backend="sqlite"):
+    """Creates the results store for `test_type` ("OneMinute" or "Stopwatch")."""
+    filename, headers = LAYOUTS[test_type]
+    if backend == "sqlite":
+        return SQLiteResultsStore(DATABASE_FILENAME, test_type)
+    if backend == "journal":
+        return ResultsJournal(filename, headers)
+    raise ValueError(f"Unknown results backend: {backend}")
+
+
+class ResultsStore:
+    """Interface shared by the results backends.
+
+    Rows are lists in the column order of the test type's Excel layout.
+    """
+
+    filename = None  # Excel file that holds this store's results
+    sheet_name = "Sheet"  # Sheet of that file the results are written to
+    headers = ()
+    listeners = ()  # Called with each batch of appended rows, on the thread that appended them
+    indexed_page = False  # True when page() reads only the requested rows instead of rescanning the history
+
+    def add_listener(self, listener):
+        """Calls `listener(rows)` after every successful append_many()."""
+        self.listeners = (*self.listeners, listener)
+
+    def _notify(self, rows):
+        for listener in self.listeners:
+            listener(rows)
+
+    def append(self, row):
+        """Appends one result row."""
+        self.append_many([row])
+
+    def append_many(self, rows, skip_duplicates=False):
+        """Appends several result rows in one write and returns how many were added.
+
+        With `skip_duplicates`, rows identical to a stored row or to an
+        earlier row of the same batch are left out.
+        """
+        raise NotImplementedError
+
+    def append_batches(self, batches):
+        """Appends every batch of rows in `batches` and returns how many were added.
+
+        Backends that support transactions store all of the rows or none.
+        """
+        return sum(self.append_many(rows) for rows in batches)
+
+    def iter_rows(self):
+        """Yields every stored row, oldest first."""
+        raise NotImplementedError
+
+    def is_empty(self):
+        """Returns True when the store holds no rows."""
+        return next(iter(self.iter_rows()), None) is None
+
+    def page(self, offset, limit):
+        """Returns up to `limit` rows, newest first, skipping the `offset` newest."""
+        newest = deque(self.iter_rows(), maxlen=offset + limit)
+        newest.reverse()
+        return list(newest)[offset:]
+
+    def write_workbook(self):
+        """Brings the store's Excel file up to date with every stored row."""
+        raise NotImplementedError
+
+    @instrumentation.timed("workbook_export")
+    def export_xlsx(self, filename):
+        """Streams every stored row into a new Excel file with bold, centered headers."""
+        import xlsx_export  # Imports openpyxl
+
+        xlsx_export.export_store(self, filename)
+
+    def close(self):
+        """Releases any files held by the store."""
+
+
+class ResultsJournal(ResultsStore):
+    """Append-only results store backed by a journal file and an Excel workbook.
+
+    The journal is the store: each call to append() writes a single line to
+    it, so saving a result never touches the workbook and costs the same
+    however many results are stored. The rows are read back from the
+    workbook (results saved before the journal existed) followed by the
+    journal. Only an explicit export, write_workbook(), folds the journal
+    into the .xlsx file; that rewrite grows with the number of rows and runs
+    on request, never as part of a save.
+    """
+
+    def __init__(self, filename, headers, sheet_name="Sheet", style_headers=False):
+        """Initialize the journal for one workbook sheet."""
+        self.filename = filename
+        self.headers = list(headers)
+        self.sheet_name = sheet_name
+        self.style_headers = style_headers
+
+        base = os.path.splitext(filename)[0]
+        self.journal_path = f"{base}_{sheet_name.replace(' ', '_')}.journal"
+        self._journal = None
+
+    def append_many(self, rows, skip_duplicates=False):
+        """Appends several result rows to the journal with a single flush."""
+        if skip_duplicates:
+            has_time = "Stopwatch Time" in self.headers
+            seen = {row_hash(row, has_time) for row in self.iter_rows()}
+            new_rows = []
+            for row in rows:
+                value = row_hash(row, has_time)
+                if value not in seen:
+                    seen.add(value)
+                    new_rows.append(row)
+            rows = new_rows
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write("".join(json.dumps(list(row)) + "\n" for row in rows))
+        self._journal.flush()
+        self._notify(rows)
+        return len(rows)
+
+    def _read_journal(self):
+        """Returns the rows waiting in the journal."""
+        if not os.path.exists(self.journal_path):
+            return []
+        with open(self.journal_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @instrumentation.timed("workbook_save")
+    def compact(self):
+        """Folds the journal rows into the workbook and empties the journal.
+
+        The old workbook is read in read-only mode and copied row by row into
+        a write-only one, followed by the journal rows, so neither workbook
+        is ever held in memory. Other sheets of the file are copied by value.
+        """
+        import openpyxl
+        import xlsx_export  # Bold, centered write-only header cells
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+        rows = self._read_journal()
+        if not rows:
+            return
+
+        old_wb = openpyxl.load_workbook(self.filename, read_only=True) if os.path.exists(self.filename) else None
+        sheet_names = old_wb.sheetnames if old_wb is not None else []
+        if self.sheet_name not in sheet_names:
+            sheet_names.append(self.sheet_name)
+        wb = openpyxl.Workbook(write_only=True)
+        try:
+            for name in sheet_names:
+                ws = wb.create_sheet(name)
+                has_rows = old_wb is not None and name in old_wb.sheetnames
+                old_rows = old_wb[name].iter_rows(values_only=True) if has_rows else iter(())
+                if name != self.sheet_name:
+                    for row in old_rows:
+                        ws.append(row)
+                    continue
+
+                # Keep the sheet's header row, or write one if the sheet is new
+                headers = next(old_rows, None)
+                if not headers or headers[0] is None:
+                    headers = self.headers
+                ws.append(xlsx_export.header_cells(ws, headers) if self.style_headers else list(headers))
+                for row in old_rows:
+                    ws.append(row)
+                for row in rows:
+                    ws.append(row)
+
+            # Save to a temporary file first so a crash never leaves a half-written workbook
+            temp_filename = self.filename + ".tmp"
+            wb.save(temp_filename)
+        finally:
+            if old_wb is not None:
+                old_wb.close()
+        os.replace(temp_filename, self.filename)
+        os.remove(self.journal_path)
+
+    def iter_rows(self):
+        """Yields the rows already in the workbook followed by the journaled rows."""
+        import openpyxl
+
+        if self._journal is not None:
+            self._journal.flush()
+        if os.path.exists(self.filename):
+            wb = openpyxl.load_workbook(self.filename, read_only=True)
+            if self.sheet_name in wb.sheetnames:
+                yield from wb[self.sheet_name].iter_rows(min_row=2, values_only=True)
+            wb.close()
+        yield from self._read_journal()
+
+    def write_workbook(self):
+        """Compacts the journal, which leaves the workbook up to date."""
+        self.compact()
+
+    def close(self):
+        """Releases the journal file; the rows stay in the journal until the next export."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SQLiteResultsStore(ResultsStore):
+    """Results store backed by an SQLite database in WAL mode.
+
+    Every test type shares one `results` table, indexed on test type and
+    date so range queries never scan the whole history. The Excel layout is
+    kept as an export format: write_workbook() regenerates the test type's
+    .xlsx file from the database.
+    """
+
+    indexed_page = True
+
+    def __init__(self, db_path, test_type):
+        """Open (and create if needed) the results database."""
+        self.db_path = db_path
+        self.test_type = test_type
+        self.filename, self.headers = LAYOUTS[test_type]
+        self.has_time = test_type == "Stopwatch"
+
+        # The writer thread inserts while the Tk thread may query, so guard the shared connection
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY,
+                    test_type TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    date_iso TEXT,
+                    stopwatch_time TEXT,
+                    words INTEGER NOT NULL,
+                    characters INTEGER NOT NULL,
+                    chars_per_sec REAL NOT NULL,
+                    row_hash INTEGER,
+                    lap_splits TEXT
+                )""")
+            self._add_row_hashes()
+            self._add_lap_splits()
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type_date ON results (test_type, date_iso)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_date ON results (date_iso)")
+            # Insertion order within a test type, for paging and iter_rows()
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type_id ON results (test_type, id)")
+            # Duplicate detection for bulk imports
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type_hash ON results (test_type, row_hash)")
+
+    def _add_row_hashes(self):
+        """Adds the row_hash column to databases created before it existed and fills it in."""
+        columns = [column[1] for column in self.conn.execute("PRAGMA table_info(results)")]
+        if "row_hash" not in columns:
+            self.conn.execute("ALTER TABLE results ADD COLUMN row_hash INTEGER")
+        records = self.conn.execute(
+            "SELECT id, date, stopwatch_time, words, characters, chars_per_sec FROM results"
+            " WHERE row_hash IS NULL").fetchall()
+        self.conn.executemany("UPDATE results SET row_hash = ? WHERE id = ?",
+                              [(row_hash(record[1:], True), record[0]) for record in records])
+
+    def _add_lap_splits(self):
+        """Adds the lap_splits column to databases created before it existed."""
+        columns = [column[1] for column in self.conn.execute("PRAGMA table_info(results)")]
+        if "lap_splits" not in columns:
+            self.conn.execute("ALTER TABLE results ADD COLUMN lap_splits TEXT")
+
+    def _to_record(self, row):
+        """Converts a layout row into a `results` table record."""
+        lap_splits = None
+        if self.has_time:
+            date, stopwatch_time, words, chars, chars_per_sec = row[:5]
+            if len(row) > 5 and row[5]:
+                lap_splits = row[5]
+        else:
+            date, words, chars, chars_per_sec = row[:4]
+            stopwatch_time = None
+        date = format_date(date)
+        words, chars, chars_per_sec = int(words), int(chars), float(chars_per_sec)
+        return (self.test_type, date, iso_date(date), stopwatch_time, words, chars, chars_per_sec, lap_splits,
+                row_hash((date, stopwatch_time, words, chars, chars_per_sec), True))
+
+    def _from_record(self, record):
+        """Converts a `results` table record back into a layout row."""
+        date, stopwatch_time, words, chars, chars_per_sec, lap_splits = record
+        if self.has_time:
+            return [date, stopwatch_time, words, chars, chars_per_sec, lap_splits or ""]
+        return [date, words, chars, chars_per_sec]
+
+    def append_many(self, rows, skip_duplicates=False):
+        """Inserts several rows in one transaction and returns how many were inserted."""
+        records = [self._to_record(row) for row in rows]
+        with self.lock, self.conn:
+            if skip_duplicates:
+                new = self._new_record_indexes(records)
+                records = [records[i] for i in new]
+                rows = [rows[i] for i in new]
+            self.conn.executemany(INSERT_RECORDS, records)
+        self._notify(rows)
+        return len(records)
+
+    def append_batches(self, batches):
+        """Inserts every batch of rows in `batches` in one transaction and returns how many were inserted.
+
+        A bad row, or the app stopping part way, leaves the database as it
+        was, so a failed import can simply be run again. The lock is only
+        held per batch, so `batches` may be a slow generator; the writer
+        thread is the only one that writes, so nothing else commits in
+        between. Listeners hear about the rows once they are committed.
+        """
+        with self.lock:
+            after_id, = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()
+        count = 0
+        try:
+            for rows in batches:
+                records = [self._to_record(row) for row in rows]
+                with self.lock:
+                    self.conn.executemany(INSERT_RECORDS, records)  # Opens the transaction the first time
+                count += len(records)
+            with self.lock:
+                self.conn.commit()
+        except BaseException:
+            with self.lock:
+                self.conn.rollback()
+            raise
+        if self.listeners:
+            rows = []
+            for row in self.iter_rows(after_id=after_id):
+                rows.append(row)
+                if len(rows) >= IMPORT_BATCH_SIZE:
+                    self._notify(rows)
+                    rows = []
+            if rows:
+                self._notify(rows)
+        return count
+
+    def _new_record_indexes(self, records):
+        """Indexes of the records whose hash is neither stored nor seen earlier in `records`."""
+        hashes = [record[-1] for record in records]
+        seen = set()
+        for start in range(0, len(hashes), HASH_LOOKUP_SIZE):
+            chunk = hashes[start:start + HASH_LOOKUP_SIZE]
+            seen.update(stored for stored, in self.conn.execute(
+                f"SELECT row_hash FROM results WHERE test_type = ? AND row_hash IN ({', '.join('?' * len(chunk))})",
+                [self.test_type, *chunk]))
+        new = []
+        for i, value in enumerate(hashes):
+            if value not in seen:
+                seen.add(value)
+                new.append(i)
+        return new
+
+    def iter_rows(self, batch_size=IMPORT_BATCH_SIZE, after_id=0, last_id=None):
+        """Yields every row of this test type in insertion order, one batch at a time.
+
+        `after_id` and `last_id` limit the rows to one range from id_ranges().
+        """
+        sql = f"SELECT id, {RECORD_COLUMNS} FROM results WHERE test_type = ? AND id > ?"
+        if last_id is not None:
+            sql += f" AND id <= {int(last_id)}"
+        sql += " ORDER BY id LIMIT ?"
+        while True:
+            with self.lock:
+                records = self.conn.execute(sql, (self.test_type, after_id, batch_size)).fetchall()
+            if not records:
+                return
+            after_id = records[-1][0]
+            for record in records:
+                yield self._from_record(record[1:])
+
+    def id_ranges(self, rows_per_range):
+        """Splits this test type's rows into (after id, last id) ranges of `rows_per_range` rows, oldest first."""
+        ranges = []
+        after_id = 0
+        with self.lock:
+            while True:
+                # Walks the (test_type, id) index; no rows are read
+                record = self.conn.execute(
+                    "SELECT id FROM results WHERE test_type = ? AND id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                    (self.test_type, after_id, rows_per_range - 1)).fetchone()
+                if record is None:
+                    last_id, = self.conn.execute("SELECT MAX(id) FROM results WHERE test_type = ? AND id > ?",
+                                                 (self.test_type, after_id)).fetchone()
+                    if last_id is not None:
+                        ranges.append((after_id, last_id))
+                    return ranges
+                ranges.append((after_id, record[0]))
+                after_id = record[0]
+
+    def page(self, offset, limit):
+        """Returns up to `limit` rows, newest first, skipping the `offset` newest."""
+        with self.lock:
+            records = self.conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM results WHERE test_type = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (self.test_type, limit, offset)).fetchall()
+        return [self._from_record(record) for record in records]
+
+    def query(self, start_date=None, end_date=None):
+        """Returns the rows dated between `start_date` and `end_date` (MM/DD/YYYY, inclusive)."""
+        sql = f"SELECT {RECORD_COLUMNS} FROM results WHERE test_type = ?"
+        params = [self.test_type]
+        if start_date:
+            sql += " AND date_iso >= ?"
+            params.append(iso_date(start_date))
+        if end_date:
+            sql += " AND date_iso <= ?"
+            params.append(iso_date(end_date))
+        with self.lock:
+            records = self.conn.execute(sql + " ORDER BY date_iso, id", params).fetchall()
+        return [self._from_record(record) for record in records]
+
+    def write_workbook(self):
+        """Regenerates the test type's Excel file from the database."""
+        temp_filename = self.filename + ".tmp"
+        self.export_xlsx(temp_filename)
+        os.replace(temp_filename, self.filename)
+
+    def close(self):
+        """Closes the database connection."""
+        with self.lock:
+            self.conn.close()
+
+
+def format_date(value):
+    """Returns an Excel date cell as MM/DD/YYYY text."""
+    if isinstance(value, datetime):
+        return value.strftime("%m/%d/%Y")
+    return str(value).strip()
+
+
+def row_hash(row, has_time):
+    """64-bit hash of a layout row's values, used to recognise duplicate results.
+
+    Dates are compared as MM/DD/YYYY text and characters per second to four
+    decimals, so a row read back from a workbook hashes like the original.
+    """
+    if has_time:
+        date, stopwatch_time, words, chars, chars_per_sec = row[:5]
+    else:
+        date, stopwatch_time, (words, chars, chars_per_sec) = row[0], None, row[-3:]
+    key = f"{format_date(date)}|{stopwatch_time or ''}|{int(words)}|{int(chars)}|{float(chars_per_sec):.4f}"
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def format_lap_splits(splits_ns):
+    """Formats lap split times (ns since the start) as seconds to the microsecond, separated by semicolons."""
+    return ";".join(f"{split_ns / 1e9:.6f}" for split_ns in splits_ns)
+
+
+def parse_lap_splits(text):
+    """Parses a "Lap Splits" cell back into split times in ns; raises ValueError unless they increase."""
+    splits_ns = []
+    for split in text.split(";") if text.strip() else []:
+        seconds = float(split)
+        # Also rejects inf and nan, which fail every comparison
+        if not 0 <= seconds < MAX_LAP_SPLIT_SECONDS:
+            raise ValueError(f"lap split out of range: {split.strip()}")
+        splits_ns.append(round(seconds * 1e9))
+    if any(b <= a for a, b in zip(splits_ns, splits_ns[1:])):
+        raise ValueError("lap splits must increase")
+    return splits_ns
+
+
+@functools.lru_cache(maxsize=4096)
+def iso_date(date):
+    """Converts MM/DD/YYYY text to YYYY-MM-DD so dates sort and index correctly."""
+    try:
+        return datetime.strptime(date, "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def import_xlsx(filename, store, sheet_names=None, batch_size=IMPORT_BATCH_SIZE):
+    """Streams the rows of an Excel results file into `store` and returns how many were imported.
+
+    Every sheet named in `sheet_names` that the workbook has is imported, in
+    that order; without any of them, the first sheet is. The workbook is
+    opened in read-only mode and rows are inserted in batches, so memory use
+    stays bounded no matter how large the file is. The batches go to the
+    store's append_batches(), so the SQLite store keeps all rows or none.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    try:
+        sheets = [wb[name] for name in sheet_names or () if name in wb.sheetnames] or [wb.worksheets[0]]
+        return store.append_batches(sheet_batches(sheets, batch_size))
+    finally:
+        wb.close()
+
+
+def sheet_batches(sheets, batch_size):
+    """Yields the rows below the header of each sheet in lists of up to `batch_size`, skipping blank rows."""
+    batch = []
+    for ws in sheets:
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if not row or row[0] is None:
+                continue  # Skip blank rows
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class ResultsWriter:
+    """Runs results-store writes on a background thread so Tk never blocks on disk I/O.
+
+    Requests go through a bounded queue and are flushed in batches. Each
+    request may carry an `on_done(error)` callback; callbacks are collected
+    by an after() poll on the Tk thread, so they are free to touch widgets.
+    """
+
+    def __init__(self, root):
+        """Initialize the writer and start its worker thread."""
+        self.root = root
+        self.requests = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+        self.completed = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self.thread.start()
+        self._poll_id = self.root.after(WRITER_POLL_MS, self._poll)
+
+    def submit(self, store, row, on_done=None):
+        """Queues one result row to be appended to `store`."""
+        self._put(("append", store, row, on_done))
+
+    def write_workbook(self, store, on_done=None):
+        """Queues an update of `store`'s Excel file."""
+        self.call(store.write_workbook, on_done)
+
+    def call(self, func, on_done=None):
+        """Queues `func()` to run on the writer thread, in order with the other requests."""
+        self._put(("call", func, None, on_done))
+
+    def _put(self, request):
+        try:
+            self.requests.put(request, timeout=SUBMIT_TIMEOUT)
+        except queue.Full:
+            raise RuntimeError("The results writer is busy. Please try again.") from None
+
+    def _run(self):
+        """Worker loop: handles queued requests in batches until close() is called."""
+        while True:
+            batch = [self.requests.get()]
+            while len(batch) < WRITER_BATCH_SIZE:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._flush([request for request in batch if request is not None])
+            if stop:
+                return
+
+    @instrumentation.timed("results_writer_flush")
+    def _flush(self, batch):
+        """Writes one batch, grouping consecutive appends to the same store into one flush."""
+        i = 0
+        while i < len(batch):
+            kind, store = batch[i][0], batch[i][1]
+            j = i + 1
+            if kind == "append":
+                while j < len(batch) and batch[j][0] == "append" and batch[j][1] is store:
+                    j += 1
+            try:
+                if kind == "append":
+                    store.append_many([request[2] for request in batch[i:j]])
+                else:
+                    store()  # A "call" request carries the function in the store slot
+                error = None
+            except Exception as e:  # Reported back to the Tk thread instead of killing the worker
+                error = e
+            for request in batch[i:j]:
+                if request[3] is not None:
+                    self.completed.put((request[3], error))
+            i = j
+
+    def _poll(self):
+        """Delivers finished requests to their callbacks on the Tk thread."""
+        try:
+            self._deliver()
+        finally:
+            self._poll_id = self.root.after(WRITER_POLL_MS, self._poll)
+
+    def _deliver(self):
+        while True:
+            try:
+                on_done, error = self.completed.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                on_done(error)
+            except Exception:  # Reported like any failed Tk callback; later saves are still acknowledged
+                self.root.report_callback_exception(*sys.exc_info())
+
+    def close(self):
+        """Stops accepting work, drains every pending write and stops the worker."""
+        self.root.after_cancel(self._poll_id)
+        self.requests.put(None)
+        self.thread.join()
+
+
+# Command line: benchmark the journal, or import/export results
+if __name__ == "__main__":
+    import argparse
+    import statistics
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Typing test results store tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("bench", help="measure per-insert latency as the store grows")
+    import_parser = commands.add_parser("import", help="import an Excel results file into the database")
+    import_parser.add_argument("xlsx")
+    import_parser.add_argument("test_type", choices=sorted(LAYOUTS))
+    import_parser.add_argument("--sheet")
+    export_parser = commands.add_parser("export", help="export database results to an Excel file")
+    export_parser.add_argument("test_type", choices=sorted(LAYOUTS))
+    export_parser.add_argument("xlsx")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        store = SQLiteResultsStore(DATABASE_FILENAME, args.test_type)
+        start = time.perf_counter()
+        count = import_xlsx(args.xlsx, store, sheet_names=[args.sheet] if args.sheet else None)
+        store.close()
+        print(f"Imported {count} rows in {time.perf_counter() - start:.1f} s")
+
+    elif args.command == "export":
+        store = SQLiteResultsStore(DATABASE_FILENAME, args.test_type)
+        store.export_xlsx(args.xlsx)
+        store.close()
+
+    else:
+        # Per-insert latency should stay flat as the store grows; the Excel export is timed on its own
+        with tempfile.TemporaryDirectory() as tmp:
+            for backend in ("journal", "sqlite"):
+                if backend == "journal":
+                    store = ResultsJournal(os.path.join(tmp, "bench.xlsx"), ONE_MINUTE_HEADERS)
+                else:
+                    store = SQLiteResultsStore(os.path.join(tmp, "bench.db"), "OneMinute")
+                print(f"{backend} backend:")
+                checkpoints = (10, 100, 1_000, 10_000, 100_000)
+                export_checkpoints = (1_000, 10_000, 100_000)
+                latencies = []
+                for i in range(1, checkpoints[-1] + 1):
+                    start = time.perf_counter()
+                    store.append(["01/01/2024", 40, 200, 3.33])
+                    latencies.append(time.perf_counter() - start)
+                    if i in checkpoints:
+                        window = latencies[-min(i, 1000):]
+                        print(f"{i:>7} rows: median {statistics.median(window) * 1e6:7.1f} us, "
+                              f"max {max(window) * 1e6:8.1f} us per insert")
+                    if i in export_checkpoints:
+                        start = time.perf_counter()
+                        store.write_workbook()
+                        print(f"{i:>7} rows: exporting to the workbook took {time.perf_counter() - start:.2f} s")
+                store.close()
@@ -0,0 +1,99 @@
+"""Batch scoring of saved typing test sessions, without a display.
+
+Usage:
+    python score_batch.py keystroke_logs/ transcripts/ --seconds 60 --output scores.csv
+
+Every keystroke log (.ksl) and transcript (.txt) under the given paths is
+scored with the same rules as the test windows. Keystroke logs carry their
+own test length; transcripts use --seconds. Files are scored in parallel across all cores and the
+summary statistics are aggregated with NumPy.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+
+# pip install numpy
+import numpy as np
+
+import keystroke_log  # Binary keystroke logs
+import scoring  # Headless word and character counting
+
+SESSION_EXTENSIONS = (keystroke_log.LOG_EXTENSION, ".txt")
+
+
+def find_files(paths, extensions):
+    """Yields every file under `paths` with one of the given extensions."""
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.endswith(extensions):
+                        yield os.path.join(folder, filename)
+        else:
+            yield path
+
+
+def score_file(job):
+    """Scores one saved session; runs in a worker process."""
+    path, seconds = job
+    if path.endswith(keystroke_log.LOG_EXTENSION):
+        header, records = keystroke_log.open_log(path)
+        text = scoring.text_from_keystrokes(records["keysym"].tolist(), records["action"].tolist())
+        seconds = header["duration_ns"] / 1e9
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    return path, scoring.count_words(text), scoring.count_characters(text), seconds
+
+
+def summarize(values):
+    """Returns mean, median, 95th percentile and maximum of `values`."""
+    if len(values) == 0:
+        return dict.fromkeys(("mean", "median", "p95", "max"), 0.0)
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"mean": float(values.mean()), "median": float(p50), "p95": float(p95), "max": float(values.max())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score saved typing test sessions offline.")
+    parser.add_argument("paths", nargs="+", help="session files or folders to scan")
+    parser.add_argument("--seconds", type=float, default=60.0,
+                        help="test length used for transcripts (default: one minute)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", help="CSV file for the per-session scores (default: stdout)")
+    args = parser.parse_args(argv)
+
+    jobs = [(path, args.seconds) for path in find_files(args.paths, SESSION_EXTENSIONS)]
+    if not jobs:
+        parser.error("no session files found")
+
+    with multiprocessing.Pool(args.workers) as pool:
+        rows = sorted(pool.imap_unordered(score_file, jobs, chunksize=max(1, len(jobs) // 256)))
+
+    # Aggregate every session at once
+    words = np.array([row[1] for row in rows], dtype=np.int64)
+    characters = np.array([row[2] for row in rows], dtype=np.int64)
+    seconds = np.array([row[3] for row in rows], dtype=np.float64)
+    valid = seconds > 0
+    cps = np.divide(characters, seconds, out=np.zeros(len(rows)), where=valid)
+    wpm = np.divide(words * 60, seconds, out=np.zeros(len(rows)), where=valid)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.writer(output)
+    writer.writerow(["File", "Words", "Characters", "Seconds", "Characters per Second", "Words per Minute"])
+    for row, row_cps, row_wpm in zip(rows, cps, wpm):
+        writer.writerow([row[0], row[1], row[2], f"{row[3]:.3f}", f"{row_cps:.2f}", f"{row_wpm:.1f}"])
+    if args.output:
+        output.close()
+
+    print(f"Scored {len(rows)} sessions", file=sys.stderr)
+    for name, values in (("Characters per second", cps), ("Words per minute", wpm)):
+        stats = summarize(values[valid])
+        print(f"{name}: mean {stats['mean']:.2f}, median {stats['median']:.2f}, "
+              f"p95 {stats['p95']:.2f}, max {stats['max']:.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
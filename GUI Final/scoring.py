@@ -0,0 +1,149 @@
+"""Word and character scoring shared by the typing and stopwatch tests.
+
+This module has no GUI imports so results can also be computed offline.
+"""
+from keystroke_capture import PRESS
+
+# X11 keysyms that edit the text without being printable characters
+KEYSYM_BACKSPACE = 0xFF08
+KEYSYM_CHARACTERS = {
+    0xFF09: "\t",  # Tab
+    0xFF0D: "\n",  # Return
+    0xFF8D: "\n",  # KP_Enter
+    0xFF80: " ",  # KP_Space
+    0xFFAA: "*", 0xFFAB: "+", 0xFFAD: "-", 0xFFAE: ".", 0xFFAF: "/",  # Keypad operators
+}
+KEYSYM_CHARACTERS.update({0xFFB0 + digit: str(digit) for digit in range(10)})  # KP_0 .. KP_9
+
+
+def count_words(text):
+    """Returns the number of whitespace-separated words in `text`."""
+    return len(text.split())
+
+
+def count_characters(text):
+    """Returns the number of typed characters, not counting spaces and line breaks."""
+    return len(text) - text.count(" ") - text.count("\n")
+
+
+def chars_per_second(characters, elapsed_seconds):
+    """Returns the typing speed in characters per second."""
+    return characters / elapsed_seconds if elapsed_seconds > 0 else 0
+
+
+def words_per_minute(words, elapsed_seconds):
+    """Returns the typing speed in words per minute."""
+    return words * 60 / elapsed_seconds if elapsed_seconds > 0 else 0
+
+
+def score_counts(words, characters, elapsed_seconds):
+    """Returns the results of a test from its word and character totals."""
+    return {
+        "words": words,
+        "characters": characters,
+        "seconds": elapsed_seconds,
+        "chars_per_sec": chars_per_second(characters, elapsed_seconds),
+        "wpm": words_per_minute(words, elapsed_seconds),
+    }
+
+
+def score_text(text, elapsed_seconds):
+    """Returns the results of a test from the full typed text."""
+    return score_counts(count_words(text), count_characters(text), elapsed_seconds)
+
+
+def format_hms(elapsed_seconds):
+    """Formats elapsed seconds as HH:MM:SS."""
+    seconds = int(elapsed_seconds)
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def format_split(elapsed_ns):
+    """Formats elapsed nanoseconds as HH:MM:SS.mmm."""
+    return f"{format_hms(elapsed_ns // 1_000_000_000)}.{elapsed_ns // 1_000_000 % 1000:03}"
+
+
+def keysym_to_char(keysym):
+    """Returns the character typed by an X11 keysym, or None for keys that type nothing."""
+    if 0x20 <= keysym <= 0x7E or 0xA0 <= keysym <= 0xFF:
+        return chr(keysym)  # Latin-1 keysyms equal their code points
+    if 0x01000100 <= keysym <= 0x0110FFFF:
+        return chr(keysym - 0x01000000)  # Unicode keysyms
+    return KEYSYM_CHARACTERS.get(keysym)
+
+
+def text_from_keystrokes(keysyms, actions):
+    """Rebuilds the text typed by a key event stream.
+
+    Only plain key presses count: characters are appended and BackSpace
+    removes the last one. Cursor movement and mouse edits are not recorded,
+    so edits made away from the end of the text are not reproduced.
+    """
+    typed = []
+    for keysym, action in zip(keysyms, actions):
+        if action != PRESS:
+            continue  # Releases and Control/Alt shortcuts type nothing
+        if keysym == KEYSYM_BACKSPACE:
+            if typed:
+                typed.pop()
+            continue
+        char = keysym_to_char(keysym)
+        if char is not None:
+            typed.append(char)
+    return "".join(typed)
+
+
+class IncrementalTextCounter:
+    """Keeps word and character totals of an edited text up to date in O(edit) time.
+
+    Every insert or delete is reported together with the single characters
+    just left and right of the edited range (or "" at either end of the
+    text). Whether a word is split or joined only depends on those two
+    neighbours, so the totals never need a rescan of the whole text.
+    """
+
+    def __init__(self):
+        """Initialize the counter for an empty text."""
+        self.words = 0
+        self.characters = 0
+
+    def reset(self):
+        """Sets the totals back to those of an empty text."""
+        self.words = 0
+        self.characters = 0
+
+    def on_insert(self, left, text, right):
+        """Updates the totals after `text` was inserted between `left` and `right`."""
+        self.words += count_words(left + text + right) - count_words(left + right)
+        self.characters += count_characters(text)
+
+    def on_delete(self, left, removed, right):
+        """Updates the totals after `removed` was deleted from between `left` and `right`."""
+        self.words += count_words(left + right) - count_words(left + removed + right)
+        self.characters -= count_characters(removed)
+
+
+# Self-check: the incremental totals must match a full recount after random edits
+if __name__ == "__main__":
+    import random
+
+    alphabet = "ab \n\t."
+    rng = random.Random(1234)
+    for script in range(2000):
+        text = ""
+        counter = IncrementalTextCounter()
+        for step in range(50):
+            start = rng.randint(0, len(text))
+            if text and rng.random() < 0.4:
+                end = rng.randint(start, min(len(text), start + 5))
+                removed = text[start:end]
+                text = text[:start] + text[end:]
+                counter.on_delete(text[start - 1:start] if start else "", removed, text[start:start + 1])
+            else:
+                inserted = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                text = text[:start] + inserted + text[start:]
+                counter.on_insert(text[start - 1:start] if start else "", inserted,
+                                  text[start + len(inserted):start + len(inserted) + 1])
+            assert (counter.words, counter.characters) == (count_words(text), count_characters(text)), \
+                (script, step, repr(text))
+    print("Incremental counts match full recounts for 2000 random edit scripts")
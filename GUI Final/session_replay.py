@@ -0,0 +1,249 @@
+"""Replay of recorded typing sessions from their keystroke logs.
+
+SessionReplay rebuilds the text box contents at any moment of a session.
+A snapshot of the text is kept every `checkpoint_every` edits, so a seek
+is a binary search plus at most that many edits replayed on top of the
+nearest snapshot. ReplayWindow plays a session back in a read-only
+typing test window at 1x to 16x speed.
+"""
+import bisect
+import tkinter as tk
+from array import array
+from tkinter import messagebox
+
+import keystroke_capture  # Key event action codes
+import keystroke_log  # Binary keystroke logs
+import scoring  # Keysym to character mapping
+import timer_scheduler  # Drift-free frame timer
+import typing_test  # The window the replay is shown in
+
+DEFAULT_CHECKPOINT_EVERY = 256
+BACKSPACE = 0  # Edit code for BackSpace; other codes are the typed character's code point
+FRAME_MS = 33  # About 30 frames per second
+SPEEDS = (1, 2, 4, 8, 16)
+
+
+class SessionReplay:
+    """Reconstructs the typed text of a session at any timestamp."""
+
+    def __init__(self, timestamps, keysyms, actions, duration_ns, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        """Builds the edit list and checkpoint index from a session's key events."""
+        self.duration_ns = duration_ns
+        self.checkpoint_every = checkpoint_every
+        self.times = array('q')  # Time of each edit, in ns since the test started
+        self.edits = array('I')  # Code point typed, or BACKSPACE
+        for timestamp, keysym, action in zip(timestamps, keysyms, actions):
+            if action != keystroke_capture.PRESS:
+                continue
+            if keysym == scoring.KEYSYM_BACKSPACE:
+                self.times.append(timestamp)
+                self.edits.append(BACKSPACE)
+                continue
+            char = scoring.keysym_to_char(keysym)
+            if char is not None:
+                self.times.append(timestamp)
+                self.edits.append(ord(char))
+
+        # checkpoints[k] is the text after the first k * checkpoint_every edits
+        self.checkpoints = []
+        typed = []
+        for i, edit in enumerate(self.edits):
+            if i % checkpoint_every == 0:
+                self.checkpoints.append("".join(typed))
+            apply_edit(typed, edit)
+        if len(self.edits) % checkpoint_every == 0:
+            self.checkpoints.append("".join(typed))
+
+    @classmethod
+    def from_log(cls, path, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        """Loads a replay from a keystroke log file."""
+        header, records = keystroke_log.open_log(path)
+        return cls(records["t_ns"].tolist(), records["keysym"].tolist(), records["action"].tolist(),
+                   header["duration_ns"], checkpoint_every)
+
+    def edits_before(self, t_ns):
+        """Number of edits made up to and including time `t_ns`."""
+        return bisect.bisect_right(self.times, t_ns)
+
+    def text_after(self, edit_count):
+        """Returns the text after the first `edit_count` edits."""
+        checkpoint = min(edit_count // self.checkpoint_every, len(self.checkpoints) - 1)
+        typed = list(self.checkpoints[checkpoint])
+        for edit in self.edits[checkpoint * self.checkpoint_every:edit_count]:
+            apply_edit(typed, edit)
+        return "".join(typed)
+
+    def text_at(self, t_ns):
+        """Returns what was in the text box at time `t_ns`."""
+        return self.text_after(self.edits_before(t_ns))
+
+
+def apply_edit(typed, edit):
+    """Applies one edit code to a list of characters."""
+    if edit == BACKSPACE:
+        if typed:
+            typed.pop()
+    else:
+        typed.append(chr(edit))
+
+
+class ReplayWindow(typing_test.TypingTestWindow):
+    """Read-only typing test window that plays back a recorded session."""
+
+    score_passage = False  # Keystroke logs do not record the passage, so errors against one would mean nothing
+
+    def __init__(self, master):
+        """Initialize the replay window with playback controls instead of the Start button."""
+        super().__init__(master)
+        self.title("Typing Session Replay")
+        self.replay = None
+        self.position_ns = 0  # Session time currently shown
+        self.shown_edits = 0  # Edits currently applied to the text box
+        self.play_origin = (0, 0)  # (frame timer elapsed ns, session position ns) when playback last changed
+        self.frames = timer_scheduler.TickScheduler(self, FRAME_MS, self.draw_frame)
+
+        self.start_button.pack_forget()
+        self.passage_box.pack_forget()
+        self.text_box.config(state=tk.DISABLED)
+        self.live_label.config(text="WPM: 0  CPS: 0.00")
+
+        controls = tk.Frame(self, bg=typing_test.BG_COLOR)
+        controls.pack(side=tk.BOTTOM)
+        self.play_button = tk.Button(controls, text="Play", command=self.toggle_play,
+                                     bg=typing_test.BUTTON_COLOR, fg=typing_test.TEXT_COLOR)
+        self.play_button.pack(side=tk.LEFT, padx=5)
+        self.speed = tk.IntVar(self, value=1)
+        tk.OptionMenu(controls, self.speed, *SPEEDS, command=lambda speed: self.restart_clock()).pack(side=tk.LEFT)
+        tk.Label(controls, text="x speed", bg=typing_test.BG_COLOR).pack(side=tk.LEFT)
+
+        self.scrubber = tk.Scale(self, from_=0, to=0, orient=tk.HORIZONTAL, resolution=0.1, showvalue=False,
+                                 length=380, bg=typing_test.BG_COLOR, highlightthickness=0)
+        self.scrubber.pack(side=tk.BOTTOM)
+        self.scrubber.bind("<ButtonRelease-1>", lambda event: self.seek(int(self.scrubber.get() * 1e9)))
+
+    def load(self, path):
+        """Loads a keystroke log and shows the start of the session."""
+        try:
+            self.replay = SessionReplay.from_log(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not open the keystroke log: {e}")
+            return
+        self.scrubber.config(to=self.replay.duration_ns / 1e9)
+        self.seek(0)
+
+    def reset(self):
+        """Stops playback and clears the view."""
+        self.frames.stop()
+        self.text_box.config(state=tk.NORMAL)  # A disabled text box ignores the clearing in reset()
+        super().reset()
+        self.text_box.config(state=tk.DISABLED)
+        self.live_label.config(text="WPM: 0  CPS: 0.00")
+        self.play_button.config(text="Play")
+        self.replay = None
+        self.position_ns = 0
+        self.shown_edits = 0
+
+    def toggle_play(self):
+        """Starts or pauses playback."""
+        if self.replay is None:
+            return
+        if self.frames.running:
+            self.frames.stop()
+            self.play_button.config(text="Play")
+            return
+        if self.position_ns >= self.replay.duration_ns:
+            self.seek(0)
+        self.frames.start()
+        self.restart_clock()
+        self.play_button.config(text="Pause")
+
+    def restart_clock(self):
+        """Makes playback continue from the current position at the selected speed."""
+        self.play_origin = (self.frames.elapsed_ns(), self.position_ns)
+
+    def draw_frame(self, elapsed_ns):
+        """Advances the view to the session time that matches the frame timer."""
+        frame_origin, position_origin = self.play_origin
+        position = position_origin + (elapsed_ns - frame_origin) * self.speed.get()
+        if position >= self.replay.duration_ns:
+            position = self.replay.duration_ns
+            self.frames.stop()
+            self.play_button.config(text="Play")
+        self.show_position(position)
+
+    def seek(self, position_ns):
+        """Jumps to a session time, rebuilding the text from the nearest checkpoint."""
+        if self.replay is None:
+            return
+        self.position_ns = max(0, min(position_ns, self.replay.duration_ns))
+        self.shown_edits = self.replay.edits_before(self.position_ns)
+        self.text_box.config(state=tk.NORMAL)
+        self.text_box.delete("1.0", tk.END)
+        self.text_box.insert("1.0", self.replay.text_after(self.shown_edits))
+        self.text_box.config(state=tk.DISABLED)
+        self.restart_clock()
+        self.update_labels()
+
+    def show_position(self, position_ns):
+        """Applies only the edits made since the last frame."""
+        target = self.replay.edits_before(position_ns)
+        self.position_ns = position_ns
+        if target < self.shown_edits:
+            self.seek(position_ns)
+            return
+
+        self.text_box.config(state=tk.NORMAL)
+        pending = []  # Consecutive characters are inserted together
+        for edit in self.replay.edits[self.shown_edits:target]:
+            if edit == BACKSPACE:
+                if pending:
+                    pending.pop()
+                else:
+                    self.text_box.delete("end-2c")
+            else:
+                pending.append(chr(edit))
+        if pending:
+            self.text_box.insert("end-1c", "".join(pending))
+        self.text_box.config(state=tk.DISABLED)
+        self.text_box.see("end")
+        self.shown_edits = target
+        self.update_labels()
+
+    def update_labels(self):
+        """Shows the playback position and the typing speed at that point."""
+        position = self.position_ns / 1e9
+        self.timer_label.config(text=f"Replay: {scoring.format_hms(position)} / "
+                                     f"{scoring.format_hms(self.replay.duration_ns / 1e9)}")
+        self.scrubber.set(position)
+        self.update_live_speed(position)
+
+    def update_live_speed(self, elapsed_time):
+        """Shows the words per minute and characters per second at the replayed moment."""
+        wpm = scoring.words_per_minute(self.counter.words, elapsed_time)
+        cps = scoring.chars_per_second(self.counter.characters, elapsed_time)
+        self.live_label.config(text=f"WPM: {wpm:.0f}  CPS: {cps:.2f}")
+
+
+# Self-check: seeking must give the same text as replaying every edit from the start
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(7)
+    keysyms, timestamps = [], []
+    for i in range(20_000):
+        keysyms.append(scoring.KEYSYM_BACKSPACE if rng.random() < 0.1 else rng.choice(b"asdf jkl;"))
+        timestamps.append(i * 80_000_000)
+    replay = SessionReplay(timestamps, keysyms, [keystroke_capture.PRESS] * len(keysyms), timestamps[-1])
+
+    for _ in range(1000):
+        t_ns = rng.randrange(replay.duration_ns)
+        expected = scoring.text_from_keystrokes(keysyms[:bisect.bisect_right(timestamps, t_ns)],
+                                                [keystroke_capture.PRESS] * len(keysyms))
+        assert replay.text_at(t_ns) == expected
+    print("Seeks match a full replay")
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        replay.text_at(rng.randrange(replay.duration_ns))
+    print(f"{(time.perf_counter() - start) / 10_000 * 1e6:.0f} us per seek in a {len(keysyms)}-key session")
@@ -0,0 +1,510 @@
+"""Classroom session server: many typists, one synchronized test, one results store.
+
+Usage:
+    python session_server.py serve --port 8765 --students 30
+    python session_server.py loadtest --clients 300 --rate 8 --seconds 10 --output load.json
+
+Each student runs `python main.py --connect HOST:PORT --name NAME`. The
+client streams its key events to the server in small batches while the
+student types. The server starts every test at the same wall-clock moment
+(clients correct for clock offset with a ping exchange), rebuilds and
+scores each student's text centrally and writes all results through one
+store on a single worker thread, so nothing has to be merged by hand.
+
+Messages are length-prefixed frames over TCP: a type byte and a 32-bit
+payload length, followed by either JSON (control messages) or packed key
+event records in the keystroke log record format (key batches).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import keystroke_capture  # Key event action codes
+import keystroke_log  # Record format shared with the keystroke logs
+import results_store  # Where the scored results are written
+import scoring  # Central scoring of the streamed key events
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_SECONDS = 60
+START_DELAY_MS = 3000  # Time between announcing a test and its start, so every client is ready
+FINISH_GRACE_MS = 5000  # Time allowed after the deadline for clients to send their last batch
+MAX_PAYLOAD = 1 << 20
+
+# Frame header: message type, payload length
+FRAME = struct.Struct("<BI")
+SEQUENCE = struct.Struct("<I")  # Leads every KEYS payload and is echoed by ACK
+PING_TIMES = struct.Struct("<qq")  # Client send time, server receive time (Unix ns)
+
+# Message types
+HELLO = 1  # client -> server, JSON {"name"}
+WELCOME = 2  # server -> client, JSON {"id", "test_type", "duration_ms"}
+START = 3  # server -> client, JSON {"start_at_unix_ns", "duration_ms"}
+KEYS = 4  # client -> server, sequence number + key event records (time since the start)
+ACK = 5  # server -> client, sequence number of a KEYS batch
+DONE = 6  # client -> server, JSON {"elapsed_ns"}
+RESULT = 7  # server -> client, JSON with the scored result
+PING = 8  # client -> server, PING_TIMES with the server time unset
+PONG = 9  # server -> client, PING_TIMES
+ERROR = 10  # server -> client, JSON {"message"}
+
+
+def frame(kind, payload=b""):
+    """Returns one encoded message."""
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+def json_frame(kind, message):
+    """Returns one encoded JSON message."""
+    return frame(kind, json.dumps(message).encode())
+
+
+def keys_frame(sequence, timestamps, keysyms, actions):
+    """Returns a KEYS message; `timestamps` are ns since the start of the test."""
+    payload = bytearray(SEQUENCE.size + len(timestamps) * keystroke_log.RECORD.size)
+    SEQUENCE.pack_into(payload, 0, sequence)
+    offset = SEQUENCE.size
+    for timestamp, keysym, action in zip(timestamps, keysyms, actions):
+        keystroke_log.RECORD.pack_into(payload, offset, timestamp, keysym, action)
+        offset += keystroke_log.RECORD.size
+    return frame(KEYS, bytes(payload))
+
+
+async def read_message(reader):
+    """Reads one message and returns (type, payload bytes)."""
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if length > MAX_PAYLOAD:
+        raise ValueError(f"Message of {length} bytes is too large")
+    return kind, await reader.readexactly(length)
+
+
+def json_payload(payload):
+    """Decodes a JSON control message; raises ValueError unless it is a JSON object."""
+    message = json.loads(payload)  # JSONDecodeError and UnicodeDecodeError are ValueErrors
+    if not isinstance(message, dict):
+        raise ValueError("Control messages must be JSON objects")
+    return message
+
+
+def check_keys_payload(payload):
+    """Raises ValueError unless a KEYS payload is a sequence number followed by whole records."""
+    if len(payload) < SEQUENCE.size or (len(payload) - SEQUENCE.size) % keystroke_log.RECORD.size:
+        raise ValueError(f"Malformed key batch of {len(payload)} bytes")
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Nearest-rank percentiles of `values`, plus the maximum."""
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{p}": 0 for p in points} | {"max": 0}
+    summary = {f"p{p}": ordered[max(0, -(-len(ordered) * p // 100) - 1)] for p in points}
+    summary["max"] = ordered[-1]
+    return summary
+
+
+class Typist:
+    """Key events received from one connected student during the current test."""
+
+    def __init__(self, client_id, name, writer):
+        """Initialize an empty session for one client connection."""
+        self.client_id = client_id
+        self.name = name
+        self.writer = writer
+        self.reset()
+
+    def reset(self):
+        """Forgets the key events of the previous test."""
+        self.timestamps = array('q')
+        self.keysyms = array('I')
+        self.actions = array('B')
+        self.finished = False
+
+    def add_keys(self, payload):
+        """Appends the key events of one KEYS payload; returns its sequence number."""
+        for timestamp, keysym, action in keystroke_log.RECORD.iter_unpack(memoryview(payload)[SEQUENCE.size:]):
+            self.timestamps.append(timestamp)
+            self.keysyms.append(keysym)
+            self.actions.append(action)
+        return SEQUENCE.unpack_from(payload)[0]
+
+
+class SessionServer:
+    """Runs synchronized tests for every connected client and stores the scored results."""
+
+    def __init__(self, store, test_type="OneMinute", duration_ms=DEFAULT_SECONDS * 1000,
+                 start_delay_ms=START_DELAY_MS, log_dir=keystroke_log.LOG_DIR):
+        """Initialize the server; results go to `store` and keystroke logs to `log_dir` (None to skip)."""
+        self.store = store
+        self.test_type = test_type
+        self.duration_ms = duration_ms
+        self.start_delay_ms = start_delay_ms
+        self.log_dir = log_dir
+        self.typists = {}  # client id -> Typist
+        self.participants = set()  # Ids of the clients the running test was started for
+        self.next_id = 1
+        self.start_unix_ns = None  # Start of the running test
+        self.results = None  # Scored rows waiting for the store
+        self.store_thread = ThreadPoolExecutor(max_workers=1)  # One writer for every client
+        self.batch_ns = array('q')  # Server time spent on each key batch
+        self.batch_events = 0
+        self.stored = 0
+        self.joined = None
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts listening and returns the asyncio server."""
+        self.results = asyncio.Queue()
+        self.joined = asyncio.Condition()
+        asyncio.create_task(self.store_results())
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def wait_for_clients(self, count):
+        """Waits until at least `count` clients have joined."""
+        async with self.joined:
+            await self.joined.wait_for(lambda: len(self.typists) >= count)
+
+    def start_test(self):
+        """Announces a test to every connected client; it starts after the start delay.
+
+        Only the clients connected now take part. Clients that join while the
+        test runs wait for the next one, and are neither scored nor stored.
+        """
+        self.start_unix_ns = time.time_ns() + self.start_delay_ms * 1_000_000
+        self.participants = set(self.typists)
+        message = json_frame(START, {"start_at_unix_ns": self.start_unix_ns, "duration_ms": self.duration_ms})
+        for typist in self.typists.values():
+            typist.reset()
+            typist.writer.write(message)
+        asyncio.get_running_loop().call_later((self.start_delay_ms + self.duration_ms + FINISH_GRACE_MS) / 1000,
+                                              self.finish_stragglers, self.start_unix_ns)
+        return self.start_unix_ns
+
+    def finish_stragglers(self, start_unix_ns):
+        """Scores the clients that never sent DONE, using the key events received so far."""
+        if start_unix_ns != self.start_unix_ns:
+            return  # A newer test has started
+        for client_id in self.participants:
+            typist = self.typists.get(client_id)  # Participants who disconnected are not scored
+            if typist is not None and not typist.finished:
+                self.finish(typist, self.duration_ms * 1_000_000)
+        self.participants = set()
+
+    async def handle_client(self, reader, writer):
+        """Serves one client connection until it disconnects."""
+        typist = None
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                received_ns = time.perf_counter_ns()
+                if kind == KEYS and typist is not None:
+                    check_keys_payload(payload)
+                    sequence = typist.add_keys(payload)
+                    writer.write(frame(ACK, SEQUENCE.pack(sequence)))
+                    self.batch_ns.append(time.perf_counter_ns() - received_ns)
+                    self.batch_events += (len(payload) - SEQUENCE.size) // keystroke_log.RECORD.size
+                elif kind == PING:
+                    sent_ns, _ = PING_TIMES.unpack(payload)
+                    writer.write(frame(PONG, PING_TIMES.pack(sent_ns, time.time_ns())))
+                elif kind == HELLO and typist is None:
+                    name = json_payload(payload).get("name", "")
+                    if not isinstance(name, str):
+                        raise ValueError("The name must be a string")
+                    typist = self.add_typist(name, writer)
+                    writer.write(json_frame(WELCOME, {"id": typist.client_id, "test_type": self.test_type,
+                                                      "duration_ms": self.duration_ms}))
+                    async with self.joined:
+                        self.joined.notify_all()
+                elif kind == DONE and typist is not None:
+                    elapsed_ns = json_payload(payload).get("elapsed_ns")
+                    if not isinstance(elapsed_ns, int) or elapsed_ns < 0:
+                        raise ValueError("elapsed_ns must be a whole number of nanoseconds")
+                    self.finish(typist, elapsed_ns)
+                else:
+                    writer.write(json_frame(ERROR, {"message": f"Unexpected message type {kind}"}))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass  # Client went away or sent a malformed frame; drop the connection
+        finally:
+            if typist is not None:
+                self.typists.pop(typist.client_id, None)
+            writer.close()
+
+    def add_typist(self, name, writer):
+        """Registers a new client under a unique id."""
+        name = re.sub(r"[^\w-]", "_", name.strip())[:40] or f"student{self.next_id}"
+        typist = Typist(self.next_id, name, writer)
+        self.typists[typist.client_id] = typist
+        self.next_id += 1
+        return typist
+
+    def finish(self, typist, elapsed_ns):
+        """Scores a finished test, replies with the result and queues the row for the store."""
+        if typist.finished or typist.client_id not in self.participants:
+            return  # Already scored, or joined after the test started
+        typist.finished = True
+        if self.test_type == "OneMinute":
+            elapsed_ns = self.duration_ms * 1_000_000  # Keys after the deadline do not count
+        end = bisect_right(typist.timestamps, elapsed_ns)
+        text = scoring.text_from_keystrokes(typist.keysyms[:end], typist.actions[:end])
+        results = scoring.score_text(text, elapsed_ns / 1e9)
+        results["name"] = typist.name
+        typist.writer.write(json_frame(RESULT, results))
+
+        date = datetime.fromtimestamp(self.start_unix_ns / 1e9).strftime("%m/%d/%Y")
+        row = [date, results["words"], results["characters"], round(results["chars_per_sec"], 2)]
+        if self.test_type == "Stopwatch":
+            row.insert(1, scoring.format_hms(results["seconds"]))
+        self.results.put_nowait((row, f"{typist.client_id}_{typist.name}", typist.timestamps[:end], typist.keysyms[:end],
+                                 typist.actions[:end], elapsed_ns))
+
+    async def store_results(self):
+        """Writes queued results in batches on the store thread, so clients never wait for the disk."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.results.get()]
+            while not self.results.empty():
+                batch.append(self.results.get_nowait())
+            try:
+                await loop.run_in_executor(self.store_thread, self.save_batch, batch, self.start_unix_ns)
+            except Exception as e:  # Keep serving; the results are reported on the console
+                print(f"Could not store {len(batch)} results: {e}", file=sys.stderr)
+
+    def save_batch(self, batch, start_unix_ns):
+        """Appends a batch of rows in one transaction and saves each session's keystroke log."""
+        self.store.append_many([entry[0] for entry in batch])
+        self.stored += len(batch)
+        if self.log_dir is None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(start_unix_ns / 1e9).strftime("%Y%m%d_%H%M%S")
+        for _, log_name, timestamps, keysyms, actions, elapsed_ns in batch:
+            # The client id keeps students who chose the same name from sharing a log file
+            path = os.path.join(self.log_dir, f"{self.test_type}_{stamp}_{log_name}{keystroke_log.LOG_EXTENSION}")
+            keystroke_log.write_log(path, self.test_type, start_unix_ns, elapsed_ns, timestamps, keysyms, actions, 0)
+
+    def close(self):
+        """Waits for queued writes and stops the store thread."""
+        self.store_thread.shutdown(wait=True)
+
+
+class SessionConnection:
+    """Client side of the protocol, used by the load test and the classroom window."""
+
+    def __init__(self, reader, writer):
+        """Wrap an open connection."""
+        self.reader = reader
+        self.writer = writer
+        self.offset_ns = 0  # Server clock minus local clock
+        self.sequence = 0
+        self.pending = []  # Messages that arrived during the clock sync, read before new ones
+
+    @classmethod
+    async def connect(cls, host, port, name):
+        """Connects, joins as `name` and measures the clock offset to the server."""
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        writer.write(json_frame(HELLO, {"name": name}))
+        kind, payload = await read_message(reader)
+        if kind != WELCOME:
+            raise ConnectionError("The server did not accept the connection")
+        connection.welcome = json.loads(payload)
+        await connection.sync_clock()
+        return connection
+
+    async def sync_clock(self, samples=5):
+        """Estimates the server clock offset from the ping with the shortest round trip."""
+        best = None
+        for _ in range(samples):
+            sent_ns = time.time_ns()
+            self.writer.write(frame(PING, PING_TIMES.pack(sent_ns, 0)))
+            kind, payload = await read_message(self.reader)
+            while kind != PONG:
+                self.pending.append((kind, payload))  # A test may be announced while we sync
+                kind, payload = await read_message(self.reader)
+            received_ns = time.time_ns()
+            _, server_ns = PING_TIMES.unpack(payload)
+            if best is None or received_ns - sent_ns < best[0]:
+                best = (received_ns - sent_ns, server_ns - (sent_ns + received_ns) // 2)
+        self.offset_ns = best[1]
+
+    def local_time(self, server_unix_ns):
+        """Converts a server timestamp to the local clock."""
+        return server_unix_ns - self.offset_ns
+
+    def send_keys(self, timestamps, keysyms, actions):
+        """Sends one batch of key events and returns its sequence number."""
+        self.sequence += 1
+        self.writer.write(keys_frame(self.sequence, timestamps, keysyms, actions))
+        return self.sequence
+
+    def send_done(self, elapsed_ns):
+        """Tells the server the test is over."""
+        self.writer.write(json_frame(DONE, {"elapsed_ns": elapsed_ns}))
+
+    async def read(self):
+        """Returns the next (type, decoded message): JSON messages as dicts, ACK as its sequence number."""
+        kind, payload = self.pending.pop(0) if self.pending else await read_message(self.reader)
+        if kind == ACK:
+            return kind, SEQUENCE.unpack(payload)[0]
+        return kind, json.loads(payload) if payload else {}
+
+    def close(self):
+        """Closes the connection."""
+        self.writer.close()
+
+
+async def simulated_typist(host, port, index, rate, batch_ms, latencies):
+    """One load-test client: joins, waits for the start, types at `rate` keys per second and waits for its result."""
+    connection = await SessionConnection.connect(host, port, f"typist{index}")
+    sent = {}  # sequence -> perf_counter_ns when the batch was written
+
+    kind, message = await connection.read()
+    while kind != START:
+        kind, message = await connection.read()
+    duration_ns = message["duration_ms"] * 1_000_000
+    await asyncio.sleep(max(0, connection.local_time(message["start_at_unix_ns"]) - time.time_ns()) / 1e9)
+    start_ns = time.perf_counter_ns()
+
+    async def read_acks():
+        while True:
+            kind, message = await connection.read()
+            if kind == ACK:
+                latencies.append(time.perf_counter_ns() - sent.pop(message))
+            elif kind == RESULT:
+                return message
+
+    reader = asyncio.create_task(read_acks())
+    typed = 0
+    while True:
+        await asyncio.sleep(batch_ms / 1000)
+        elapsed_ns = min(time.perf_counter_ns() - start_ns, duration_ns)
+        due = int(elapsed_ns * rate / 1e9)
+        if due > typed:
+            timestamps, keysyms, actions = [], [], []
+            for key in range(typed, due):
+                keysym = 0x20 if key % 6 == 5 else ord("a") + key % 26
+                at = key * 1_000_000_000 // rate
+                timestamps += (at, at + 40_000_000)
+                keysyms += (keysym, keysym)
+                actions += (keystroke_capture.PRESS, keystroke_capture.RELEASE)
+            sent[connection.send_keys(timestamps, keysyms, actions)] = time.perf_counter_ns()
+            await connection.writer.drain()
+            typed = due
+        if elapsed_ns >= duration_ns:
+            break
+    connection.send_done(duration_ns)
+    result = await reader
+    connection.close()
+    return result
+
+
+async def load_test(clients, rate, seconds, batch_ms):
+    """Runs one test with `clients` simulated typists against an in-process server and returns the measurements."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = results_store.SQLiteResultsStore(os.path.join(folder, "results.db"), "OneMinute")
+        server = SessionServer(store, duration_ms=seconds * 1000, start_delay_ms=1000, log_dir=None)
+        listener = await server.serve(DEFAULT_HOST, 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        latencies = []
+        typists = [asyncio.create_task(simulated_typist(DEFAULT_HOST, port, i, rate, batch_ms, latencies))
+                   for i in range(clients)]
+        await server.wait_for_clients(clients)
+        server.start_test()
+        results = await asyncio.gather(*typists)
+        while server.stored < clients:
+            await asyncio.sleep(0.05)
+        listener.close()
+        await listener.wait_closed()
+        server.close()
+        stored_rows = sum(1 for _ in store.iter_rows())
+        store.close()
+
+    events = server.batch_events
+    handling = percentiles(server.batch_ns)
+    return {
+        "clients": clients,
+        "keys_per_second_per_client": rate,
+        "seconds": seconds,
+        "batch_ms": batch_ms,
+        "events": events,
+        "events_per_second": events / seconds,
+        "ack_latency_ms": {key: value / 1e6 for key, value in percentiles(latencies).items()},
+        "server_batch_handling_us": {key: value / 1e3 for key, value in handling.items()},
+        "server_us_per_event": sum(server.batch_ns) / max(events, 1) / 1e3,
+        "results_returned": len(results),
+        "results_stored": stored_rows,
+    }
+
+
+async def run_server(args):
+    """Serves tests until interrupted, starting each one when enough students joined or on Enter."""
+    store = results_store.open_store(args.test_type)
+    server = SessionServer(store, args.test_type, args.seconds * 1000)
+    listener = await server.serve(args.host, args.port)
+    print(f"Listening on {args.host}:{args.port}")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            if args.students:
+                print(f"Waiting for {args.students} students...")
+                await server.wait_for_clients(args.students)
+            else:
+                await loop.run_in_executor(None, input, "Press Enter to start a test for every connected student")
+            server.start_test()
+            print(f"Test started for {len(server.participants)} students")
+            await asyncio.sleep((server.start_delay_ms + server.duration_ms + FINISH_GRACE_MS) / 1000)
+            print(f"{server.stored} results stored so far")
+            if args.students:
+                args.students = 0  # Later tests start on Enter
+    finally:
+        listener.close()
+        server.close()
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classroom session server for the typing test")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run tests for connected students")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--test-type", choices=sorted(results_store.LAYOUTS), default="OneMinute")
+    serve_parser.add_argument("--seconds", type=int, default=DEFAULT_SECONDS, help="test length")
+    serve_parser.add_argument("--students", type=int, default=0,
+                              help="start the first test automatically once this many students joined")
+    load_parser = commands.add_parser("loadtest", help="measure the server with simulated typists on localhost")
+    load_parser.add_argument("--clients", type=int, default=300)
+    load_parser.add_argument("--rate", type=int, default=8, help="key presses per second per typist")
+    load_parser.add_argument("--seconds", type=int, default=10, help="test length")
+    load_parser.add_argument("--batch-ms", type=int, default=200, help="how often clients send their keys")
+    load_parser.add_argument("--output", help="JSON file for the measurements")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(run_server(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    report = asyncio.run(load_test(args.clients, args.rate, args.seconds, args.batch_ms))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["results_stored"] == args.clients else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Cold-start benchmark for main.py: import time and time to first frame.
+
+Usage:
+    python startup_bench.py --runs 5 --output startup.json
+
+Each run starts a fresh interpreter, imports main, builds TypingTestApp
+and waits until its first frame has been drawn. The medians are printed
+and optionally written as JSON so CI can track them between versions.
+Needs a display (for example xvfb-run on a build server).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside the child interpreter; times are wall-clock so the parent can include process start-up
+CHILD_CODE = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+before_import = time.time()
+import main
+after_import = time.time()
+app = main.TypingTestApp()
+app.update()  # Process the pending map and redraw events, i.e. draw the first frame
+first_frame = time.time()
+app.on_close()
+print(json.dumps({{"before_import": before_import, "after_import": after_import, "first_frame": first_frame}}))
+"""
+
+
+def run_once():
+    """Starts the app in a fresh interpreter and returns its timings in milliseconds."""
+    with tempfile.TemporaryDirectory() as work_dir:  # Keep the results database out of the repo
+        launched = time.time()
+        output = subprocess.run([sys.executable, "-c", CHILD_CODE.format(app_dir=APP_DIR)], cwd=work_dir,
+                                capture_output=True, text=True, check=True).stdout
+    times = json.loads(output.strip().splitlines()[-1])
+    return {
+        "interpreter_start_ms": (times["before_import"] - launched) * 1000,
+        "import_ms": (times["after_import"] - times["before_import"]) * 1000,
+        "time_to_first_frame_ms": (times["first_frame"] - launched) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold-start time of the typing test app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    results = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    results["runs"] = args.runs
+
+    for key, value in results.items():
+        print(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
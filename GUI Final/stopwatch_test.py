@@ -1,15 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-import time
 from datetime import datetime
+from array import array  # Compact storage for lap splits
+import timer_scheduler  # Drift-free timer built on perf_counter_ns
+import keystroke_capture  # Timestamped key event recording
+import keystroke_log  # Binary keystroke logs saved after every run
+import scoring  # Word and character counting
+import text_watch  # Reports edits made to the text box
+import window_manager  # Reusable windows instead of nested main loops
+import instrumentation  # Optional timing of key handling and scoring
+import results_store  # Layout of saved stopwatch results, including lap splits
 
 # Define color constants from the palette
 BG_COLOR = "#C1AE9F"
 BUTTON_COLOR = "#69385C"
 TEXT_COLOR = "white"
 
-# Define a new window as a subclass of Toplevel
-class StopwatchTestWindow(tk.Toplevel):
+# Define a new window as a reusable subclass of Toplevel
+class StopwatchTestWindow(window_manager.ManagedWindow):
     def __init__(self, master):
         """
         Initialize the stopwatch window.
@@ -19,21 +27,37 @@ class StopwatchTestWindow(tk.Toplevel):
         """
         super().__init__(master)
         self.title("Stopwatch Timing Test")
-        self.geometry("400x300")
+        self.geometry("420x460")
         self.configure(bg=BG_COLOR)  # Set background color
 
         # Initialize variables to manage stopwatch state
         self.running = False
-        self.start_time = None
+        self.timer = timer_scheduler.TickScheduler(self, 1000, self.update_stopwatch)
+
+        # Lap splits in ns since the start, and the character count at each split
+        self.lap_splits = array('q')
+        self.lap_characters = array('q')
 
         # Stopwatch label
         self.stopwatch_label = tk.Label(self, text="00:00:00", bg=BG_COLOR, fg=TEXT_COLOR)
         self.stopwatch_label.pack(pady=10)
 
+        # Live typing speed, refreshed with the stopwatch
+        self.live_label = tk.Label(self, text="CPS: 0.00", bg=BG_COLOR, fg=TEXT_COLOR)
+        self.live_label.pack()
+
         # Input box for text
         self.text_box = tk.Text(self, height=10, width=50)
         self.text_box.pack(pady=10)
 
+        # Record every key event typed into the text box
+        self.keystrokes = keystroke_capture.KeystrokeRecorder()
+        self.keystrokes.attach(self.text_box)
+
+        # Keep word and character totals up to date as the text changes
+        self.counter = scoring.IncrementalTextCounter()
+        self.text_watcher = text_watch.TextEditWatcher(self.text_box, self.on_text_insert, self.on_text_delete)
+
         # Start button
         self.start_button = tk.Button(self, text="Start", command=self.start_stopwatch, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         self.start_button.pack()
@@ -43,82 +67,227 @@ class StopwatchTestWindow(tk.Toplevel):
                                      fg=TEXT_COLOR)
         self.stop_button.pack()
 
-        # Go back button (closes the stopwatch window)
-        self.go_back_button = tk.Button(self, text="Go Back", command=self.destroy, bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        # Lap button (Ctrl+L while typing); each lap shows its own characters per second
+        self.lap_button = tk.Button(self, text="Lap", command=self.lap, state=tk.DISABLED, bg=BUTTON_COLOR,
+                                    fg=TEXT_COLOR)
+        self.lap_button.pack()
+        self.text_box.bind("<Control-l>", self.on_lap_key)
+
+        # List of laps, newest at the bottom
+        laps_frame = tk.Frame(self, bg=BG_COLOR)
+        laps_frame.pack(pady=5)
+        self.laps_list = tk.Listbox(laps_frame, height=5, width=48)
+        laps_scrollbar = tk.Scrollbar(laps_frame, command=self.laps_list.yview)
+        self.laps_list.config(yscrollcommand=laps_scrollbar.set)
+        self.laps_list.pack(side=tk.LEFT)
+        laps_scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        # Go back button (hides the stopwatch window until it is opened again)
+        self.go_back_button = tk.Button(self, text="Go Back", command=self.close, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         self.go_back_button.pack(side=tk.BOTTOM, padx=10, pady=10)
 
+    def reset(self):
+        """
+        Stop the stopwatch and clear the window for the next session.
+        """
+        self.running = False
+        self.timer.stop()
+        self.keystrokes.reset()
+        self.text_box.delete("1.0", tk.END)
+        self.stopwatch_label.config(text="00:00:00")
+        self.live_label.config(text="CPS: 0.00")
+        self.start_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        self.lap_button.config(state=tk.DISABLED)
+        self.clear_laps()
+
+    def clear_laps(self):
+        """
+        Forget the laps of the previous run.
+        """
+        del self.lap_splits[:]
+        del self.lap_characters[:]
+        self.laps_list.delete(0, tk.END)
+
+    def lap(self):
+        """
+        Record a lap split and show its characters per second.
+        """
+        if self.running:
+            self.add_lap(self.timer.elapsed_ns())
+        self.text_box.focus_set()  # Keep typing after clicking the button
+
+    def on_lap_key(self, event):
+        """
+        Record a lap from the keyboard without typing into the text box.
+
+        Tk runs only the most specific binding of the text box, so this one
+        replaces the recorder's <KeyPress> binding and logs the key itself.
+        """
+        self.keystrokes.record(event.keysym_num, event.state, keystroke_capture.PRESS)
+        self.lap()
+        return "break"
+
+    def add_lap(self, split_ns):
+        """
+        Store one split and list it; O(1) however many laps there are.
+
+        Args:
+        - split_ns: Nanoseconds since the stopwatch was started.
+        """
+        previous_ns = self.lap_splits[-1] if self.lap_splits else 0
+        previous_characters = self.lap_characters[-1] if self.lap_characters else 0
+        if split_ns <= previous_ns:
+            return
+        characters = self.counter.characters
+        self.lap_splits.append(split_ns)
+        self.lap_characters.append(characters)
+        segment_seconds = (split_ns - previous_ns) / 1e9
+        segment_cps = scoring.chars_per_second(characters - previous_characters, segment_seconds)
+        self.laps_list.insert(tk.END, f"Lap {len(self.lap_splits)}: {scoring.format_split(split_ns)}"
+                                      f"  (+{segment_seconds:.3f} s, {segment_cps:.2f} CPS)")
+        self.laps_list.see(tk.END)
+
+    def segment_cps(self):
+        """
+        Characters per second of every lap, in order.
+        """
+        cps = []
+        previous_ns = previous_characters = 0
+        for split_ns, characters in zip(self.lap_splits, self.lap_characters):
+            cps.append(scoring.chars_per_second(characters - previous_characters, (split_ns - previous_ns) / 1e9))
+            previous_ns, previous_characters = split_ns, characters
+        return cps
+
+    @instrumentation.timed("stopwatch_text_insert")
+    def on_text_insert(self, index, left, text, right):
+        """
+        Update the running totals after text was inserted.
+        """
+        self.counter.on_insert(left, text, right)
+
+    @instrumentation.timed("stopwatch_text_delete")
+    def on_text_delete(self, index, left, removed, right):
+        """
+        Update the running totals after text was deleted.
+        """
+        self.counter.on_delete(left, removed, right)
+
     def start_stopwatch(self):
         """
         Start the stopwatch and update UI accordingly.
         """
         self.running = True
-        self.start_time = time.time()  # Record the starting time
-        self.update_stopwatch()  # Begin updating the stopwatch display
+        self.keystrokes.reset()  # Only keep the key events of this run
+        self.clear_laps()
+        self.timer.start()  # Record the starting time and begin updating the stopwatch display
+        self.update_stopwatch(0)
 
-        # Disable the start button and enable the stop button
+        # Disable the start button and enable the stop and lap buttons
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
+        self.lap_button.config(state=tk.NORMAL)
 
     def stop_stopwatch(self):
         """
         Stop the stopwatch, calculate results, and display them.
         """
         self.running = False
-        elapsed_time = time.time() - self.start_time  # Calculate elapsed time
+        elapsed_ns = self.timer.stop()  # Calculate elapsed time
+        elapsed_time = elapsed_ns / 1e9
+        if self.lap_splits:
+            self.add_lap(elapsed_ns)  # The last lap ends when the stopwatch stops
 
-        # Calculate number of words and characters from the text input
-        text_content = self.text_box.get("1.0", tk.END)
-        words = len(text_content.split())
-        characters = len(text_content.replace(" ", "").replace("\n", ""))
+        # Keep the raw key events of this run
+        try:
+            keystroke_log.save_session(self.keystrokes, "Stopwatch", self.timer.start_ns, elapsed_ns)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save the keystroke log: {e}")
 
-        # Calculate characters per second
-        if elapsed_time > 0:
-            chars_per_second = characters / elapsed_time
-        else:
-            chars_per_second = 0
+        with instrumentation.measure("stopwatch_scoring"):
+            # Number of words and characters in the text input, kept current as it is edited
+            words = self.counter.words
+            characters = self.counter.characters
+
+            # Calculate characters per second
+            chars_per_second = scoring.chars_per_second(characters, elapsed_time)
 
-        # Format elapsed time into hours, minutes, seconds
-        hours = int(elapsed_time // 3600)
-        minutes = int((elapsed_time % 3600) // 60)
-        seconds = int(elapsed_time % 60)
+            # Format elapsed time into hours, minutes, seconds
+            elapsed_text = scoring.format_hms(elapsed_time)
 
         # Prepare result text to display in a message box
-        result_text = f"Time: {hours:02}:{minutes:02}:{seconds:02}\n"
+        result_text = f"Time: {elapsed_text}\n"
         result_text += f"Words: {words}\n"
         result_text += f"Characters: {characters}\n"
         result_text += f"Characters per second: {chars_per_second:.2f}\n"
-
-        # Show results in a message box
-        messagebox.showinfo("Results", result_text)
+        if self.lap_splits:
+            result_text += f"Laps: {len(self.lap_splits)}, fastest lap: {max(self.segment_cps()):.2f} CPS\n"
+
+        # Show results in a message box; runs with laps can be saved together with their splits
+        if self.lap_splits and hasattr(self.master, "results_stores"):
+            if messagebox.askyesno("Results", result_text + "\nSave this run and its lap splits?", parent=self):
+                self.save_laps([datetime.now().strftime("%m/%d/%Y"), elapsed_text, words, characters,
+                                round(chars_per_second, 2), results_store.format_lap_splits(self.lap_splits)])
+        else:
+            messagebox.showinfo("Results", result_text)
 
         # Update the stopwatch label with the final time display
-        self.stopwatch_label.config(text=f"{hours:02}:{minutes:02}:{seconds:02}")
+        self.stopwatch_label.config(text=elapsed_text)
 
-        # Enable the start button and disable the stop button
+        # Enable the start button and disable the stop and lap buttons
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
+        self.lap_button.config(state=tk.DISABLED)
+
+    def save_laps(self, row):
+        """
+        Save a stopwatch result row with its lap splits on the background writer.
 
-    def update_stopwatch(self):
+        Args:
+        - row: Stopwatch layout row ending with the "Lap Splits" cell.
+        """
+        import bulk_import  # Loads NumPy, so only when a run is saved
+
+        store = self.master.results_stores["Stopwatch"]
+        rows, errors = bulk_import.validate_rows([row], store.headers)  # Same conversions as manual entries
+        if errors:
+            messagebox.showerror("Error", errors[0][1], parent=self)
+            return
+        try:
+            self.master.results_writer.submit(store, rows[0], self.on_laps_saved)
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+
+    def on_laps_saved(self, error):
         """
-        Update the stopwatch display every second while running.
+        Report a failed save; called on the Tk thread by the results writer.
+        """
+        if error is not None:
+            messagebox.showerror("Error", f"Could not save the results: {error}")
+
+    def update_stopwatch(self, elapsed_ns):
+        """
+        Update the stopwatch display on every whole second while running.
+
+        Args:
+        - elapsed_ns: Nanoseconds since the stopwatch was started.
         """
         if self.running:
-            elapsed_time = time.time() - self.start_time  # Calculate elapsed time
-            hours = int(elapsed_time // 3600)
-            minutes = int((elapsed_time % 3600) // 60)
-            seconds = int(elapsed_time % 60)
-            self.stopwatch_label.config(text=f"{hours:02}:{minutes:02}:{seconds:02}")  # Update display
-            self.after(1000, self.update_stopwatch)  # Schedule the next update after 1 second
+            elapsed_time = elapsed_ns / 1e9
+            self.stopwatch_label.config(text=scoring.format_hms(elapsed_time))  # Update display
+            chars_per_second = scoring.chars_per_second(self.counter.characters, elapsed_time)
+            self.live_label.config(text=f"CPS: {chars_per_second:.2f}")
 
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Main Window")
+    windows = window_manager.WindowManager(root)
 
     def open_stopwatch_window():
         """
-        Function to open the stopwatch window.
+        Function to open the stopwatch window (reusing it after the first time).
         """
-        stopwatch_window = StopwatchTestWindow(root)
+        windows.show("stopwatch", lambda: StopwatchTestWindow(root))
 
     # Button to open the stopwatch window
     start_stopwatch_button = tk.Button(root, text="Open Stopwatch", command=open_stopwatch_window, bg=BUTTON_COLOR,
@@ -140,11 +309,11 @@ start_stopwatch Method: Starts the stopwatch, records start time, updates UI by
 
 stop_stopwatch Method: Stops the stopwatch, calculates elapsed time, counts words and characters from the input, computes characters per second, formats results, displays them in a message box, updates the stopwatch label, and adjusts button states.
 
-update_stopwatch Method: Updates the stopwatch display every second while running using after() method for recursive scheduling.
+update_stopwatch Method: Updates the stopwatch display on every whole second while running; ticks come from a TickScheduler, which aligns after() wakeups to the second boundaries.
 
 Main Application (__main__):
 
-open_stopwatch_window Function: Opens the stopwatch window when called.
+open_stopwatch_window Function: Opens the stopwatch window when called; a WindowManager shows the same window again instead of creating a new one.
 
 Button Creation: Creates a button in the main window (root) that triggers open_stopwatch_window function when clicked.
 
@@ -0,0 +1,71 @@
+class TextEditWatcher:
+    """Reports every insert and delete made to a Text widget, however it was made.
+
+    The widget's Tcl command is renamed and replaced by a proxy, so typing,
+    pasting and programmatic edits are all seen. Callbacks are invoked after
+    the edit as `on_insert(index, left, text, right)` and
+    `on_delete(index, left, removed, right)`, where `index` is the start of
+    the edit and `left`/`right` are the single characters around it ("" at
+    the start of the text).
+    """
+
+    def __init__(self, widget, on_insert, on_delete):
+        """Install the proxy on `widget`."""
+        self.widget = widget
+        self.on_insert = on_insert
+        self.on_delete = on_delete
+        self._orig = widget._w + "_orig"
+        widget.tk.call("rename", widget._w, self._orig)
+        widget.tk.createcommand(widget._w, self._proxy)
+        widget._tclCommands = (widget._tclCommands or []) + [widget._w]  # Deleted along with the widget
+
+    def _call(self, *args):
+        return self.widget.tk.call((self._orig,) + args)
+
+    def _compare(self, index1, op, index2):
+        return self.widget.tk.getboolean(self._call("compare", index1, op, index2))
+
+    def _clamp(self, index):
+        """Resolves `index` and keeps it before Tk's trailing newline, as insert and delete do."""
+        index = self._call("index", index)
+        if self._compare(index, ">", "end-1c"):
+            index = self._call("index", "end-1c")
+        return index
+
+    def _proxy(self, command, *args):
+        # Errors pass through unchanged, as they would from the widget itself: Tk's bindings check for
+        # a selection or catch the error, e.g. "delete sel.first sel.last" when nothing is selected.
+        # Indices are resolved before editing, so a failed edit changes nothing and notifies nobody.
+        if command not in ("insert", "delete", "replace"):
+            return self._call(command, *args)
+        if self._call("cget", "-state") == "disabled":
+            return ""  # A disabled Text widget ignores edits, so there is nothing to report
+        if command == "insert":
+            return self._insert(args[0], args[1:])
+        if command == "delete":
+            return self._delete(args[0], args[1] if len(args) > 1 else None)
+        index = self._clamp(args[0])
+        self._delete(index, args[1])
+        return self._insert(index, args[2:])
+
+    def _insert(self, index, chars_and_tags):
+        index = self._clamp(index)
+        text = "".join(chars_and_tags[0::2])
+        left = self._call("get", f"{index} -1c", index)
+        right = self._call("get", index)
+        result = self._call("insert", index, *chars_and_tags)
+        if text:
+            self.on_insert(index, left, text, right)
+        return result
+
+    def _delete(self, index1, index2):
+        index1 = self._clamp(index1)
+        index2 = self._clamp(index2 if index2 is not None else f"{index1} +1c")
+        if not self._compare(index1, "<", index2):
+            return ""
+        removed = self._call("get", index1, index2)
+        left = self._call("get", f"{index1} -1c", index1)
+        right = self._call("get", index2)
+        result = self._call("delete", index1, index2)
+        self.on_delete(index1, left, removed, right)
+        return result
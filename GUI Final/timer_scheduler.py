@@ -0,0 +1,134 @@
+import time  # perf_counter_ns is monotonic, so clock changes cannot break elapsed time
+
+NS_PER_MS = 1_000_000
+
+
+class TickScheduler:
+    """Drift-free display timer for the test windows, driven by Tk's after().
+
+    Ticks are aligned to multiples of `period_ms` after start(), so a late
+    wakeup never pushes later ticks back; ticks that were missed entirely
+    are skipped. An optional deadline is scheduled on its own, independent
+    of the tick period, and reports exactly `deadline_ms` as elapsed time.
+    """
+
+    def __init__(self, widget, period_ms, on_tick, deadline_ms=None, on_deadline=None):
+        """Initialize the scheduler; `on_tick` and `on_deadline` receive the elapsed nanoseconds."""
+        self.widget = widget
+        self.period_ns = period_ms * NS_PER_MS
+        self.on_tick = on_tick
+        self.deadline_ns = deadline_ms * NS_PER_MS if deadline_ms is not None else None
+        self.on_deadline = on_deadline
+        self.start_ns = None
+        self.stop_ns = None
+        self._tick_id = None
+        self._deadline_id = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.total_lateness_ns = 0
+        self.max_lateness_ns = 0
+
+    @property
+    def running(self):
+        """True between start() and stop()."""
+        return self.start_ns is not None and self.stop_ns is None
+
+    def start(self):
+        """Starts timing and schedules the first tick and the deadline."""
+        self.cancel()
+        self._reset_stats()
+        self.start_ns = time.perf_counter_ns()
+        self.stop_ns = None
+        self._schedule_tick(1)
+        if self.deadline_ns is not None:
+            self._schedule_deadline()
+
+    def elapsed_ns(self):
+        """Returns the nanoseconds elapsed since start(), frozen once stopped."""
+        if self.start_ns is None:
+            return 0
+        end_ns = self.stop_ns if self.stop_ns is not None else time.perf_counter_ns()
+        elapsed = end_ns - self.start_ns
+        if self.deadline_ns is not None:
+            elapsed = min(elapsed, self.deadline_ns)
+        return elapsed
+
+    def stop(self):
+        """Stops the timer and returns the elapsed nanoseconds."""
+        if self.running:
+            self.stop_ns = time.perf_counter_ns()
+        self.cancel()
+        return self.elapsed_ns()
+
+    def cancel(self):
+        """Cancels any pending tick and deadline callbacks."""
+        if self._tick_id is not None:
+            self.widget.after_cancel(self._tick_id)
+            self._tick_id = None
+        if self._deadline_id is not None:
+            self.widget.after_cancel(self._deadline_id)
+            self._deadline_id = None
+
+    def _delay_ms(self, target_ns):
+        """Milliseconds from now until `target_ns`, rounded up so after() never fires early."""
+        return max(0, -(-(target_ns - time.perf_counter_ns()) // NS_PER_MS))
+
+    def _schedule_tick(self, index):
+        self._tick_index = index
+        target_ns = self.start_ns + index * self.period_ns
+        self._tick_id = self.widget.after(self._delay_ms(target_ns), self._tick)
+
+    def _tick(self):
+        now_ns = time.perf_counter_ns()
+        elapsed = now_ns - self.start_ns
+        index = elapsed // self.period_ns
+        if index < self._tick_index:
+            self._schedule_tick(self._tick_index)  # Woke up early; wait for the boundary
+            return
+
+        lateness = elapsed - self._tick_index * self.period_ns
+        self.ticks += 1
+        self.missed_ticks += index - self._tick_index
+        self.total_lateness_ns += lateness
+        self.max_lateness_ns = max(self.max_lateness_ns, lateness)
+
+        self._schedule_tick(index + 1)  # Skip any ticks the event loop was too late for
+        self.on_tick(self.elapsed_ns())
+
+    def _schedule_deadline(self):
+        self._deadline_id = self.widget.after(self._delay_ms(self.start_ns + self.deadline_ns), self._deadline)
+
+    def _deadline(self):
+        if time.perf_counter_ns() - self.start_ns < self.deadline_ns:
+            self._schedule_deadline()
+            return
+        self._deadline_id = None
+        self.stop_ns = self.start_ns + self.deadline_ns
+        self.cancel()
+        if self.on_deadline is not None:
+            self.on_deadline(self.deadline_ns)
+
+    def jitter_report(self):
+        """Returns the measured tick lateness in milliseconds and the number of skipped ticks."""
+        return {
+            "ticks": self.ticks,
+            "missed_ticks": self.missed_ticks,
+            "mean_jitter_ms": self.total_lateness_ns / self.ticks / NS_PER_MS if self.ticks else 0.0,
+            "max_jitter_ms": self.max_lateness_ns / NS_PER_MS,
+        }
+
+
+# Demo: run a 100 ms scheduler for two seconds on a bare Tcl interpreter and print its jitter
+if __name__ == "__main__":
+    import tkinter as tk
+
+    interp = tk.Tcl()
+    scheduler = TickScheduler(interp, 100, lambda elapsed: None, deadline_ms=2000)
+    scheduler.start()
+    while scheduler.running:
+        interp.dooneevent()  # A bare interpreter has no windows, so run its event loop by hand
+    print(f"Deadline reported {scheduler.elapsed_ns() / 1e9:.3f} s elapsed")
+    print(scheduler.jitter_report())
@@ -1,77 +1,234 @@
 import tkinter as tk
 from tkinter import messagebox
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
 from datetime import datetime
-import time  # Required for timer functionality
+import random
+import timer_scheduler  # Drift-free timer built on perf_counter_ns
+import results_store  # Append-only journal that feeds the Excel result files
+import keystroke_capture  # Timestamped key event recording
+import keystroke_log  # Binary keystroke logs saved after every test
+import scoring  # Word and character counting
+import text_watch  # Reports edits made to the text box
+import accuracy  # Errors against the reference passage
+import window_manager  # Reusable windows instead of nested main loops
+import results_dashboard  # In-app results view
+import instrumentation  # Optional timing of key handling and scoring
+import error_highlight  # Marks typing errors in the text box
+import passage_library  # Indexed passages by difficulty
 
 # Constants for colors and styling
 BG_COLOR = "#D3BDB0"
 BUTTON_COLOR = "#89937C"
 TEXT_COLOR = "white"
 
+# Length of the typing test
+TEST_DURATION_MS = 60_000
+
+# Reference passages shown during the typing test
+PASSAGES = [
+    "The quick brown fox jumps over the lazy dog. Pack my box with five dozen liquor jugs. "
+    "How vexingly quick daft zebras jump!",
+    "Typing is a skill that improves with steady practice. Keep your eyes on the text, rest your "
+    "fingers on the home row and let accuracy come before speed.",
+    "A good programmer reads code far more often than they write it, so clear names and short "
+    "functions save time for everyone who comes after.",
+    "Autumn leaves drifted across the quiet campus while students hurried between classes, "
+    "coffee in hand and notes tucked under their arms.",
+]
+
+# Difficulty choices shown when a passage library has been built
+DIFFICULTY_ANY = "Any"
+DIFFICULTIES = [DIFFICULTY_ANY] + [band.capitalize() for band in passage_library.BANDS]
+
+# Column headers of the "Typing Test Results" sheet
+TYPING_TEST_HEADERS = ["Date", "Words Typed", "Characters Typed", "Characters per Second"]
+
+
+def countdown_text(remaining_ns):
+    """Timer label for the time left in a test, rounded up like a countdown clock."""
+    remaining_seconds = -(-max(0, remaining_ns) // 1_000_000_000)
+    minutes, seconds = divmod(remaining_seconds, 60)
+    return f"Timer: {minutes}:{seconds:02}"
+
+
 # Class for the typing test window
-class TypingTestWindow(tk.Toplevel):
+class TypingTestWindow(window_manager.ManagedWindow):
     """Window for conducting a one-minute typing test."""
 
+    score_passage = True  # Subclasses that show other text, such as replays, turn off error counting and highlighting
+
     def __init__(self, master):
         """Initialize the TypingTestWindow."""
         super().__init__(master)
         self.title("One-Minute Typing Test")
-        self.geometry("400x300")
+        self.geometry("450x480")
         self.configure(bg=BG_COLOR)
 
         # Timer label
         self.timer_label = tk.Label(self, text="Timer: 1:00", bg=BG_COLOR, fg=TEXT_COLOR)
         self.timer_label.pack(pady=10)
 
+        # Live typing speed, refreshed with the timer
+        self.live_label = tk.Label(self, text="WPM: 0  CPS: 0.00  Errors: 0", bg=BG_COLOR, fg=TEXT_COLOR)
+        self.live_label.pack()
+
+        # Passages come from the passage library when one has been built, otherwise from PASSAGES
+        self.library = passage_library.default_library() if self.score_passage else None
+        self.difficulty = tk.StringVar(self, value=DIFFICULTY_ANY)
+        if self.library is not None:
+            difficulty_menu = tk.OptionMenu(self, self.difficulty, *DIFFICULTIES, command=self.on_difficulty)
+            difficulty_menu.config(bg=BUTTON_COLOR, fg=TEXT_COLOR)
+            difficulty_menu.pack(pady=(10, 0))
+
+        # Read-only reference passage to type
+        self.passage_box = tk.Text(self, height=6, width=50, wrap=tk.WORD, bg=BG_COLOR)
+        self.passage_box.pack(pady=(10, 0))
+
         # Text box for typing
         self.text_box = tk.Text(self, height=10, width=50)
         self.text_box.pack(pady=10)
 
+        # Record every key event typed into the text box
+        self.keystrokes = keystroke_capture.KeystrokeRecorder()
+        self.keystrokes.attach(self.text_box)
+
+        # Keep word and character totals up to date as the text changes
+        self.counter = scoring.IncrementalTextCounter()
+        self.text_watcher = text_watch.TextEditWatcher(self.text_box, self.on_text_insert, self.on_text_delete)
+        self.highlighter = None  # Created by show_passage() together with the first accuracy tracker
+        self.show_passage(self.next_passage())
+
+        # Countdown timer: ticks on every whole second and ends the test exactly at the deadline
+        self.duration_ms = TEST_DURATION_MS  # Changed by set_duration(), e.g. for a classroom test
+        self.timer = timer_scheduler.TickScheduler(self, 1000, self.update_timer, deadline_ms=self.duration_ms,
+                                                   on_deadline=self.calculate_results)
+
         # Start button to begin the typing test
         self.start_button = tk.Button(self, text="Start", command=self.start_typing_test, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         self.start_button.pack()
 
         # Go back button to close the window
-        self.go_back_button = tk.Button(self, text="Go Back", command=self.destroy, bg=BUTTON_COLOR, fg=TEXT_COLOR)
+        self.go_back_button = tk.Button(self, text="Go Back", command=self.close, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         self.go_back_button.pack(side=tk.BOTTOM, padx=10, pady=10)
 
+    def reset(self):
+        """Stops any running test and clears the window for the next session."""
+        self.timer.stop()
+        self.keystrokes.reset()
+        self.text_box.delete("1.0", tk.END)
+        self.timer_label.config(text=countdown_text(self.duration_ms * timer_scheduler.NS_PER_MS))
+        self.live_label.config(text="WPM: 0  CPS: 0.00  Errors: 0")
+        self.start_button.config(state=tk.NORMAL)
+        self.show_passage(self.next_passage())
+
+    def next_passage(self):
+        """Draws a passage of the chosen difficulty from the library, or one of PASSAGES without a library."""
+        if self.library is not None:
+            difficulty = self.difficulty.get()
+            try:
+                return self.library.sample(None if difficulty == DIFFICULTY_ANY else difficulty.lower())
+            except ValueError:
+                pass  # No passages of that difficulty
+        return random.choice(PASSAGES)
+
+    def on_difficulty(self, difficulty):
+        """Shows a passage of the new difficulty, unless a test is running."""
+        if not self.timer.running:
+            self.show_passage(self.next_passage())
+
+    def show_passage(self, passage):
+        """Shows a new reference passage and scores the typed text against it."""
+        self.passage_box.config(state=tk.NORMAL)
+        self.passage_box.delete("1.0", tk.END)
+        self.passage_box.insert("1.0", passage)
+        self.passage_box.config(state=tk.DISABLED)
+        if not self.score_passage:
+            self.accuracy = None
+            return
+        self.accuracy = accuracy.AccuracyTracker(passage)
+        self.accuracy.insert(0, self.text_box.get("1.0", "end-1c"))
+        if self.highlighter is None:
+            self.highlighter = error_highlight.ErrorHighlighter(self, self.text_box, self.accuracy)
+        self.highlighter.reset(self.accuracy)
+
+    def char_offset(self, index, text_length):
+        """Returns the number of characters before a text box index, given the current text length.
+
+        Counts back from the end, which is where typing happens, so the
+        cost does not grow with the length of the text.
+        """
+        count = self.text_box.count(index, "end-1c", "chars")
+        return text_length - (count[0] if count else 0)
+
+    @instrumentation.timed("typing_text_insert")
+    def on_text_insert(self, index, left, text, right):
+        """Updates the running totals and the error highlighting after text was inserted."""
+        self.counter.on_insert(left, text, right)
+        if self.accuracy is None:
+            return
+        offset = self.char_offset(index, len(self.accuracy.typed) + len(text))
+        self.accuracy.insert(offset, text)
+        self.highlighter.on_insert(index, offset, len(text))
+
+    @instrumentation.timed("typing_text_delete")
+    def on_text_delete(self, index, left, removed, right):
+        """Updates the running totals and the error highlighting after text was deleted."""
+        self.counter.on_delete(left, removed, right)
+        if self.accuracy is None:
+            return
+        offset = self.char_offset(index, len(self.accuracy.typed) - len(removed))
+        self.accuracy.delete(offset, len(removed))
+        self.highlighter.on_delete(index, offset)
+
     def start_typing_test(self):
         """Starts the typing test and disables the start button."""
         self.start_button.config(state=tk.DISABLED)
-        self.start_time = time.time()  # Record the start time
-        self.update_timer()  # Begin updating the timer
-
-    def update_timer(self):
-        """Updates the timer display every 100ms."""
-        elapsed_time = time.time() - self.start_time
-        remaining_time = max(0, 60 - elapsed_time)
-        minutes = int(remaining_time // 60)
-        seconds = int(remaining_time % 60)
-        self.timer_label.config(text=f"Timer: {minutes}:{seconds:02}")
-
-        if remaining_time > 0:
-            self.after(100, self.update_timer)  # Schedule the next update after 100ms
-        else:
-            self.calculate_results()  # If time is up, calculate and display results
+        self.keystrokes.reset()  # Only keep the key events of this test
+        self.timer.start()  # Record the start time and begin updating the timer
+        self.update_timer(0)
+
+    def set_duration(self, duration_ms):
+        """Sets the length of the next test; the timer must not be running."""
+        self.duration_ms = duration_ms
+        self.timer.deadline_ns = duration_ms * timer_scheduler.NS_PER_MS
+        self.timer_label.config(text=countdown_text(self.timer.deadline_ns))
+
+    def update_timer(self, elapsed_ns):
+        """Updates the timer display on every whole second."""
+        self.timer_label.config(text=countdown_text(self.duration_ms * timer_scheduler.NS_PER_MS - elapsed_ns))
+        self.update_live_speed(elapsed_ns / 1e9)
+
+    def update_live_speed(self, elapsed_time):
+        """Shows the words per minute, characters per second and errors typed so far."""
+        wpm = scoring.words_per_minute(self.counter.words, elapsed_time)
+        cps = scoring.chars_per_second(self.counter.characters, elapsed_time)
+        self.live_label.config(text=f"WPM: {wpm:.0f}  CPS: {cps:.2f}  Errors: {self.accuracy.errors()}")
+
+    def save_keystroke_log(self, elapsed_ns):
+        """Saves the key events of the finished test to a keystroke log."""
+        try:
+            keystroke_log.save_session(self.keystrokes, "OneMinute", self.timer.start_ns, elapsed_ns)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save the keystroke log: {e}")
 
-    def calculate_results(self):
+    def calculate_results(self, elapsed_ns):
         """Calculates typing test results and displays them in a message box."""
-        typed_text = self.text_box.get("1.0", tk.END)
-        words = len(typed_text.split())
-        characters = len(typed_text.replace(" ", "").replace("\n", ""))
-        time_elapsed = time.time() - self.start_time
-        characters_per_sec = characters / time_elapsed if time_elapsed > 0 else 0
-
-        result_message = f"Words typed: {words}\nCharacters typed: {characters}\nCharacters per second: {characters_per_sec:.2f}"
+        self.update_timer(elapsed_ns)
+        self.save_keystroke_log(elapsed_ns)
+        with instrumentation.measure("typing_scoring"):
+            results = scoring.score_counts(self.counter.words, self.counter.characters, elapsed_ns / 1e9)
+            errors = self.accuracy.errors()
+            accuracy_percent = accuracy.accuracy_percent(errors, len(self.accuracy.typed))
+            net_wpm = accuracy.net_words_per_minute(results['wpm'], errors, results['seconds'])
+
+        result_message = f"Words typed: {results['words']}\nCharacters typed: {results['characters']}\nCharacters per second: {results['chars_per_sec']:.2f}"
+        result_message += f"\nErrors: {errors}\nAccuracy: {accuracy_percent:.1f}%\nNet WPM: {net_wpm:.0f}"
         messagebox.showinfo("Typing Test Results", result_message)
         self.start_button.config(state=tk.NORMAL)  # Enable start button again
         self.text_box.delete("1.0", tk.END)  # Clear the text box for next test
+        self.show_passage(self.next_passage())  # New passage for the next test
 
 # Class for recording typing test results to Excel
-class RecordTypingTestWindow(tk.Toplevel):
+class RecordTypingTestWindow(window_manager.ManagedWindow):
     """Window for recording typing test results to Excel."""
 
     def __init__(self, master):
@@ -109,6 +266,11 @@ class RecordTypingTestWindow(tk.Toplevel):
         self.view_results_button = tk.Button(self, text="View Results", command=self.view_results, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         self.view_results_button.pack()
 
+    def reset(self):
+        """Clears the entry fields for the next session."""
+        for entry in (self.date_entry, self.words_entry, self.characters_entry, self.chars_per_sec_entry):
+            entry.delete(0, tk.END)
+
     def add_to_excel(self):
         """Validates input and adds typing test results to Excel."""
         try:
@@ -117,36 +279,35 @@ class RecordTypingTestWindow(tk.Toplevel):
             int(self.characters_entry.get())
             float(self.chars_per_sec_entry.get())
 
-            # Load existing workbook or create a new one
-            wb = openpyxl.load_workbook("One_Minute_Test_Results.xlsx")
-            ws = wb.active
-            if "Typing Test Results" not in wb.sheetnames:
-                ws = wb.create_sheet("Typing Test Results")
-                headers = ["Date", "Words Typed", "Characters Typed", "Characters per Second"]
-                ws.append(headers)
-                for col_num, header in enumerate(headers, start=1):
-                    cell = ws.cell(row=1, column=col_num)
-                    cell.alignment = Alignment(horizontal='center')
-                    cell.font = cell.font.copy(bold=True)
-
-            # Add data to the worksheet
+            # Add data to the results journal
             data = [
                 self.date_entry.get(),
                 int(self.words_entry.get()),
                 int(self.characters_entry.get()),
                 float(self.chars_per_sec_entry.get())
             ]
-            ws.append(data)
-            wb.save("One_Minute_Test_Results.xlsx")
-            messagebox.showinfo("Success", "Data added to Excel!")
+            self.master.results_writer.submit(self.master.results_journal, data, self.on_saved)
 
         except ValueError:
             messagebox.showerror("Error", "Invalid input data format!")
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
+
+    def on_saved(self, error):
+        """Reports the outcome of a background save."""
+        if not self.winfo_exists():
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Could not save results: {error}")
+        else:
+            messagebox.showinfo("Success", "Data added to Excel!")
 
     def view_results(self):
-        """Opens Excel to view the typing test results."""
-        import os
-        os.system("start excel.exe One_Minute_Test_Results.xlsx")
+        """Shows the typing test results inside the app."""
+        try:
+            self.master.open_results_dashboard()
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
 
 # Main application class
 class TypingTestApp(tk.Tk):
@@ -159,6 +320,15 @@ class TypingTestApp(tk.Tk):
         self.geometry("400x200")
         self.configure(bg=BG_COLOR)
 
+        # Append-only journal for the "Typing Test Results" sheet, written to Excel by the dashboard's export
+        self.results_journal = results_store.ResultsJournal(
+            results_store.ONE_MINUTE_FILENAME, TYPING_TEST_HEADERS,
+            sheet_name="Typing Test Results", style_headers=True)
+        self.results_writer = results_store.ResultsWriter(self)  # Keeps disk writes off the Tk thread
+        self.results_aggregates = None  # Built the first time the results are viewed
+        self.windows = window_manager.WindowManager(self)  # One reusable instance per window type
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Buttons to open typing test and record typing test windows
         button1 = tk.Button(self, text="One-Minute Typing Test", command=self.open_typing_test, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         button1.pack(pady=20)
@@ -166,15 +336,29 @@ class TypingTestApp(tk.Tk):
         button2 = tk.Button(self, text="Record One-Minute Typing Test", command=self.open_record_typing_test, bg=BUTTON_COLOR, fg=TEXT_COLOR)
         button2.pack()
 
+    def on_close(self):
+        """Saves any pending results before the app exits."""
+        self.windows.close_all()
+        self.results_writer.close()  # Drain pending writes before closing the journal
+        self.results_journal.close()
+        self.destroy()
+
     def open_typing_test(self):
         """Opens the one-minute typing test window."""
-        typing_test_app = TypingTestWindow(self)
-        typing_test_app.mainloop()
+        self.windows.show("typing", lambda: TypingTestWindow(self))
 
     def open_record_typing_test(self):
         """Opens the record typing test results window."""
-        record_typing_test_app = RecordTypingTestWindow(self)
-        record_typing_test_app.mainloop()
+        self.windows.show("record", lambda: RecordTypingTestWindow(self))
+
+    def open_results_dashboard(self):
+        """Opens the results dashboard, scanning the saved results the first time."""
+        if self.results_aggregates is None:
+            aggregates = results_dashboard.ResultsAggregates()
+            self.results_writer.call(lambda: aggregates.load(self.results_journal))
+            self.results_aggregates = aggregates
+        self.windows.show("results", lambda: results_dashboard.ResultsDashboard(
+            self, self.results_journal, self.results_aggregates, "Typing Test Results")).refresh()
 
 # Main entry point of the application
 if __name__ == "__main__":
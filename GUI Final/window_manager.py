@@ -0,0 +1,128 @@
+import tkinter as tk
+
+import instrumentation  # Optional per-callback timing
+
+
+class ManagedWindow(tk.Toplevel):
+    """Toplevel that is hidden and reused instead of being destroyed and rebuilt.
+
+    Every after() callback scheduled on the window is tracked, so close()
+    can cancel whatever is still pending before the window is hidden.
+    Subclasses override reset() to clear their state for the next session.
+    """
+
+    def __init__(self, master):
+        """Initialize the window and route the close button to close()."""
+        super().__init__(master)
+        self._after_ids = set()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def after(self, ms, func=None, *args):
+        """Schedules `func` like Tk's after(), remembering the ID until it runs or is cancelled."""
+        if func is None:
+            return super().after(ms)
+        if instrumentation.ENABLED:
+            func = instrumentation.timed(instrumentation.callback_name(func))(func)
+
+        def callback():
+            self._after_ids.discard(after_id)
+            func(*args)
+
+        after_id = super().after(ms, callback)
+        self._after_ids.add(after_id)
+        return after_id
+
+    def after_cancel(self, after_id):
+        """Cancels a callback scheduled with after()."""
+        self._after_ids.discard(after_id)
+        super().after_cancel(after_id)
+
+    def cancel_pending(self):
+        """Cancels every after() callback that has not run yet."""
+        for after_id in list(self._after_ids):
+            self.after_cancel(after_id)
+
+    def reset(self):
+        """Clears the window's state for the next session."""
+
+    def close(self):
+        """Cancels pending callbacks, resets the window and hides it until it is shown again."""
+        self.cancel_pending()
+        self.reset()
+        self.withdraw()
+
+
+class WindowManager:
+    """Keeps one instance per window type and shows it again instead of creating a new one."""
+
+    def __init__(self, root):
+        """Initialize the manager for windows owned by `root`."""
+        self.root = root
+        self.windows = {}
+
+    def show(self, key, factory):
+        """Shows the window registered under `key`, creating it with `factory()` the first time."""
+        window = self.windows.get(key)
+        if window is None or not window.winfo_exists():
+            window = factory()
+            self.windows[key] = window
+        else:
+            window.deiconify()
+        window.lift()
+        window.focus_set()
+        return window
+
+    def close_all(self):
+        """Destroys every managed window."""
+        for window in self.windows.values():
+            if window.winfo_exists():
+                window.cancel_pending()
+                window.destroy()
+        self.windows.clear()
+
+
+# Soak test: memory must stay flat across many open/close cycles of every test window
+if __name__ == "__main__":
+    import sys
+    import tracemalloc
+
+    import stopwatch_test
+    import typing_test
+
+    CYCLES = 1000
+    WARMUP_CYCLES = 50
+    ALLOWED_GROWTH_BYTES = 64 * 1024
+
+    root = tk.Tk()
+    root.withdraw()
+    manager = WindowManager(root)
+    factories = {
+        "typing": lambda: typing_test.TypingTestWindow(root),
+        "stopwatch": lambda: stopwatch_test.StopwatchTestWindow(root),
+    }
+
+    def cycle():
+        for key, factory in factories.items():
+            window = manager.show(key, factory)
+            window.update()
+            window.text_box.insert("end", "soak test text ")
+            if key == "typing":
+                window.start_typing_test()
+            else:
+                window.start_stopwatch()
+            window.update()
+            window.close()
+            window.update()
+
+    for _ in range(WARMUP_CYCLES):
+        cycle()
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    for _ in range(CYCLES):
+        cycle()
+    growth = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+    manager.close_all()
+    root.destroy()
+
+    print(f"Python memory growth after {CYCLES} open/close cycles: {growth / 1024:.1f} KiB")
+    sys.exit(0 if growth <= ALLOWED_GROWTH_BYTES else 1)
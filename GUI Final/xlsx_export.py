@@ -0,0 +1,210 @@
+"""Streaming Excel export of stored results.
+
+Usage:
+    python xlsx_export.py export Stopwatch Stopwatch_Export.xlsx
+    python xlsx_export.py export OneMinute Results.xlsx --rows-per-file 250000 --workers 4
+    python xlsx_export.py bench --rows 10000 100000 1000000
+
+Rows are read from a results store in batches and written with openpyxl's
+write-only mode, which streams each row to the sheet's XML as it is
+appended. Memory therefore stays flat however many results are stored.
+The header row keeps the bold, centered style of the record windows'
+workbooks, and the sheet is named after the store's sheet ("Sheet", or
+"Typing Test Results" for the standalone typing app) unless --sheet says
+otherwise.
+
+An export longer than one Excel sheet continues on "Sheet 2", "Sheet 3"
+and so on. With --rows-per-file the results of the SQLite store are split
+by row id into several workbooks. Each one is written by its own worker
+process with its own database connection.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# pip install openpyxl
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+
+import results_store  # Results layouts and the SQLite store
+
+EXCEL_MAX_ROWS = 1_048_576  # Rows per sheet Excel can open, header included
+ROWS_PER_SHEET = EXCEL_MAX_ROWS - 1
+
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal='center')
+
+
+def sheet_title(sheet_name, number):
+    """Title of the `number`th sheet of an export: "Sheet", then "Sheet 2", "Sheet 3"..."""
+    return sheet_name if number == 1 else f"{sheet_name} {number}"
+
+
+def header_cells(ws, headers):
+    """Returns the header row as bold, centered write-only cells of `ws`."""
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+
+def write_rows(wb, headers, rows, sheet_name="Sheet", rows_per_sheet=ROWS_PER_SHEET):
+    """Appends `rows` to new sheets of the write-only workbook `wb`; returns how many were written.
+
+    Every sheet starts with the header row. A workbook with no rows still
+    gets one sheet holding only the headers.
+    """
+    ws = wb.create_sheet(sheet_title(sheet_name, 1))
+    ws.append(header_cells(ws, headers))
+    sheets = 1
+    in_sheet = 0
+    count = 0
+    for row in rows:
+        if in_sheet == rows_per_sheet:
+            sheets += 1
+            ws = wb.create_sheet(sheet_title(sheet_name, sheets))
+            ws.append(header_cells(ws, headers))
+            in_sheet = 0
+        ws.append(row)
+        in_sheet += 1
+        count += 1
+    return count
+
+
+def export_rows(filename, headers, rows, sheet_name="Sheet", rows_per_sheet=ROWS_PER_SHEET):
+    """Writes `rows` to a new Excel file and returns how many were written."""
+    wb = openpyxl.Workbook(write_only=True)
+    count = write_rows(wb, headers, rows, sheet_name, rows_per_sheet)
+    wb.save(filename)
+    return count
+
+
+def export_store(store, filename, rows_per_sheet=ROWS_PER_SHEET, sheet_name=None):
+    """Streams every row of `store` into a new Excel file and returns how many were written.
+
+    The sheet is named like the store's own sheet unless `sheet_name` is given.
+    """
+    return export_rows(filename, store.headers, store.iter_rows(), sheet_name or store.sheet_name, rows_per_sheet)
+
+
+def export_range(job):
+    """Writes one id range of an SQLite store to its own file; runs in a worker process."""
+    db_path, test_type, filename, after_id, last_id, rows_per_sheet, sheet_name = job
+    store = results_store.SQLiteResultsStore(db_path, test_type)
+    try:
+        rows = store.iter_rows(after_id=after_id, last_id=last_id)
+        return filename, export_rows(filename, store.headers, rows, sheet_name or store.sheet_name, rows_per_sheet)
+    finally:
+        store.close()
+
+
+def shard_filename(filename, number):
+    """File name of the `number`th workbook of a split export, e.g. "Results_002.xlsx"."""
+    base, extension = os.path.splitext(filename)
+    return f"{base}_{number:03}{extension}"
+
+
+def export_files(db_path, test_type, filename, rows_per_file, workers=None, rows_per_sheet=ROWS_PER_SHEET,
+                 sheet_name=None):
+    """Splits the results of `test_type` into workbooks of `rows_per_file` rows, written in parallel.
+
+    Returns (file name, rows written) for every workbook. When everything
+    fits in one workbook, it is written to `filename` itself.
+    """
+    store = results_store.SQLiteResultsStore(db_path, test_type)
+    try:
+        ranges = store.id_ranges(rows_per_file)
+    finally:
+        store.close()
+    if len(ranges) <= 1:
+        return [export_range((db_path, test_type, filename, 0, None, rows_per_sheet, sheet_name))]
+
+    jobs = [(db_path, test_type, shard_filename(filename, number), after_id, last_id, rows_per_sheet, sheet_name)
+            for number, (after_id, last_id) in enumerate(ranges, start=1)]
+    with multiprocessing.Pool(min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+        return pool.map(export_range, jobs, chunksize=1)
+
+
+def bench(row_counts):
+    """Prints the time and peak Python memory of exporting growing numbers of rows.
+
+    tracemalloc slows allocation-heavy code several times over, so each
+    export is timed in one run and its memory measured in a second one.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        store = results_store.SQLiteResultsStore(os.path.join(tmp, "bench.db"), "Stopwatch")
+        stored = 0
+        for count in row_counts:
+            while stored < count:
+                batch = min(results_store.IMPORT_BATCH_SIZE, count - stored)
+                store.append_many([["01/01/2024", "00:01:00", 40 + i % 50, 200 + i, 3.33, ""]
+                                   for i in range(stored, stored + batch)])
+                stored += batch
+            filename = os.path.join(tmp, "bench.xlsx")
+            start = time.perf_counter()
+            export_store(store, filename)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            export_store(store, filename)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{count:>9} rows: {elapsed:7.2f} s, peak {peak / 2**20:6.1f} MiB, "
+                  f"file {os.path.getsize(filename) / 2**20:6.1f} MiB")
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream stored results into Excel workbooks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="export database results to Excel")
+    export_parser.add_argument("test_type", choices=sorted(results_store.LAYOUTS))
+    export_parser.add_argument("xlsx")
+    export_parser.add_argument("--db", default=results_store.DATABASE_FILENAME, help="results database")
+    export_parser.add_argument("--sheet", help=f"sheet name (default: {results_store.ResultsStore.sheet_name!r})")
+    export_parser.add_argument("--rows-per-sheet", type=int, default=ROWS_PER_SHEET,
+                               help="rows before the export continues on a new sheet")
+    export_parser.add_argument("--rows-per-file", type=int, help="split the export into numbered files")
+    export_parser.add_argument("--workers", type=int, default=None,
+                               help="processes writing files in parallel (default: all cores)")
+    bench_parser = commands.add_parser("bench", help="measure export time and memory as the row count grows")
+    bench_parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(sorted(args.rows))
+        return 0
+
+    if not 0 < args.rows_per_sheet <= ROWS_PER_SHEET:
+        parser.error(f"--rows-per-sheet must be between 1 and {ROWS_PER_SHEET}")
+    if args.rows_per_file is not None and args.rows_per_file < 1:
+        parser.error("--rows-per-file must be at least 1")
+    if not os.path.exists(args.db):
+        parser.error(f"no results database at {args.db}")
+
+    start = time.perf_counter()
+    if args.rows_per_file:
+        written = export_files(args.db, args.test_type, args.xlsx, args.rows_per_file, args.workers,
+                               args.rows_per_sheet, args.sheet)
+    else:
+        store = results_store.SQLiteResultsStore(args.db, args.test_type)
+        try:
+            written = [(args.xlsx, export_store(store, args.xlsx, args.rows_per_sheet, args.sheet))]
+        finally:
+            store.close()
+    for filename, count in written:
+        print(f"{filename}: {count} rows")
+    print(f"Exported {sum(count for _, count in written)} rows in {time.perf_counter() - start:.1f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())